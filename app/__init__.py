@@ -1,12 +1,8 @@
-from flask import Flask
-from flask_login import LoginManager
-from flask_mail import Mail
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask import Flask, jsonify
 from werkzeug.routing import BaseConverter
 
-from app.extensions import db, migrate, mail, login_manager
-from app.notification.scheduler import start_scheduler
+from app.extensions import db, login_manager, init_migrate
+from app.utils.logger import configure_logging
 
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -22,21 +18,27 @@ class SignedIntConverter(BaseConverter):
     def to_url(self, value):
         return str(value)
 
+def cli_command_name():
+    """ชื่อ flask CLI command ที่กำลังสร้าง app เช่น "upgrade", "run" (None = ไม่ได้มาจาก flask CLI)"""
+    import click
+    ctx = click.get_current_context(silent=True)
+    return ctx.info_name if ctx is not None else None
+
 def create_app():
     app = Flask(__name__)
 
     load_dotenv()
+    configure_logging()
     app.secret_key = os.environ.get("SECRET_KEY", "idk-bruh")
     app.permanent_session_lifetime = timedelta(days=3)
     
-    # mail config
-    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-    app.config['MAIL_PORT'] = 587
-    app.config['MAIL_USE_TLS'] = True
+    # mail config (Flask-Mail ผูกกับ app ตอนส่งอีเมลครั้งแรก ดู init_mail)
+    app.config['MAIL_SERVER'] = os.environ.get("MAIL_SERVER", "smtp.gmail.com")
+    app.config['MAIL_PORT'] = int(os.environ.get("MAIL_PORT", "587"))
+    app.config['MAIL_USE_TLS'] = os.environ.get("MAIL_USE_TLS", "1") == "1"
     app.config['MAIL_USERNAME'] = os.environ.get("SENDER_MAIL", "idk-bruh")
     app.config['MAIL_PASSWORD'] = os.environ.get("SENDER_PASSWORD", "idk-bruh")
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv("SENDER_MAIL")
-    mail.init_app(app)
 
     # db config
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL", "sqlite:///data.db")
@@ -46,7 +48,10 @@ def create_app():
         'pool_recycle': 300,
     }
     db.init_app(app)
-    migrate.init_app(app, db)
+    # flask db ... ต้องใช้ Flask-Migrate (process เว็บไม่ต้อง import alembic)
+    command = cli_command_name()
+    if command is not None:
+        init_migrate(app)
 
     @app.teardown_appcontext
     def shutdown_session(exception=None):
@@ -57,23 +62,22 @@ def create_app():
     login_manager.login_view = "web_login.login"  # เปลี่ยนตาม blueprint ของคุณ
     login_manager.login_message_category = "info"
 
-    # ✅ ต้องมี user_loader
-    @login_manager.user_loader
-    def load_user(user_id):
-        from app.models import User
-        return User.query.get(int(user_id))
+    # ✅ ต้องมี user_loader (ผ่าน USER_CACHE ถ้าเปิด USER_CACHE_TTL)
+    from app.services.user_cache import load_user
+    login_manager.user_loader(load_user)
 
     # converters
     app.url_map.converters['sint'] = SignedIntConverter
     
     # Register blueprints
-    from .routes.api import auth_api, user_api, plan_api, schedule_api, feedback_api, study_api
+    from .routes.api import auth_api, user_api, plan_api, schedule_api, feedback_api, study_api, stats_api
     app.register_blueprint(auth_api)
     app.register_blueprint(user_api)
     app.register_blueprint(plan_api)
     app.register_blueprint(schedule_api)
     app.register_blueprint(feedback_api)
     app.register_blueprint(study_api)
+    app.register_blueprint(stats_api)
 
     # from .routes.web import web_login, web_password, web_dashboard, web_feedback, web_schedule
     # app.register_blueprint(web_login)
@@ -82,12 +86,34 @@ def create_app():
     # app.register_blueprint(web_feedback)
     # app.register_blueprint(web_schedule)
 
-    from .routes.web import web_main, web_req
+    from .routes.web.main import web_main
+    from .routes.web.web_request import web_req
     app.register_blueprint(web_main)
     app.register_blueprint(web_req)
 
+    # คิว hash รหัสผ่านเต็ม (register / reset / เปลี่ยนรหัสผ่าน ฯลฯ) → 503 ให้ client ลองใหม่
+    from app.services.password_hasher import PasswordHasherBusy
+
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(error):
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
+
+    # CLI commands (flask cleanup-expired-plans ฯลฯ)
+    from .commands import register_commands
+    register_commands(app)
+
+    # metrics ต่อ route (เปิดด้วย METRICS_ENABLED=1 → GET /metrics)
+    from .metrics import init_metrics
+    init_metrics(app)
+
     # ✅ เริ่ม scheduler ตอน app start
-    start_scheduler()
+    # SCHEDULER_MODE: "app" (ใน process ของเว็บ, leader election กันรันซ้ำหลาย worker),
+    # "worker" (รันเฉพาะ python -m app.notification.worker), "off" (ไม่รันเลย เช่นตอนทดสอบ)
+    app.config['SCHEDULER_MODE'] = os.environ.get("SCHEDULER_MODE", "app")
+    if app.config["SCHEDULER_MODE"] == "app" and command in (None, "run"):
+        from app.notification.scheduler import start_scheduler
+        start_scheduler(app)
 
     # with app.app_context():
     #     from app.notification.scheduler import batch_job
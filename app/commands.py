@@ -0,0 +1,64 @@
+# app/commands.py
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("cleanup-expired-plans")
+@with_appcontext
+def cleanup_expired_plans_command():
+    """ลบแผนที่หมดอายุของทุก user แล้ว reschedule คนละครั้ง"""
+    from app.services.user_service import UserUpdateService
+    count = UserUpdateService.cleanup_all_expired_plans()
+    click.echo(f"cleanup expired plans: rescheduled {count} users")
+
+
+@click.command("reschedule-worker")
+@with_appcontext
+def reschedule_worker_command():
+    """รัน worker ของคิว reschedule (RESCHEDULE_MODE=db) เป็น process แยก"""
+    from flask import current_app
+    from app.services.reschedule_service import DbRescheduleQueue
+    queue = DbRescheduleQueue(current_app._get_current_object())
+    click.echo(f"reschedule worker {queue.worker_id} started ({queue.workers} threads)")
+    queue.start()
+    try:
+        for thread in queue.threads:
+            thread.join()
+    except KeyboardInterrupt:
+        queue.stopped.set()
+
+
+@click.command("outbox-send")
+@click.option("--forever", is_flag=True, help="วน drain ทุก OUTBOX_POLL_SECONDS วินาทีไม่หยุด")
+@with_appcontext
+def outbox_send_command(forever):
+    """ส่งอีเมลที่ค้างใน email outbox (ครั้งเดียว หรือ --forever เป็น process sender แยก)"""
+    from flask import current_app
+    from app.notification.outbox import OutboxSender
+    sender = OutboxSender(current_app._get_current_object())
+    if not forever:
+        click.echo(f"outbox: {sender.drain()}")
+        return
+    click.echo(f"outbox sender {sender.sender_id} started")
+    try:
+        sender.drain_forever()
+    except KeyboardInterrupt:
+        sender.stopped.set()
+
+
+@click.command("stats-rebuild")
+@click.option("--user-id", type=int, default=None, help="สร้างใหม่เฉพาะ user นี้ (ไม่ใส่คือทุก user)")
+@with_appcontext
+def stats_rebuild_command(user_id):
+    """สร้าง rollup user_daily_stats ใหม่จาก daily_allocations (เช่นหลังเปิด STATS_ROLLUP)"""
+    from app.services.stats_service import StatsService
+    count = StatsService.rebuild(user_id)
+    click.echo(f"user_daily_stats: {count} rows")
+
+
+def register_commands(app):
+    """ผูก CLI command ทั้งหมดเข้ากับ app (ใช้ผ่าน flask <command>)"""
+    app.cli.add_command(cleanup_expired_plans_command)
+    app.cli.add_command(reschedule_worker_command)
+    app.cli.add_command(outbox_send_command)
+    app.cli.add_command(stats_rebuild_command)
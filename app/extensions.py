@@ -1,9 +1,28 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_mail import Mail
 from flask_login import LoginManager
 
 db = SQLAlchemy()
-migrate = Migrate()
-mail = Mail()
 login_manager = LoginManager()
+
+# Flask-Migrate (import alembic) กับ Flask-Mail (import smtplib/email) ไม่ผูกตอน create_app
+# process ที่ใช้จริงเรียก init_migrate / init_mail เอง
+mail = None
+
+
+def init_migrate(app):
+    """ผูก Flask-Migrate กับ app (flask CLI และ run.py ที่ต้อง upgrade DB ตอนบูต)"""
+    from flask_migrate import Migrate
+    if "migrate" not in app.extensions:
+        Migrate(app, db)
+    return app.extensions["migrate"]
+
+
+def init_mail(app):
+    """คืน Flask-Mail ที่ผูกกับ app แล้ว (import และอ่าน MAIL_* config ครั้งแรกที่ต้องส่งอีเมล)"""
+    global mail
+    if mail is None:
+        from flask_mail import Mail
+        mail = Mail()
+    if "mail" not in app.extensions:
+        mail.init_app(app)
+    return mail
@@ -0,0 +1,250 @@
+# app/metrics.py
+import os
+import time
+import threading
+from collections import defaultdict
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# เปิด /metrics และเก็บ metric ต่อ request (ปิดไว้เป็นค่าเริ่มต้น)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+
+# bucket (วินาที) ของ histogram latency
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """
+    เก็บ metric ต่อ route (method, url rule) ในหน่วยความจำของ process นี้
+    - latency histogram, จำนวน request ต่อ status
+    - จำนวน SQL statement, เวลา SQL, แถวที่ fetch จากผล query / แถวที่ DML แก้, จำนวน commit
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.latency_buckets = defaultdict(lambda: [0] * len(self.buckets))
+        self.latency_sum = defaultdict(float)
+        self.latency_count = defaultdict(int)
+        self.sql = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, method, route, status, seconds, stats):
+        key = (method, route)
+        with self.lock:
+            self.requests[(method, route, status)] += 1
+            counts = self.latency_buckets[key]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            self.latency_sum[key] += seconds
+            self.latency_count[key] += 1
+            for name, value in stats.items():
+                self.sql[key][name] += value
+
+    def render(self, extra=()):
+        """คืน metric ทั้งหมดในรูปแบบ Prometheus text (version 0.0.4)"""
+        lines = []
+
+        def labels(**kw):
+            return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in kw.items()) + "}"
+
+        with self.lock:
+            lines += ["# HELP app_requests_total HTTP requests by route and status",
+                      "# TYPE app_requests_total counter"]
+            for (method, route, status), value in sorted(self.requests.items()):
+                lines.append(f"app_requests_total{labels(method=method, route=route, status=status)} {value}")
+
+            lines += ["# HELP app_request_duration_seconds Request latency",
+                      "# TYPE app_request_duration_seconds histogram"]
+            for (method, route), counts in sorted(self.latency_buckets.items()):
+                for bound, value in zip(self.buckets, counts):
+                    lines.append(f"app_request_duration_seconds_bucket{labels(method=method, route=route, le=bound)} {value}")
+                count = self.latency_count[(method, route)]
+                lines.append(f"app_request_duration_seconds_bucket{labels(method=method, route=route, le='+Inf')} {count}")
+                lines.append(f"app_request_duration_seconds_sum{labels(method=method, route=route)} {self.latency_sum[(method, route)]:.6f}")
+                lines.append(f"app_request_duration_seconds_count{labels(method=method, route=route)} {count}")
+
+            for name, help_text in SQL_METRICS:
+                lines += [f"# HELP app_request_{name}_total {help_text}",
+                          f"# TYPE app_request_{name}_total counter"]
+                for (method, route), stats in sorted(self.sql.items()):
+                    value = stats.get(name, 0)
+                    value = f"{value:.6f}" if isinstance(value, float) and not value.is_integer() else int(value)
+                    lines.append(f"app_request_{name}_total{labels(method=method, route=route)} {value}")
+
+        for name, kind, help_text, samples in extra:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for sample_labels, value in samples:
+                lines.append(f"{name}{labels(**sample_labels) if sample_labels else ''} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# metric SQL ต่อ request: (ชื่อ, คำอธิบาย)
+SQL_METRICS = (
+    ("sql_statements", "SQL statements executed"),
+    ("sql_seconds", "Time spent in SQL statements"),
+    ("sql_rows_returned", "Rows fetched from statement results (ORM and Core)"),
+    ("sql_rows_affected", "Rows affected by INSERT/UPDATE/DELETE"),
+    ("db_commits", "Database transaction commits"),
+)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def current_stats():
+    """dict metric SQL ของ request ปัจจุบัน (None ถ้าไม่ได้อยู่ใน request ที่เก็บ metric)"""
+    if not has_request_context():
+        return None
+    return g.get("_metrics")
+
+
+class CountingCursor:
+    """
+    หุ้ม DBAPI cursor ให้นับแถวที่ fetch (fetchone / fetchmany / fetchall) ลง stats["sql_rows_returned"]
+    นับทุก query ที่อ่านผลจริง ทั้ง ORM และ Core select() (แถวที่ไม่ได้ fetch ไม่นับ)
+    """
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._stats["sql_rows_returned"] += 1
+            yield row
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats["sql_rows_returned"] += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats["sql_rows_returned"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats["sql_rows_returned"] += len(rows)
+        return rows
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is None:
+        return
+    starts = conn.info.get("_metrics_start")
+    if starts:
+        stats["sql_seconds"] += time.perf_counter() - starts.pop()
+    stats["sql_statements"] += 1
+    if context is None:
+        return
+    if (context.isinsert or context.isupdate or context.isdelete) and cursor.rowcount > 0:
+        stats["sql_rows_affected"] += cursor.rowcount
+    if cursor.description is not None:
+        # CursorResult อ่านแถวผ่าน context.cursor (สร้างหลัง event นี้) → นับตอน fetch
+        context.cursor = CountingCursor(cursor, stats)
+
+
+def _on_commit(conn):
+    stats = current_stats()
+    if stats is not None:
+        stats["db_commits"] += 1
+
+
+_listeners_installed = False
+
+
+def install_listeners():
+    """ผูก SQLAlchemy event ของทุก engine ครั้งเดียวต่อ process"""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "commit", _on_commit)
+    _listeners_installed = True
+
+
+def app_metrics():
+    """metric ของ service ที่เก็บไว้แล้ว (WRITE_STATS, SLOTS_CACHE, USER_CACHE, email outbox, password hasher) ในรูป (name, type, help, samples)"""
+    from app.services.schedule_service import WRITE_STATS, SLOTS_CACHE
+    from app.services.password_hasher import PASSWORD_HASHER
+    from app.services.user_cache import USER_CACHE
+    from app.notification.outbox import OutboxService, OUTBOX_STATS
+    cache = SLOTS_CACHE.stats()
+    users = USER_CACHE.stats()
+    outbox = OutboxService.counts()
+    return [
+        ("app_schedule_rows_written_total", "counter", "DailyAllocations rows written by save_schedule",
+         [({"kind": kind}, WRITE_STATS.get(kind, 0)) for kind in ("inserted", "updated", "deleted")]),
+        ("app_slots_cache_requests_total", "counter", "calculate_slots preview cache lookups",
+         [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]),
+        ("app_slots_cache_evictions_total", "counter", "calculate_slots preview cache evictions",
+         [(None, cache["evictions"])]),
+        ("app_slots_cache_entries", "gauge", "calculate_slots preview cache size",
+         [(None, cache["size"])]),
+        ("app_user_cache_requests_total", "counter", "user_loader column cache lookups",
+         [({"result": "hit"}, users["hits"]), ({"result": "miss"}, users["misses"])]),
+        ("app_user_cache_entries", "gauge", "user_loader column cache size",
+         [(None, users["size"])]),
+        ("app_email_outbox_messages", "gauge", "email_outbox rows by status",
+         [({"status": status}, count) for status, count in outbox.items()]),
+        ("app_email_outbox_deliveries_total", "counter", "email outbox delivery results in this process",
+         [({"result": result}, OUTBOX_STATS.get(result, 0)) for result in ("sent", "retried", "failed")]),
+        ("app_password_operations_total", "counter", "password hash / verify / rehash calls and busy rejections",
+         [({"op": op}, PASSWORD_HASHER.stats.get(op, 0)) for op in ("hash", "verify", "rehash", "busy")]),
+    ]
+
+
+def init_metrics(app):
+    """
+    ผูก instrumentation เข้ากับ app ถ้าเปิด METRICS_ENABLED (หรือ app.config["METRICS_ENABLED"])
+    - before_request เริ่มจับเวลา, บันทึก metric ตอน response ปิด (call_on_close)
+      → route ที่ stream body (stream_with_context เช่น /api/schedule.ics) นับ SQL ระหว่าง stream ด้วย
+    - GET /metrics คืนค่าในรูปแบบ Prometheus (ค่าแยกต่อ process)
+    """
+    app.config.setdefault("METRICS_ENABLED", METRICS_ENABLED)
+    if not app.config["METRICS_ENABLED"]:
+        return None
+
+    install_listeners()
+    registry = MetricsRegistry()
+    app.extensions["metrics"] = registry
+
+    @app.before_request
+    def start_request_metrics():
+        g._metrics_start = time.perf_counter()
+        g._metrics = defaultdict(float)
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = g.get("_metrics")
+        start = g.get("_metrics_start")
+        if stats is None or start is None or request.endpoint == "metrics":
+            return response
+        method = request.method
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        status = response.status_code
+        # g._metrics ยังอยู่ระหว่าง stream (stream_with_context) → SQL ที่ body generator ยิงนับเข้า stats เดียวกัน
+        response.call_on_close(
+            lambda: registry.observe(method, route, status, time.perf_counter() - start, stats)
+        )
+        return response
+
+    @app.route("/metrics", endpoint="metrics")
+    def metrics():
+        return Response(registry.render(app_metrics()), mimetype="text/plain; version=0.0.4")
+
+    return registry
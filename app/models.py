@@ -1,13 +1,14 @@
 from . import db
-from app import login_manager
 from datetime import date
 from flask_login import UserMixin
 from sqlalchemy import CheckConstraint
+from sqlalchemy.orm import validates
 
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+def login_key(value):
+    """รูปแบบที่ใช้ค้นหา username / email ตอน login (ไม่สนตัวพิมพ์เล็กใหญ่)"""
+    return value.lower() if value is not None else None
+
 
 class User(db.Model, UserMixin):
     __tablename__ = "users"
@@ -18,10 +19,16 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(100), nullable=False)
     password = db.Column(db.String(200), nullable=False)
     email_notifications = db.Column(db.Boolean, default=True)
+    # username / email ตัวพิมพ์เล็กพร้อม index สำหรับค้นหาตอน login (ตั้งค่าให้อัตโนมัติเมื่อกำหนด username / email)
+    # email_lower เป็น unique: สมัครด้วย email ที่ต่างกันแค่ตัวพิมพ์ไม่ได้
+    email_lower = db.Column(db.String(200), nullable=False, unique=True, index=True)
+    username_lower = db.Column(db.String(100), nullable=False, index=True)
     # record attbruite
     daily_read_hours = db.Column(db.Integer, default=3)
     latest_exam_date = db.Column(db.Date, default=None)
     last_cleanup_date = db.Column(db.Date, nullable=True)
+    # เพิ่มขึ้นทุกครั้งที่ plans/allocations ของ user เปลี่ยน (ใช้ทำ ETag ของ /api/schedule)
+    schedule_version = db.Column(db.Integer, default=0, server_default="0", nullable=False)
     # bind plans
     reading_plans = db.relationship('ReadingPlans', backref='user', lazy=True)
 
@@ -30,6 +37,11 @@ class User(db.Model, UserMixin):
         CheckConstraint('daily_read_hours >= 0 AND daily_read_hours <= 24', name='daily_read_hours_range'), 
     )
 
+    @validates("email", "username")
+    def _set_login_key(self, key, value):
+        setattr(self, f"{key}_lower", login_key(value))
+        return value
+
 
 class ReadingPlans(db.Model):
     __tablename__ = "reading_plans"
@@ -80,6 +92,17 @@ class DailyAllocations(db.Model):
     plan = db.relationship("ReadingPlans", back_populates="daily_allocations")
 
     exam_name_snapshot = db.Column(db.String(100))
+
+    # index สำหรับ query ที่เรียกบ่อย (กรองด้วย user_id + date และ/หรือ feedback_done)
+    # pending index เป็น partial index บน backend ที่รองรับ (sqlite/postgresql), mysql จะเป็น composite ธรรมดา
+    __table_args__ = (
+        db.Index('ix_daily_allocations_user_date', 'user_id', 'date'),
+        db.Index(
+            'ix_daily_allocations_pending', 'user_id', 'feedback_done', 'date',
+            sqlite_where=(feedback_done == False),
+            postgresql_where=(feedback_done == False),
+        ),
+    )
     
 
     # bind plan
@@ -90,6 +113,81 @@ class DailyAllocations(db.Model):
 
 
 
+class RescheduleJobs(db.Model):
+    __tablename__ = "reschedule_jobs"
+
+    # 1 แถวต่อ user: คิว reschedule ที่หลาย process ใช้ร่วมกัน (RESCHEDULE_MODE=db)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    requested_version = db.Column(db.Integer, nullable=False, default=0)
+    completed_version = db.Column(db.Integer, nullable=False, default=0)
+    # จำนวนครั้งที่รันล้มติดกัน (reset เมื่อสำเร็จหรือมี trigger ใหม่), ครบ RESCHEDULE_MAX_ATTEMPTS = เลิกลอง
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # เวลาที่ worker หยิบไปทำได้ (None = ไม่มีงานรอ)
+    due_at = db.Column(db.DateTime, nullable=True)
+    # worker ที่กำลังทำอยู่ (lease หมดอายุตาม claimed_at)
+    claimed_by = db.Column(db.String(64), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    # วันจำลองของ trigger ล่าสุด (None = ใช้วันจริงตอนรัน)
+    simulated_date = db.Column(db.Date, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_reschedule_jobs_due_at', 'due_at'),
+    )
+
+
+class SchedulerLeases(db.Model):
+    __tablename__ = "scheduler_leases"
+
+    # 1 แถวต่อ lock: process ที่ถือ lease อยู่ (holder) เป็น leader ของงาน cron ชื่อนั้น
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(64), nullable=True)
+    # lease หมดอายุ (leader ตายหรือหยุด heartbeat) → process อื่นยึดต่อได้
+    expires_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+
+class EmailOutbox(db.Model):
+    __tablename__ = "email_outbox"
+
+    # อีเมลที่รอส่ง: request / batch_job เขียนลงตารางนี้ แล้ว OutboxSender ส่งจริงทีหลัง
+    id = db.Column(db.Integer, primary_key=True)
+    # กันเขียนข้อความเดียวกันซ้ำ เช่น "digest:2025-10-23:42" (None = ไม่ตรวจซ้ำ)
+    idempotency_key = db.Column(db.String(128), unique=True, nullable=True)
+    to_email = db.Column(db.String(200), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body_html = db.Column(db.Text, nullable=True)
+    body_text = db.Column(db.Text, nullable=True)
+    # pending → sending → sent (หรือ failed เมื่อลองครบ OUTBOX_MAX_ATTEMPTS)
+    status = db.Column(db.String(16), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False)
+    # sender ที่กำลังส่งอยู่ (lease หมดอายุตาม claimed_at)
+    claimed_by = db.Column(db.String(64), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+
+class UserDailyStats(db.Model):
+    __tablename__ = "user_daily_stats"
+
+    # rollup ของ feedback ต่อ user ต่อวัน (วันของ allocation) สำหรับ /api/stats
+    # Feedback.submit_feedback เพิ่มค่าทีละ feedback, flask stats-rebuild สร้างใหม่จาก daily_allocations
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    confirmed_hours = db.Column(db.Integer, nullable=False, default=0)
+    read_in_time = db.Column(db.Integer, nullable=False, default=0)
+    harder = db.Column(db.Integer, nullable=False, default=0)
+    easier = db.Column(db.Integer, nullable=False, default=0)
+    read_all = db.Column(db.Integer, nullable=False, default=0)
+
+
+
 
 
 
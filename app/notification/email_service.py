@@ -1,10 +1,142 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
 from flask_mail import Message
-from app.extensions import mail
+from app.extensions import init_mail
+
+logger = logging.getLogger(__name__)
+
+# จำนวน thread (= จำนวน SMTP connection ที่เปิดค้างไว้) ตอนส่งอีเมลทีละมาก ๆ
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+# ส่งซ้ำได้กี่ครั้งต่อข้อความ (เปิด connection ใหม่ทุกครั้งที่ลองใหม่)
+EMAIL_RETRIES = int(os.getenv("EMAIL_RETRIES", "2"))
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "0.5"))
+# ปิดแล้วเปิด connection ใหม่ทุก ๆ N ข้อความ (server ส่วนใหญ่จำกัดจำนวนต่อ session)
+EMAIL_MESSAGES_PER_CONNECTION = int(os.getenv("EMAIL_MESSAGES_PER_CONNECTION", "100"))
+
 
 def send_email(to_email, subject, body_html):
+    mail = init_mail(current_app)
     msg = Message(
         subject=subject,
         recipients=[to_email],
         html=body_html
     )
     mail.send(msg)
+
+
+class MailDelivery:
+    """
+    ส่งอีเมลจำนวนมากผ่าน thread pool โดยแต่ละ thread ถือ SMTP connection (mail.connect()) ค้างไว้ใช้ซ้ำ
+    - retry ต่อข้อความ (ปิด connection ที่เสียแล้วเปิดใหม่)
+    - เก็บสถิติ sent / failed / retries / connections / เวลา
+    ใช้:
+        with MailDelivery(app) as delivery:
+            delivery.submit(to, subject, html)
+        delivery.stats
+    """
+    def __init__(self, app=None, workers=EMAIL_WORKERS, retries=EMAIL_RETRIES,
+                 backoff=EMAIL_RETRY_BACKOFF, per_connection=EMAIL_MESSAGES_PER_CONNECTION):
+        self.app = app or current_app._get_current_object()
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.per_connection = per_connection
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        # จำกัดงานที่ค้างในคิว ให้หน่วยความจำคงที่แม้ส่งเป็นหมื่นฉบับ
+        self.slots = threading.BoundedSemaphore(workers * 4)
+        self.executor = None
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "connections": 0, "seconds": 0.0, "per_second": 0.0}
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mail")
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.count >= self.per_connection:
+            self._drop_connection()
+            conn = init_mail(self.app).connect()
+            conn.__enter__()
+            self.local.conn = conn
+            self.local.count = 0
+            with self.lock:
+                self.connections.append(conn)
+                self.stats["connections"] += 1
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self.local, "conn", None)
+        self.local.conn = None
+        if conn is None:
+            return
+        with self.lock:
+            if conn in self.connections:
+                self.connections.remove(conn)
+        try:
+            conn.__exit__(None, None, None)
+        except Exception:
+            pass
+
+    def _send(self, to_email, subject, body_html, body_text=None):
+        try:
+            with self.app.app_context():
+                init_mail(self.app)
+                msg = Message(subject=subject, recipients=[to_email], html=body_html, body=body_text)
+                for attempt in range(self.retries + 1):
+                    try:
+                        self._connection().send(msg)
+                        self.local.count += 1
+                        with self.lock:
+                            self.stats["sent"] += 1
+                        return True
+                    except Exception as e:
+                        self._drop_connection()
+                        if attempt == self.retries:
+                            logger.error("send to %s failed after %d attempts: %s", to_email, attempt + 1, e)
+                            with self.lock:
+                                self.stats["failed"] += 1
+                            raise
+                        with self.lock:
+                            self.stats["retries"] += 1
+                        time.sleep(self.backoff * (attempt + 1))
+        finally:
+            self.slots.release()
+
+    def submit(self, to_email, subject, body_html=None, body_text=None):
+        """
+        ส่งเข้าคิว (block ถ้างานค้างเต็ม)
+        คืน Future: ได้ True เมื่อส่งสำเร็จ หรือ exception ของครั้งสุดท้ายเมื่อลองครบแล้วยังไม่สำเร็จ
+        """
+        self.slots.acquire()
+        return self.executor.submit(self._send, to_email, subject, body_html, body_text)
+
+    def close(self):
+        """รอส่งให้หมด ปิดทุก connection และสรุปสถิติ"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            try:
+                conn.__exit__(None, None, None)
+            except Exception:
+                pass
+        if self.started is not None:
+            seconds = time.perf_counter() - self.started
+            self.stats["seconds"] = round(seconds, 3)
+            self.stats["per_second"] = round(self.stats["sent"] / seconds, 1) if seconds else 0.0
+        logger.info("mail delivery: %s", self.stats)
+        return self.stats
@@ -0,0 +1,136 @@
+# app/notification/leader.py
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from functools import wraps
+from sqlalchemy import select, update, insert, or_
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import SchedulerLeases
+from app.utils.utils import worker_id
+
+logger = logging.getLogger(__name__)
+
+# ชื่อ lock ของงาน cron ใน scheduler_leases
+SCHEDULER_LEASE_NAME = os.getenv("SCHEDULER_LEASE_NAME", "notification-scheduler")
+# leader ที่ไม่ต่อ lease ภายในเวลานี้ (process ตาย/ค้าง) → process อื่นยึดเป็น leader แทน
+SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "60"))
+# ต่อ lease / พยายามเป็น leader ทุก ๆ กี่วินาที (ควรน้อยกว่า lease หลายเท่า)
+SCHEDULER_HEARTBEAT_SECONDS = float(os.getenv("SCHEDULER_HEARTBEAT_SECONDS", "15"))
+
+
+class LeaderElection:
+    """
+    เลือก leader ระหว่างหลาย process ด้วยแถวเดียวในตาราง scheduler_leases
+    - try_acquire: UPDATE แบบมีเงื่อนไข (เป็นของเราอยู่แล้ว หรือ lease หมดอายุ) ถ้าไม่มีแถวก็ INSERT
+      DB ตัดสินให้ผู้ชนะได้คนเดียว ไม่ต้องพึ่ง lock ในหน่วยความจำ
+    - heartbeat thread ต่อ lease เป็นระยะ, leader ที่หยุดต่อ lease จะเสียสิทธิ์เมื่อ lease หมดอายุ
+    - leader_only ห่อ job ให้รันเฉพาะตอนที่ process นี้ถือ lease อยู่
+    """
+    def __init__(self, app, name=SCHEDULER_LEASE_NAME, lease=SCHEDULER_LEASE_SECONDS,
+                 heartbeat=SCHEDULER_HEARTBEAT_SECONDS):
+        self.app = app
+        self.name = name
+        self.lease = timedelta(seconds=lease)
+        self.heartbeat = heartbeat
+        self.holder = worker_id()
+        self.is_leader = False
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def try_acquire(self):
+        """ยึดหรือต่อ lease (ต้องอยู่ใน app context) คืน True ถ้า process นี้เป็น leader"""
+        leases = SchedulerLeases.__table__
+        now = datetime.utcnow()
+        values = dict(holder=self.holder, expires_at=now + self.lease, heartbeat_at=now)
+        try:
+            acquired = db.session.execute(
+                update(leases)
+                .where(leases.c.name == self.name,
+                       or_(leases.c.holder == self.holder,
+                           leases.c.holder.is_(None),
+                           leases.c.expires_at < now))
+                .values(**values)
+            ).rowcount == 1
+            if not acquired:
+                exists = db.session.execute(
+                    select(leases.c.name).where(leases.c.name == self.name)
+                ).first()
+                if exists is None:
+                    try:
+                        with db.session.begin_nested():
+                            db.session.execute(insert(leases).values(name=self.name, **values))
+                        acquired = True
+                    except IntegrityError:
+                        # process อื่น insert ไปก่อน → process นั้นเป็น leader
+                        acquired = False
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if acquired != self.is_leader:
+            logger.info("%s leadership of %s (%s)", "acquired" if acquired else "lost", self.name, self.holder)
+        self.is_leader = acquired
+        return acquired
+
+    def release(self):
+        """คืน lease (ตอนปิด process) ให้ process อื่นยึดต่อได้ทันทีไม่ต้องรอหมดอายุ"""
+        leases = SchedulerLeases.__table__
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    update(leases)
+                    .where(leases.c.name == self.name, leases.c.holder == self.holder)
+                    .values(holder=None, expires_at=None)
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception("release lease %s failed", self.name)
+            finally:
+                db.session.remove()
+        self.is_leader = False
+
+    def beat(self):
+        """ต่อ lease 1 ครั้งใน app context ของ app (error ใด ๆ ถือว่าไม่ใช่ leader)"""
+        with self.app.app_context():
+            try:
+                return self.try_acquire()
+            except Exception:
+                logger.exception("heartbeat of lease %s failed", self.name)
+                self.is_leader = False
+                return False
+            finally:
+                db.session.remove()
+
+    def heartbeat_forever(self):
+        while not self.stopped.is_set():
+            self.beat()
+            self.stopped.wait(self.heartbeat)
+
+    def start(self):
+        """เริ่ม heartbeat thread (ครั้งเดียวต่อ instance)"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.heartbeat_forever, name=f"lease-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.heartbeat)
+            self.thread = None
+        if self.is_leader:
+            self.release()
+
+    def leader_only(self, func):
+        """ห่อ job ของ scheduler: ต่อ lease ก่อนรัน แล้วรันเฉพาะเมื่อเป็น leader (ไม่ใช่ leader คืน None)"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.beat():
+                logger.debug("skip %s: not leader of %s", func.__name__, self.name)
+                return None
+            return func(*args, **kwargs)
+        return wrapper
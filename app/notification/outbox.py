@@ -0,0 +1,238 @@
+# app/notification/outbox.py
+import os
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import wait
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, insert, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import EmailOutbox
+from app.utils.utils import worker_id
+from app.notification.email_service import MailDelivery, EMAIL_WORKERS, EMAIL_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# จำนวนข้อความที่ sender claim ต่อรอบ
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+# ส่งไม่สำเร็จครบกี่รอบแล้วเลิก (status = failed)
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# รอก่อนลองใหม่: รอบที่ n รอ backoff * 2^(n-1) วินาที
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+# sender ตรวจ outbox ทุก ๆ กี่วินาที
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+# ข้อความที่ค้าง status sending นานกว่านี้ (sender ตาย) ให้ sender อื่นเอาไปส่งต่อ
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+
+OUTBOX_STATUSES = ("pending", "sending", "sent", "failed")
+
+# metric สะสมของ process นี้: sent / retried / failed
+OUTBOX_STATS = defaultdict(int)
+
+
+class OutboxService:
+    """
+    เขียนอีเมลลงตาราง email_outbox แทนการส่ง SMTP ตรง ๆ ใน request
+    - idempotency key ซ้ำจะถูกข้าม (เช่น digest ของ user เดียวกันในวันเดียวกัน)
+    - OutboxSender เป็นคนส่งจริงทีหลัง
+    """
+    @staticmethod
+    def enqueue(to_email, subject, body_html=None, body_text=None, key=None, commit=True):
+        """เขียนอีเมล 1 ฉบับ คืน True ถ้าเขียนใหม่ (False ถ้า key นี้มีอยู่แล้ว)"""
+        message = dict(to_email=to_email, subject=subject, body_html=body_html, body_text=body_text, key=key)
+        return OutboxService.enqueue_many([message], commit=commit) == 1
+
+    @staticmethod
+    def enqueue_many(messages, commit=True):
+        """
+        เขียนอีเมลหลายฉบับ (dict: to_email, subject, body_html, body_text, key)
+        - ตัด key ที่มีอยู่แล้วออกด้วย SELECT 1 ครั้ง แล้ว INSERT ที่เหลือใน statement เดียว
+        - ถ้าชนกับ process อื่นระหว่างนั้น (IntegrityError) ค่อย insert ทีละแถว
+        คืนจำนวนฉบับที่เขียนใหม่
+        """
+        outbox = EmailOutbox.__table__
+        now = datetime.utcnow()
+        rows, keys = [], set()
+        for m in messages:
+            key = m.get("key")
+            if key is not None:
+                if key in keys:
+                    continue
+                keys.add(key)
+            rows.append(dict(
+                idempotency_key=key, to_email=m["to_email"], subject=m["subject"],
+                body_html=m.get("body_html"), body_text=m.get("body_text"),
+                status="pending", attempts=0, next_attempt_at=now, created_at=now,
+            ))
+        if keys:
+            existing = set(db.session.execute(
+                select(outbox.c.idempotency_key).where(outbox.c.idempotency_key.in_(keys))
+            ).scalars())
+            rows = [r for r in rows if r["idempotency_key"] not in existing]
+
+        added = 0
+        if rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(outbox), rows)
+                added = len(rows)
+            except IntegrityError:
+                for row in rows:
+                    try:
+                        with db.session.begin_nested():
+                            db.session.execute(insert(outbox).values(**row))
+                        added += 1
+                    except IntegrityError:
+                        pass
+        if commit:
+            db.session.commit()
+        return added
+
+    @staticmethod
+    def counts():
+        """จำนวนข้อความใน outbox แยกตาม status"""
+        outbox = EmailOutbox.__table__
+        counts = dict.fromkeys(OUTBOX_STATUSES, 0)
+        counts.update(db.session.execute(
+            select(outbox.c.status, func.count()).group_by(outbox.c.status)
+        ).all())
+        return counts
+
+
+class OutboxSender:
+    """
+    ส่งอีเมลจาก email_outbox เป็น batch
+    - claim: pending ที่ถึง next_attempt_at (หรือ sending ที่ lease หมด) → sending + claimed_by
+    - ส่งผ่าน MailDelivery (SMTP connection pool) ตัวเดียวตลอดการ drain
+    - สำเร็จ → sent, ไม่สำเร็จ → pending พร้อม backoff หรือ failed เมื่อครบ max_attempts
+    ข้อความที่ส่งแล้วแต่ sender ตายก่อนบันทึก sent จะถูกส่งซ้ำหลัง lease หมด (at-least-once)
+    """
+    def __init__(self, app, batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 backoff=OUTBOX_BACKOFF_SECONDS, poll=OUTBOX_POLL_SECONDS, lease=OUTBOX_LEASE_SECONDS,
+                 workers=EMAIL_WORKERS, retries=EMAIL_RETRIES):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll = poll
+        self.lease = timedelta(seconds=lease)
+        self.workers = workers
+        # retry ทันทีภายใน MailDelivery (เช่น connection หลุด) ก่อนจะนับเป็น 1 attempt ของ outbox
+        self.retries = retries
+        self.sender_id = worker_id()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def claim(self):
+        """claim ข้อความที่ถึงเวลาส่งไม่เกิน batch_size ฉบับ (ต้องอยู่ใน app context)"""
+        outbox = EmailOutbox.__table__
+        now = datetime.utcnow()
+        ready = or_(
+            and_(outbox.c.status == "pending", outbox.c.next_attempt_at <= now),
+            and_(outbox.c.status == "sending", outbox.c.claimed_at < now - self.lease),
+        )
+        ids = db.session.execute(
+            select(outbox.c.id).where(ready)
+            .order_by(outbox.c.next_attempt_at, outbox.c.id)
+            .limit(self.batch_size)
+        ).scalars().all()
+        if not ids:
+            db.session.rollback()
+            return []
+        # sender อื่นที่ claim แถวเดียวกันไปก่อนจะทำให้เงื่อนไข ready ไม่ตรงแล้ว
+        db.session.execute(
+            update(outbox).where(outbox.c.id.in_(ids), ready)
+            .values(status="sending", claimed_by=self.sender_id, claimed_at=now)
+        )
+        rows = db.session.execute(
+            select(outbox.c.id, outbox.c.to_email, outbox.c.subject,
+                   outbox.c.body_html, outbox.c.body_text, outbox.c.attempts)
+            .where(outbox.c.id.in_(ids), outbox.c.status == "sending", outbox.c.claimed_by == self.sender_id)
+        ).all()
+        db.session.commit()
+        return rows
+
+    def finish(self, results):
+        """บันทึกผลส่ง: results = [(row, error หรือ None)] คืนสถิติของ batch นี้"""
+        outbox = EmailOutbox.__table__
+        now = datetime.utcnow()
+        stats = {"sent": 0, "retried": 0, "failed": 0}
+        mine = and_(outbox.c.claimed_by == self.sender_id, outbox.c.status == "sending")
+        sent = [row.id for row, error in results if error is None]
+        if sent:
+            db.session.execute(
+                update(outbox).where(outbox.c.id.in_(sent), mine)
+                .values(status="sent", sent_at=now, attempts=outbox.c.attempts + 1,
+                        claimed_by=None, claimed_at=None, last_error=None)
+            )
+            stats["sent"] = len(sent)
+        for row, error in results:
+            if error is None:
+                continue
+            attempts = row.attempts + 1
+            values = dict(attempts=attempts, claimed_by=None, claimed_at=None, last_error=str(error)[:500])
+            if attempts >= self.max_attempts:
+                values["status"] = "failed"
+                stats["failed"] += 1
+            else:
+                values["status"] = "pending"
+                values["next_attempt_at"] = now + timedelta(seconds=self.backoff * 2 ** (attempts - 1))
+                stats["retried"] += 1
+            db.session.execute(update(outbox).where(outbox.c.id == row.id, mine).values(**values))
+        db.session.commit()
+        for key, value in stats.items():
+            OUTBOX_STATS[key] += value
+        return stats
+
+    def claim_batch(self):
+        with self.app.app_context():
+            try:
+                return self.claim()
+            finally:
+                db.session.remove()
+
+    def drain(self):
+        """ส่งทุกข้อความที่ถึงเวลาจนหมด คืนสถิติ sent / retried / failed / batches"""
+        total = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+        rows = self.claim_batch()
+        if not rows:
+            # outbox ว่าง (กรณีส่วนใหญ่ของ job ที่รันทุก ๆ ไม่กี่วินาที) → ไม่ต้องเปิด SMTP connection
+            return total
+        with MailDelivery(self.app, workers=self.workers, retries=self.retries) as delivery:
+            while rows:
+                futures = [(row, delivery.submit(row.to_email, row.subject, row.body_html, row.body_text))
+                           for row in rows]
+                wait([future for _, future in futures])
+                with self.app.app_context():
+                    try:
+                        stats = self.finish([(row, future.exception()) for row, future in futures])
+                    finally:
+                        db.session.remove()
+                total["batches"] += 1
+                for key, value in stats.items():
+                    total[key] += value
+                rows = [] if self.stopped.is_set() else self.claim_batch()
+        logger.info("outbox drained: %s", total)
+        return total
+
+    def drain_forever(self):
+        while not self.stopped.is_set():
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("outbox sender error")
+            self.stopped.wait(self.poll)
+
+    def start(self):
+        """เริ่ม sender thread ใน process นี้"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.drain_forever, name="outbox-sender", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
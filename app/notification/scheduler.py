@@ -1,22 +1,80 @@
 # app/notification/scheduler.py
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from datetime import datetime
+import os
+import atexit
 import pytz, logging
-from app.notification.email_service import send_email
+from flask import current_app
+from app.notification.outbox import OutboxService, OutboxSender, OUTBOX_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
 
 BANGKOK_TZ = pytz.timezone("Asia/Bangkok")
 
+# จำนวนฉบับที่เขียนลง email outbox ต่อครั้ง (enqueue_many + commit)
+DIGEST_BATCH_SIZE = int(os.getenv("DIGEST_BATCH_SIZE", "500"))
+# จำนวนแถวต่อ batch ตอน stream users / summary (yield_per)
+DIGEST_YIELD_PER = int(os.getenv("DIGEST_YIELD_PER", "500"))
 
-def process_user(user, date_local):
-    """สร้างสรุปการอ่านของ user และส่งอีเมล"""
-    from app.routes.api.study import get_daily_summary 
-    try:
-        summary = get_daily_summary(user.id, date_local)
-        if summary["total_hours"] == 0:
-            return False
 
-        # ✅ HTML Template
-        body_html = f"""
+def iter_daily_summaries(date_local, batch_size=DIGEST_YIELD_PER):
+    """
+    stream (user, summary) ของทุก user ที่เปิด email_notifications สำหรับวันที่ date_local
+    - users: 1 query (id, username, email) เรียงตาม id แบบ stream บน connection ของตัวเอง
+    - summary ของทุก user: 1 query GROUP BY user_id, exam_name_snapshot เรียงตาม user_id (connection แยก, stream)
+    - merge สองสายตาม user_id (หน่วยความจำคงที่ ไม่ขึ้นกับจำนวน user)
+    ทั้งสอง cursor ไม่อยู่บน db.session → คนเรียกเขียน / commit ผ่าน db.session ระหว่าง stream ได้
+    (เช่น MySQL ที่ stream ด้วย unbuffered cursor: statement อื่นบน connection เดียวกันจะตัด cursor ทิ้ง)
+    summary มีรูปแบบเดียวกับ get_daily_summary
+    """
+    from sqlalchemy import select, func
+    from app.extensions import db
+    from app.models import User, DailyAllocations
+
+    users_query = (
+        select(User.id, User.username, User.email)
+        .where(User.email_notifications == True)
+        .order_by(User.id)
+    )
+
+    totals = (
+        select(
+            DailyAllocations.user_id,
+            DailyAllocations.exam_name_snapshot,
+            func.sum(DailyAllocations.slots).label("total_hours")
+        )
+        .join(User, User.id == DailyAllocations.user_id)
+        .where(DailyAllocations.date == date_local, User.email_notifications == True)
+        .group_by(DailyAllocations.user_id, DailyAllocations.exam_name_snapshot)
+        .order_by(DailyAllocations.user_id, DailyAllocations.exam_name_snapshot)
+    )
+
+    with db.engine.connect() as users_conn, db.engine.connect() as conn:
+        users = users_conn.execution_options(stream_results=True, yield_per=batch_size).execute(users_query)
+        rows = conn.execution_options(stream_results=True, yield_per=batch_size).execute(totals)
+        row = next(rows, None)
+        for user in users:
+            # ข้ามแถวของ user ที่ไม่อยู่ในสาย users (เช่นเพิ่งปิดแจ้งเตือนระหว่าง stream)
+            while row is not None and row.user_id < user.id:
+                row = next(rows, None)
+            subjects = []
+            while row is not None and row.user_id == user.id:
+                subjects.append({"name": row.exam_name_snapshot, "hours": row.total_hours})
+                row = next(rows, None)
+            yield user, {
+                "date": date_local.isoformat(),
+                "total_hours": sum(s["hours"] for s in subjects),
+                "subjects": subjects,
+            }
+
+
+DIGEST_SUBJECT = "สรุปการอ่านหนังสือวันนี้"
+
+
+def build_digest_html(user, date_local, summary):
+    """HTML ของอีเมลสรุปการอ่านประจำวัน"""
+    return f"""
         <html>
           <body style="font-family: Arial, sans-serif; color: #333;">
             <h2 style="color:#2c3e50;">📚 สรุปการอ่านประจำวันที่ {date_local}</h2>
@@ -40,26 +98,93 @@ def process_user(user, date_local):
         </html>
         """
 
-        send_email(user.email, "สรุปการอ่านหนังสือวันนี้", body_html)
+
+def digest_key(user, date_local):
+    """idempotency key ของ digest: 1 ฉบับต่อ user ต่อวัน"""
+    return f"digest:{date_local.isoformat()}:{user.id}"
+
+
+def process_user(user, date_local, summary=None):
+    """
+    สร้างสรุปการอ่านของ user แล้วเขียนลง email outbox (OutboxSender ส่งจริงทีหลัง)
+    - summary: ผลจาก iter_daily_summaries (ถ้าไม่ส่งมาจะ query ของ user คนนี้เอง)
+    """
+    from app.routes.api.study import get_daily_summary 
+    try:
+        if summary is None:
+            summary = get_daily_summary(user.id, date_local)
+        if summary["total_hours"] == 0:
+            return False
+
+        OutboxService.enqueue(user.email, DIGEST_SUBJECT, build_digest_html(user, date_local, summary),
+                              key=digest_key(user, date_local))
         return True
     except Exception as e:
-        logging.error(f"Error processing user {getattr(user, 'id', '?')}: {e}")
+        logger.error("error processing user %s: %s", getattr(user, 'id', '?'), e)
         return False
 
 
-def batch_job():
-    """ดึง users ที่เปิด email_notifications แล้วส่งสรุปให้ทุกคน"""
-    from app.models import User  # 👈 import ข้างในเพื่อเลี่ยง circular import
+def batch_job(app=None, date_local=None, batch_size=None, yield_per=None):
+    """
+    ส่งสรุปให้ทุก user ที่เปิด email_notifications
+    - stream จาก iter_daily_summaries (yield_per แถว) แล้วเขียนลง email outbox ทีละ batch_size ฉบับ
+      (key ต่อ user ต่อวัน → รันซ้ำในวันเดียวกันจะเขียนเฉพาะฉบับที่ยังไม่มี)
+    - จากนั้น drain outbox ทันที (SMTP connection pool + thread pool)
+    คืนสถิติ enqueued + ผลการส่ง
+    """
+    if app is not None:
+        with app.app_context():
+            return batch_job(date_local=date_local, batch_size=batch_size, yield_per=yield_per)
+
+    batch_size = batch_size or DIGEST_BATCH_SIZE
+    now_th = date_local or datetime.now(BANGKOK_TZ).date()
+    enqueued, pending = 0, []
+    for user, summary in iter_daily_summaries(now_th, batch_size=yield_per or DIGEST_YIELD_PER):
+        if summary["total_hours"] == 0:
+            continue
+        pending.append(dict(to_email=user.email, subject=DIGEST_SUBJECT,
+                            body_html=build_digest_html(user, now_th, summary), key=digest_key(user, now_th)))
+        if len(pending) >= batch_size:
+            enqueued += OutboxService.enqueue_many(pending)
+            pending = []
+    if pending:
+        enqueued += OutboxService.enqueue_many(pending)
+
+    stats = OutboxSender(current_app._get_current_object()).drain()
+    stats["enqueued"] = enqueued
+    return stats
 
-    now_th = datetime.now(BANGKOK_TZ).date()
-    users = User.query.filter_by(email_notifications=True).all()
 
-    for u in users:
-        process_user(u, now_th)
+def drain_outbox(sender):
+    """job ของ scheduler: ส่งอีเมลที่ค้างใน outbox (password reset, digest ที่ต้องลองใหม่)"""
+    return sender.drain()
 
 
-def start_scheduler():
-    """เริ่ม APScheduler ให้รัน batch_job ทุกวันเวลา 00:01 (เวลาไทย)"""
-    scheduler = BackgroundScheduler(timezone="Asia/Bangkok")
-    scheduler.add_job(batch_job, "cron", hour=0, minute=1)
-    scheduler.start()
\ No newline at end of file
+def start_scheduler(app, blocking=False):
+    """
+    เริ่ม APScheduler ให้รัน batch_job ทุกวันเวลา 00:01 (เวลาไทย) ใน app context ของ app
+    และ drain email outbox ทุก OUTBOX_POLL_SECONDS วินาที
+    - ทุก process ที่เรียกจะแข่งกันถือ lease ใน scheduler_leases มีแค่ leader ที่รัน job จริง
+    - blocking=True ใช้ BlockingScheduler (process worker แยก) จะไม่ return จนกว่าจะหยุด
+    คืน scheduler (แบบ background)
+    """
+    from app.notification.leader import LeaderElection
+
+    election = LeaderElection(app)
+    scheduler = (BlockingScheduler if blocking else BackgroundScheduler)(timezone="Asia/Bangkok")
+    scheduler.add_job(election.leader_only(batch_job), "cron", hour=0, minute=1,
+                      kwargs={"app": app}, id="batch_job", coalesce=True, max_instances=1)
+    scheduler.add_job(election.leader_only(drain_outbox), "interval", seconds=OUTBOX_POLL_SECONDS,
+                      kwargs={"sender": OutboxSender(app)}, id="drain_outbox", coalesce=True, max_instances=1)
+    app.extensions["scheduler"] = scheduler
+    app.extensions["leader_election"] = election
+
+    election.start()
+    atexit.register(election.stop)
+    logger.info("scheduler started (%s, lease holder %s)", "blocking" if blocking else "background", election.holder)
+    try:
+        scheduler.start()
+    finally:
+        if blocking:
+            election.stop()
+    return scheduler
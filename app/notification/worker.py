@@ -0,0 +1,31 @@
+# app/notification/worker.py
+"""
+รัน scheduler (งาน cron เช่น batch_job 00:01) เป็น process แยกจากเว็บ
+
+    SCHEDULER_MODE=worker gunicorn ...          # เว็บไม่เริ่ม scheduler เอง
+    python -m app.notification.worker           # process นี้รันงาน cron
+
+รันได้หลาย instance: ทุกตัวแข่งกันถือ lease ใน scheduler_leases มีแค่ leader ที่รัน job
+"""
+import os
+import logging
+
+from app import create_app
+from app.notification.scheduler import start_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    # ให้ create_app ไม่เริ่ม BackgroundScheduler ของตัวเอง
+    os.environ["SCHEDULER_MODE"] = "worker"
+    app = create_app()
+    logger.info("notification worker started")
+    try:
+        start_scheduler(app, blocking=True)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("notification worker stopped")
+
+
+if __name__ == "__main__":
+    main()
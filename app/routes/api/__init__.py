@@ -5,6 +5,7 @@ from .plan import plan_api
 from .schedule import schedule_api
 from .feedback import feedback_api
 from .study import study_api
+from .stats import stats_api
 
 __all__ = [
     'auth_api',
@@ -13,4 +14,5 @@ __all__ = [
     'schedule_api',
     'feedback_api',
     'study_api',
+    'stats_api',
 ]
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, session
-from sqlalchemy import or_
 from app.models import User
 from app.services.user_service import AuthService
+from app.services.password_hasher import PasswordHasherBusy
 from app.extensions import db
 
 auth_api = Blueprint('auth_api', __name__, url_prefix='/api/auth')
@@ -22,8 +22,8 @@ def register():
     if not username or not email or not password:
         return jsonify({'error': 'Missing fields'}), 400
     
-    # ตรวจสอบว่ามี email ซ้ำในระบบหรือไม่
-    if User.query.filter(User.email == email).first():
+    # ตรวจสอบว่ามี email ซ้ำในระบบหรือไม่ (ไม่สนตัวพิมพ์เล็กใหญ่ เหมือนตอน login)
+    if AuthService.find_by_email(email):
         return jsonify({'error': 'email already exists'}), 400
     
     user = User(username=username, email=email)
@@ -46,11 +46,8 @@ def login():
     username_or_email = data.get('username')
     password = data.get('password')
 
-    # หา user โดย username หรือ email
-    users = User.query.filter(
-        or_(User.username == username_or_email,
-            User.email == username_or_email)
-    ).all()
+    # หา user โดย username หรือ email (ไม่สนตัวพิมพ์เล็กใหญ่, ใช้ index)
+    users = AuthService.find_login_users(username_or_email)
     
     if len(users) > 1:
         return jsonify({'error': 'Duplicate username found, please use email to login'}), 400
@@ -58,7 +55,11 @@ def login():
     user = users[0] if users else None
 
     # ตรวจสอบรหัสผ่าน ถ้าถูกต้องจะเก็บ user_id ใน session
-    if user and AuthService.check_password(user, password):
+    try:
+        valid = user is not None and AuthService.check_password(user, password)
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
+    if valid:
         session['user_id'] = user.id
         return jsonify({'message': 'Login success'}), 200
     
@@ -84,7 +85,7 @@ def forgot():
     """
     data = request.get_json()
     email = data.get('email')
-    user = User.query.filter_by(email=email).first()
+    user = AuthService.find_by_email(email)
 
     # ตรวจสอบว่ามี email นี้ในระบบหรือไม่
     if not user:
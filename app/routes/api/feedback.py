@@ -1,15 +1,24 @@
-from flask import Blueprint, request, jsonify, session
+import logging
+from flask import Blueprint, request, jsonify
 from app.models import User, DailyAllocations
-from app.services.feedback_service import Feedback
+from app.services.feedback_service import Feedback, FEEDBACK_TYPES
+from app.services.reschedule_service import RescheduleService
+from app.services.user_cache import get_current_user
 
 feedback_api = Blueprint('feedback_api', __name__, url_prefix='/api/feedback')
+logger = logging.getLogger(__name__)
 
-def get_current_user():
-    """ดึง user จาก session"""
-    user_id = session.get('_user_id')
-    if not user_id:
-        return None
-    return User.query.get(int(user_id))
+
+def invalid_feedback_item(item):
+    """ตรวจ {alloc_id, feedback_type} 1 รายการ คืนข้อความ error หรือ None ถ้าถูกต้อง"""
+    if not isinstance(item, dict):
+        return 'each item must be an object'
+    alloc_id = item.get('alloc_id')
+    if not isinstance(alloc_id, int) or isinstance(alloc_id, bool):
+        return 'alloc_id must be an integer'
+    if item.get('feedback_type') not in FEEDBACK_TYPES:
+        return f"feedback_type must be one of: {', '.join(FEEDBACK_TYPES)}"
+    return None
 
 
 @feedback_api.route('/pending', methods=['GET'])
@@ -23,9 +32,9 @@ def pending_feedback():
     
     pending = Feedback.get_pending_feedback(user)
     
-    print(f"✅ Pending allocations for user {user.id}:")
-    for alloc in pending:
-        print(f"  - ID: {alloc.id}, Exam: {alloc.exam_name_snapshot}, Date: {alloc.date}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("pending allocations for user %s: %s", user.id,
+                     [(alloc.id, alloc.exam_name_snapshot, alloc.date.isoformat()) for alloc in pending])
     
     return jsonify([
         {
@@ -47,20 +56,65 @@ def submit_feedback():
         return jsonify({'error': 'Unauthorized'}), 401
     
     data = request.get_json()
-    alloc_id = data.get('alloc_id')
-    feedback_type = data.get('feedback_type')
+    error = invalid_feedback_item(data)
+    if error:
+        return jsonify({'error': error}), 400
+    alloc_id = data['alloc_id']
+    feedback_type = data['feedback_type']
     
-    print(f"📥 Received feedback: alloc_id={alloc_id}, type={feedback_type}")
+    logger.debug("received feedback: alloc_id=%s, type=%s", alloc_id, feedback_type)
     
     # ตรวจสอบว่า allocation เป็นของ user จริงไหม
     alloc = DailyAllocations.query.get(alloc_id)
     if not alloc or alloc.user_id != user.id:
-        print(f"❌ Invalid allocation or wrong user")
+        logger.info("invalid allocation %s for user %s", alloc_id, user.id)
         return jsonify({'error': 'Invalid allocation'}), 400
     
-    # บันทึก feedback
-    Feedback.submit_feedback(user, alloc, feedback_type)
-    
-    print(f"✅ Feedback submitted successfully")
+    # บันทึก feedback (ตอบไปแล้ว → 409 ไม่นับซ้ำ)
+    if not Feedback.submit_feedback(user, alloc, feedback_type):
+        return jsonify({'error': 'Feedback already submitted'}), 409
     
-    return jsonify({'message': 'Feedback submitted successfully'})
\ No newline at end of file
+    return jsonify({'message': 'Feedback submitted successfully', 'reschedule_version': RescheduleService.current_version()})
+
+@feedback_api.route('/batch', methods=['POST'])
+def submit_feedback_batch():
+    """
+    ส่ง feedback หลายรายการพร้อมกัน (reschedule และ commit ครั้งเดียว)
+    body: [{alloc_id, feedback_type}, ...] หรือ {"items": [...]}
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json()
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    for index, item in enumerate(items):
+        error = invalid_feedback_item(item)
+        if error:
+            return jsonify({'error': error, 'index': index}), 400
+
+    # โหลด allocation ทั้งหมดใน query เดียว และตรวจว่าเป็นของ user จริง
+    alloc_ids = [item.get('alloc_id') for item in items]
+    allocations = {
+        alloc.id: alloc
+        for alloc in DailyAllocations.query.filter(
+            DailyAllocations.id.in_(alloc_ids),
+            DailyAllocations.user_id == user.id
+        ).all()
+    }
+    missing = [alloc_id for alloc_id in alloc_ids if alloc_id not in allocations]
+    if missing:
+        return jsonify({'error': 'Invalid allocation', 'alloc_ids': missing}), 400
+
+    applied, skipped = Feedback.submit_feedback_batch(
+        user, [(allocations[item['alloc_id']], item['feedback_type']) for item in items]
+    )
+
+    return jsonify({
+        'message': 'Feedback submitted successfully',
+        'applied': applied,
+        'skipped': skipped,
+        'reschedule_version': RescheduleService.current_version()
+    })
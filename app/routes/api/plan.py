@@ -1,20 +1,15 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify
 from app.models import ReadingPlans, User
 from app.services.user_service import UserUpdateService
 from app.services.feedback_service import Feedback
 from app.services.schedule_service import ScheduleService
+from app.services.reschedule_service import RescheduleService
+from app.services.user_cache import get_current_user
 from app.utils.utils import get_today
 from app.extensions import db
 
 plan_api = Blueprint('plan_api', __name__, url_prefix='/api/plans')
 
-def get_current_user():
-    """ดึง user จาก session"""
-    user_id = session.get('_user_id')
-    if not user_id:
-        return None
-    return User.query.get(int(user_id))
-
 
 @plan_api.route('', methods=['GET'])
 def get_plans():
@@ -36,7 +31,7 @@ def get_plans():
     # ดึงข้อมูลแผน, feedback, slots
     plans = ReadingPlans.query.filter_by(user_id=user.id).all()
     pending_count = len(Feedback.get_pending_feedback(user))
-    slots = ScheduleService.calculate_slots(user, persist=False)
+    slots = ScheduleService.preview_slots(user)
 
     # คืนข้อมูลทั้งหมดในรูปแบบ JSON
     return jsonify({
@@ -69,7 +64,7 @@ def set_daily_hours():
         daily_hours = float(data['daily_read_hours'])
         # อัปเดตชั่วโมงอ่านต่อวันในฐานข้อมูล
         UserUpdateService.set_daily_read_hours(user, daily_hours)
-        return jsonify({'message': 'Updated daily reading hours'})
+        return jsonify({'message': 'Updated daily reading hours', 'reschedule_version': RescheduleService.current_version()})
     except (KeyError, ValueError) as e:
         return jsonify({'error': str(e)}), 400
 
@@ -96,7 +91,7 @@ def add_plan():
             level=int(data['level'])
         )
         db.session.commit()
-        return jsonify({'message': 'Plan added', 'plan_id': plan.id}), 201
+        return jsonify({'message': 'Plan added', 'plan_id': plan.id, 'reschedule_version': RescheduleService.current_version()}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -122,4 +117,4 @@ def delete_plan(plan_id):
     UserUpdateService.delete_plan(user, plan)
     db.session.commit()
 
-    return jsonify({'message': 'Plan deleted'})
\ No newline at end of file
+    return jsonify({'message': 'Plan deleted', 'reschedule_version': RescheduleService.current_version()})
\ No newline at end of file
@@ -1,41 +1,107 @@
-from flask import Blueprint, jsonify, session
+import logging
+from flask import Blueprint, jsonify, request, current_app, stream_with_context, url_for
+from sqlalchemy import or_, and_
 from app.models import User, DailyAllocations, ReadingPlans
+from app.services.reschedule_service import RescheduleService
+from app.services.calendar_service import CalendarService
+from app.services.user_cache import get_current_user
 from app.utils.utils import get_today
 import datetime
 
 schedule_api = Blueprint('schedule_api', __name__, url_prefix='/api')
+logger = logging.getLogger(__name__)
 
-def get_current_user():
-    user_id = session.get('_user_id')
-    if not user_id:
+# จำนวน allocation ต่อหน้าในโหมด cursor
+SCHEDULE_PAGE_LIMIT = 500
+SCHEDULE_PAGE_MAX = 2000
+
+def parse_date_arg(name):
+    """อ่าน query param วันที่ (YYYY-MM-DD) คืน None ถ้าไม่ได้ส่งมา, raise ValueError ถ้ารูปแบบผิด"""
+    value = request.args.get(name)
+    if not value:
         return None
-    return User.query.get(int(user_id))
+    return datetime.date.fromisoformat(value)
+
+def encode_cursor(alloc):
+    """cursor ของ allocation ตัวสุดท้ายในหน้า: "<date>_<id>" (เรียงตาม date, id)"""
+    return f"{alloc.date.isoformat()}_{alloc.id}"
+
+def decode_cursor(cursor):
+    day, alloc_id = cursor.split('_', 1)
+    return datetime.date.fromisoformat(day), int(alloc_id)
+
+def schedule_etag(user, today):
+    """ETag ของ /api/schedule: เปลี่ยนเมื่อ schedule_version ของ user หรือวันนี้ (simulated_date) เปลี่ยน"""
+    return f"schedule-{user.id}-{user.schedule_version}-{today.isoformat()}"
 
 @schedule_api.route('/schedule', methods=['GET'])
 def get_schedule():
-    """ดึงข้อมูลตารางการอ่านของ user ปัจจุบัน"""
+    """
+    ดึงข้อมูลตารางการอ่านของ user ปัจจุบัน
+    - from / to (YYYY-MM-DD, รวมปลายทั้งสองข้าง): เอาเฉพาะช่วงวันนั้น (กรองใน SQL)
+    - cursor / limit: แบ่งหน้าแบบ keyset เรียงตาม (date, id) ใช้ next_cursor จาก response ก่อนหน้า
+    - ส่ง ETag (strong) ตาม User.schedule_version
+    - ถ้า If-None-Match ตรงกัน ตอบ 304 โดยไม่ query daily_allocations เลย
+    """
     user = get_current_user()
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    simulated_today = get_today()
+    try:
+        date_from = parse_date_arg('from')
+        date_to = parse_date_arg('to')
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        paged = cursor is not None or 'limit' in request.args
+        limit = min(int(request.args.get('limit', SCHEDULE_PAGE_LIMIT)), SCHEDULE_PAGE_MAX)
+        if limit <= 0:
+            raise ValueError('limit')
+    except ValueError:
+        return jsonify({'error': 'Invalid from/to/cursor/limit'}), 400
 
-    # ดึง allocations และ plans
-    allocations = (DailyAllocations.query
-                   .filter_by(user_id=user.id)
-                   .order_by(DailyAllocations.date.asc())
-                   .all())
+    simulated_today = get_today()
+    etag = schedule_etag(user, simulated_today)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    # ดึง allocations (เฉพาะช่วงที่ขอ) และ plans
+    query = DailyAllocations.query.filter_by(user_id=user.id)
+    if date_from:
+        query = query.filter(DailyAllocations.date >= date_from)
+    if date_to:
+        query = query.filter(DailyAllocations.date <= date_to)
+    if after:
+        query = query.filter(or_(
+            DailyAllocations.date > after[0],
+            and_(DailyAllocations.date == after[0], DailyAllocations.id > after[1])
+        ))
+    query = query.order_by(DailyAllocations.date.asc(), DailyAllocations.id.asc())
+
+    next_cursor = None
+    if paged:
+        allocations = query.limit(limit + 1).all()
+        if len(allocations) > limit:
+            allocations = allocations[:limit]
+            next_cursor = encode_cursor(allocations[-1])
+    else:
+        allocations = query.all()
     plans = ReadingPlans.query.filter_by(user_id=user.id).all()
 
+    # ช่วงวันของวันสอบที่ต้องใส่ในหน้านี้ (ให้แต่ละหน้าไม่ซ้ำกัน: หลัง cursor ถึงวันสุดท้ายของหน้า)
+    exam_from, exam_to = date_from, date_to
+    if next_cursor:
+        exam_to = allocations[-1].date
+
     # สร้าง map ของวันสอบ (exam_name -> exam_date) และ map ของ plan โดยชื่อเพื่อดึง level
     exam_dates_map = {plan.exam_name: plan.exam_date for plan in plans}
     plan_by_name = {plan.exam_name: plan for plan in plans}
 
     events = []
     exam_dates_added = {}
-
-    print(f"\n{'='*60}")
-    print(f"📊 Processing allocations...")
+    skipped = 0
 
     # 1. เพิ่ม allocations (วันอ่าน)
     for alloc in allocations:
@@ -45,15 +111,13 @@ def get_schedule():
         if exam_date:
             # ถ้าวันนี้ >= วันสอบ ให้ข้ามไป
             if alloc.date >= exam_date:
-                print(f"⚠️ SKIP: {date_str} >= exam date {exam_date.strftime('%Y-%m-%d')}")
+                skipped += 1
                 continue
 
             # หาค่า level จาก plan
             plan = plan_by_name.get(alloc.exam_name_snapshot)
             level_value = plan.level if plan else None
 
-            print(f"✅ ADD study day: {date_str} ({alloc.exam_name_snapshot}, {alloc.slots} ชม., level={level_value}, id={alloc.id})")
-
             events.append({
                 'id': alloc.id,  # ✅ เพิ่ม id
                 'alloc_id': alloc.id,  # ✅ เพิ่ม alloc_id
@@ -69,6 +133,12 @@ def get_schedule():
     # 2. เพิ่มวันสอบ (จาก plans)
     for plan in plans:
         if plan.exam_date:
+            if exam_from and plan.exam_date < exam_from:
+                continue
+            if exam_to and plan.exam_date > exam_to:
+                continue
+            if after and plan.exam_date <= after[0]:
+                continue
             exam_date_str = plan.exam_date.strftime('%Y-%m-%d')
 
             if exam_date_str not in exam_dates_added:
@@ -77,8 +147,6 @@ def get_schedule():
             if plan.exam_name not in exam_dates_added[exam_date_str]:
                 exam_dates_added[exam_date_str].append(plan.exam_name)
 
-                print(f"✅ ADD exam day: {exam_date_str} ({plan.exam_name}, level={plan.level})")
-
                 events.append({
                     'id': None,  # ✅ วันสอบไม่มี allocation id
                     'alloc_id': None,  # ✅ วันสอบไม่มี allocation id
@@ -91,10 +159,83 @@ def get_schedule():
                     'level': plan.level
                 })
 
-    print(f"📤 Total events: {len(events)}")
-    print(f"{'='*60}\n")
+    logger.debug("schedule user %s: %d events (%d allocations, %d skipped on/after exam day)",
+                 user.id, len(events), len(allocations), skipped)
 
-    return jsonify({
+    payload = {
         'simulated_today': simulated_today.strftime('%Y-%m-%d'),
         'events': events
-    })
\ No newline at end of file
+    }
+    if paged:
+        payload['next_cursor'] = next_cursor
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@schedule_api.route('/schedule.ics', methods=['GET'])
+def get_schedule_ics():
+    """
+    export ตารางอ่านหนังสือเป็น iCalendar (นำเข้า / subscribe ในปฏิทินของมือถือ)
+    - since (YYYY-MM-DD): เอาเฉพาะ event ตั้งแต่วันนั้น (client ที่ poll บ่อยไม่ต้องโหลดประวัติทั้งหมด)
+    - ส่ง weak ETag ตาม User.schedule_version ถ้า If-None-Match ตรงกัน ตอบ 304 โดยไม่ query ตาราง
+      (weak: ตารางเดียวกันแต่ DTSTAMP / domain ใน UID ต่างกันได้ ไบต์จึงไม่เท่ากันทุกครั้ง)
+    - body ถูก stream ทีละ batch (หน่วยความจำคงที่)
+    - token: feed token จาก /api/schedule/feed ใช้แทน cookie (แอปปฏิทินที่ subscribe ลิงก์)
+    """
+    token = request.args.get('token')
+    user = CalendarService.verify_feed_token(token) if token else get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        since = parse_date_arg('since')
+    except ValueError:
+        return jsonify({'error': 'Invalid since'}), 400
+
+    etag = CalendarService.etag(user, since)
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        body = CalendarService.iter_ics(user.id, request.host.split(':')[0], since)
+        response = current_app.response_class(stream_with_context(body), mimetype='text/calendar')
+        response.headers['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@schedule_api.route('/schedule/feed', methods=['GET'])
+def get_schedule_feed():
+    """ลิงก์ subscribe /api/schedule.ics พร้อม feed token ของ user (ใช้ได้จนกว่าจะเปลี่ยนรหัสผ่าน)"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    token = CalendarService.feed_token(user)
+    return jsonify({
+        'token': token,
+        'url': url_for('schedule_api.get_schedule_ics', token=token, _external=True)
+    })
+
+
+@schedule_api.route('/schedule/status', methods=['GET'])
+def get_schedule_status():
+    """
+    สถานะการจัดตารางใหม่ของ user (ใช้ poll หลังเพิ่ม/ลบแผน, feedback ฯลฯ)
+    - requested_version: version ล่าสุดที่ถูกสั่ง / completed_version: version ที่คำนวณเสร็จแล้ว
+    - pending = True ถ้ายังคำนวณไม่เสร็จ (client ควรรอก่อนโหลด /api/schedule ใหม่)
+    - failed = True ถ้าลองคำนวณครบจำนวนครั้งแล้วยังไม่สำเร็จ (pending จะเป็น False จนกว่าจะมี trigger ใหม่)
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    requested, completed, failed = RescheduleService.status(user)
+    return jsonify({
+        'requested_version': requested,
+        'completed_version': completed,
+        'pending': completed < requested and not failed,
+        'failed': failed
+    })
@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from app.services.stats_service import StatsService, STATS_HEATMAP_WEEKS, STATS_HEATMAP_MAX_WEEKS
+from app.services.user_cache import get_current_user
+from app.utils.utils import get_today
+
+stats_api = Blueprint('stats_api', __name__, url_prefix='/api/stats')
+
+
+@stats_api.route('', methods=['GET'])
+def get_stats():
+    """
+    สถิติการอ่านของ user ปัจจุบัน (ข้อมูลของหน้า stat.html)
+    - plans / totals: ชั่วโมงตามแผน (ทั้งหมด, ถึงวันนี้) เทียบกับที่ยืนยันด้วย feedback แล้ว ต่อวิชา
+    - feedback: จำนวน feedback แต่ละประเภท (read_in_time / harder / easier / read_all)
+    - streaks: จำนวนวันติดกันที่ตอบ feedback (ปัจจุบัน / ยาวที่สุด)
+    - heatmap: ชั่วโมงที่ยืนยันรายวัน สัปดาห์ละแถว (จันทร์-อาทิตย์) ย้อนหลัง weeks สัปดาห์ (ค่าเริ่มต้น 12, สูงสุด 53)
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    weeks = request.args.get('weeks', STATS_HEATMAP_WEEKS, type=int)
+    if not 1 <= weeks <= STATS_HEATMAP_MAX_WEEKS:
+        return jsonify({'error': f'weeks must be 1-{STATS_HEATMAP_MAX_WEEKS}'}), 400
+
+    return jsonify(StatsService.summary(user.id, get_today(), weeks))
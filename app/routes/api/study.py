@@ -1,12 +1,14 @@
 # core-api/routes/api/study.py
+import logging
 from datetime import date
 from flask import Blueprint, jsonify, request
 from sqlalchemy import func
 from app.extensions import db
 from app.models import DailyAllocations
-from app.utils.utils import get_today, log
+from app.utils.utils import get_today
 
 study_api = Blueprint("study_api", __name__, url_prefix="/api/study")
+logger = logging.getLogger(__name__)
 
 def get_daily_summary(user_id, target_date=None):
     if target_date is None:
@@ -25,7 +27,7 @@ def get_daily_summary(user_id, target_date=None):
 
     total_hours = sum(a.total_hours for a in allocations)
 
-    log(f"user_id: {user_id}, total_hours: {total_hours}")
+    logger.debug("user_id: %s, total_hours: %s", user_id, total_hours)
 
     return {
         "date": target_date.isoformat(),
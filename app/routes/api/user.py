@@ -1,18 +1,14 @@
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify
 from app.models import User
 from app.extensions import db
 from app.services.user_service import AuthService, UserUpdateService
+from app.services.reschedule_service import RescheduleService
+from app.services.user_cache import get_current_user
 from app.utils.utils import get_today
 
 user_api = Blueprint('user_api', __name__, url_prefix='/api/user')
 
-def get_current_user():
-    user_id = session.get('_user_id')
-    if not user_id:
-        return None
-    return User.query.get(int(user_id))
-
 @user_api.route('/profile', methods=['GET'])
 def profile():
     """
@@ -85,7 +81,8 @@ def update_settings():
     return jsonify({
         "message": "Settings processed",
         "updated": updated,
-        "errors": errors
+        "errors": errors,
+        "reschedule_version": RescheduleService.current_version()
     }), 200
 
 
@@ -110,7 +107,8 @@ def change_daily_read_hours():
 
     return jsonify({
         "message": "อัปเดต daily_read_hours สำเร็จ",
-        "daily_read_hours": user.daily_read_hours
+        "daily_read_hours": user.daily_read_hours,
+        "reschedule_version": RescheduleService.current_version()
     }), 200
 
 
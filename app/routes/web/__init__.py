@@ -1,18 +1,23 @@
+import importlib
 
-from .login import web_login
-from .password import web_password
-from .dashboard import web_dashboard
-from .feedback import web_feedback
-from .schedule import web_schedule
-from .main import web_main
-from .web_request import web_req
+# blueprint ของหน้าเว็บ → module ที่ประกาศ (import เมื่อถูกเรียกใช้ครั้งแรก
+# create_app ใช้แค่ web_main กับ web_req ที่เหลือไม่ต้องโหลดตอนบูต)
+_BLUEPRINTS = {
+    'web_login': '.login',
+    'web_password': '.password',
+    'web_dashboard': '.dashboard',
+    'web_feedback': '.feedback',
+    'web_schedule': '.schedule',
+    'web_main': '.main',
+    'web_req': '.web_request',
+}
 
-__all__ = [
-    'web_login',
-    'web_password',
-    'web_dashboard',
-    'web_feedback',
-    'web_schedule',
-    'web_main',
-    'web_req',
-]
+__all__ = list(_BLUEPRINTS)
+
+
+def __getattr__(name):
+    if name not in _BLUEPRINTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    blueprint = getattr(importlib.import_module(_BLUEPRINTS[name], __name__), name)
+    globals()[name] = blueprint
+    return blueprint
@@ -47,7 +47,7 @@ def dashboard():
     # รายการแผนการอ่านทั้งหมด
     plans = ReadingPlans.query.filter_by(user_id=current_user.id).all()
     # ตาราง slot สำหรับแสดงผล
-    slots = ScheduleService.calculate_slots(current_user, persist=False)
+    slots = ScheduleService.preview_slots(current_user)
 
     return render_template('dashboard.html', username=current_user.username, plans=plans, slots=slots, pending_count=pending_count)
 
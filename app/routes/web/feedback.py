@@ -20,9 +20,11 @@ def feedback():
         feedback_type = request.form.get('feedback_type')
         # ดึง allocation ที่ต้องการ feedback ถ้าไม่เจอจะ 404
         alloc = DailyAllocations.query.get_or_404(alloc_id)
-        # บันทึก feedback ลงฐานข้อมูล
-        Feedback.submit_feedback(current_user, alloc, feedback_type)
-        flash(f'บันทึกฟีดแบค {feedback_type} สำหรับ {alloc.exam_name_snapshot} วันที่ {alloc.date}')
+        # บันทึก feedback ลงฐานข้อมูล (กดซ้ำไม่บันทึกซ้ำ)
+        if Feedback.submit_feedback(current_user, alloc, feedback_type):
+            flash(f'บันทึกฟีดแบค {feedback_type} สำหรับ {alloc.exam_name_snapshot} วันที่ {alloc.date}')
+        else:
+            flash(f'ฟีดแบคของ {alloc.exam_name_snapshot} วันที่ {alloc.date} บันทึกไปแล้ว')
         return redirect(url_for('web_feedback.feedback'))
     # ดึง allocation ถัดไปที่ต้อง feedback
     alloc = Feedback.get_next_feedback(current_user)
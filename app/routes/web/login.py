@@ -1,8 +1,8 @@
 import os
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user
-from sqlalchemy import or_
 from app.models import User
+from app.services.password_hasher import PasswordHasherBusy
 from app.services.user_service import AuthService
 from app.extensions import db
 
@@ -36,11 +36,8 @@ def login():
         username_or_email = request.form['username_login']
         password = request.form['password_login']
 
-        # หา user โดย username หรือ email
-        users = User.query.filter(
-            or_(User.username == username_or_email,
-                User.email == username_or_email)
-        ).all()
+        # หา user โดย username หรือ email (ไม่สนตัวพิมพ์เล็กใหญ่, ใช้ index)
+        users = AuthService.find_login_users(username_or_email)
         
         if len(users) > 1:
             flash('Duplicate username found, please use email to login')
@@ -49,7 +46,12 @@ def login():
         user = users[0] if users else None
 
         # ตรวจสอบว่ามี user และรหัสผ่านถูกต้องหรือไม่
-        if user and AuthService.check_password(user, password):
+        try:
+            valid = user is not None and AuthService.check_password(user, password)
+        except PasswordHasherBusy:
+            flash('server is busy, please try again')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+        if valid:
             login_user(user)
             if os.environ.get("ENABLE_DEMO", "0") == "1":
                 return redirect(url_for("web_dashboard.dashboard"))
@@ -74,6 +76,10 @@ def register():
         email = request.form['email_register']
         username = request.form['username_register']
         password = request.form['password_register']
+        # เช็คอีเมลซ้ำ (ไม่สนตัวพิมพ์เล็กใหญ่ เหมือนตอน login)
+        if AuthService.find_by_email(email):
+            flash('email already exists')
+            return render_template('register.html')
         new_user = User(username=username, email=email)
         AuthService.set_password(new_user, password)
         try:
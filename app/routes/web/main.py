@@ -1,4 +1,5 @@
 import os
+import logging
 from flask import Blueprint, render_template, redirect, url_for, flash, request, session
 from flask_login import login_required, current_user, logout_user
 from app.models import ReadingPlans, User
@@ -8,6 +9,7 @@ from app.services.user_service import AuthService, UserUpdateService
 from app.utils.utils import get_today
 
 web_main = Blueprint('web_main', __name__, template_folder='template')
+logger = logging.getLogger(__name__)
 
 @web_main.route('/')
 def check_session():
@@ -19,11 +21,7 @@ def check_session():
 @web_main.route('/home')
 @login_required
 def home():
-    print(f"=" * 50)
-    print(f"✅ /home route accessed")
-    print(f"✅ Session data: {dict(session)}")
-    print(f"✅ user_id in session: {session.get('user_id')}")
-    print(f"=" * 50)
+    logger.debug("/home accessed, user_id in session: %s", session.get('_user_id'))
     return render_template('schedule.html')
 
 @web_main.route('/feedback')
@@ -1,6 +1,5 @@
 import os
 from flask import Blueprint, render_template, url_for, flash, redirect, request
-from app.models import User
 from app.services.user_service import AuthService
 
 web_password = Blueprint('web_password', __name__, template_folder='demo_backend') # ชี้ไปที่โฟลเดอร์ demo_backend ใน web
@@ -16,18 +15,14 @@ def forgot_password():
     """
     if request.method == 'POST':
         email = request.form['email']
-        user = User.query.filter_by(email=email).first()
+        user = AuthService.find_by_email(email)
         if user:
             # สร้าง token สำหรับ reset password และส่งอีเมล
             token = AuthService.generate_reset_token(user, user.email)
             reset_url = url_for('web_password.reset_password', token=token, _external=True)
-            from flask_mail import Message
-            from app import mail
-            msg = Message('Password Reset Request',
-                          sender=os.environ.get('SENDER_MAIL', 'idk-bruh'),
-                          recipients=[user.email])
-            msg.body = f'click for reset password: {reset_url}'
-            mail.send(msg)
+            from app.notification.outbox import OutboxService
+            OutboxService.enqueue(user.email, 'Password Reset Request',
+                                  body_text=f'click for reset password: {reset_url}')
             flash('email sent, please check on checkbox')
         else:
             flash('dont have email in system')
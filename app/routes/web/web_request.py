@@ -1,15 +1,17 @@
 import os
+import logging
 from flask import Blueprint, jsonify, render_template, redirect, url_for, flash, request, session
 from flask_login import login_required, current_user, login_user
-from sqlalchemy import or_
 from app.models import ReadingPlans, User
 from app.services.feedback_service import Feedback
 from app.services.schedule_service import ScheduleService
+from app.services.password_hasher import PasswordHasherBusy
 from app.services.user_service import AuthService, UserUpdateService
 from app.utils.utils import get_today
 from app.extensions import db
 
 web_req = Blueprint('web_req', __name__, url_prefix='/req', template_folder='template')
+logger = logging.getLogger(__name__)
 
 @web_req.route('/forgot', methods=['GET', 'POST'])
 def forgot_password():
@@ -21,22 +23,20 @@ def forgot_password():
     """
     if request.method == 'POST':
         email = request.form['email']
-        user = User.query.filter_by(email=email).first()
+        user = AuthService.find_by_email(email)
         if user:
             # สร้าง token สำหรับ reset password และส่งอีเมล
             token = AuthService.generate_reset_token(user, user.email)
             reset_url = url_for('web_main.reset_password', token=token, _external=True)
-            from flask_mail import Message
-            from app import mail
-            msg = Message('Password Reset Request',
-                          sender=os.environ.get('SENDER_MAIL', 'idk-bruh'),
-                          recipients=[user.email])
-            msg.body = f'click for reset password: {reset_url}'
+            msg_body = f'click for reset password: {reset_url}'
+            # เขียนลง email outbox แล้วตอบทันที (OutboxSender ส่งจริงใน background)
+            from app.notification.outbox import OutboxService
             try:
-                mail.send(msg)
+                OutboxService.enqueue(user.email, 'Password Reset Request', body_text=msg_body)
                 flash('Email sent successfully')
             except Exception as e:
-                print(f"Error sending email: {e}")
+                db.session.rollback()
+                logger.error("error queueing email: %s", e)
                 flash('Failed to send email. Please try again later.')
         else:
             flash('dont have email in system')
@@ -56,11 +56,8 @@ def login():
         username_or_email = request.form['username_login']
         password = request.form['password_login']
 
-        # หา user โดย username หรือ email
-        users = User.query.filter(
-            or_(User.username == username_or_email,
-                User.email == username_or_email)
-        ).all()
+        # หา user โดย username หรือ email (ไม่สนตัวพิมพ์เล็กใหญ่, ใช้ index)
+        users = AuthService.find_login_users(username_or_email)
         
         if len(users) > 1:
             flash('Duplicate username found, please use email to login')
@@ -69,7 +66,12 @@ def login():
         user = users[0] if users else None
 
         # ตรวจสอบว่ามี user และรหัสผ่านถูกต้องหรือไม่
-        if user and AuthService.check_password(user, password):
+        try:
+            valid = user is not None and AuthService.check_password(user, password)
+        except PasswordHasherBusy:
+            flash('server is busy, please try again')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+        if valid:
             login_user(user)
             if os.environ.get("ENABLE_DEMO", "0") == "1":
                 return redirect(url_for("web_dashboard.dashboard"))
@@ -88,7 +90,7 @@ def register():
         password = request.form['password_register']
 
         # ✅ เช็คอีเมลซ้ำ
-        if User.query.filter_by(email=email).first():
+        if AuthService.find_by_email(email):
             return jsonify({"error": "อีเมลนี้ถูกใช้แล้ว"}), 400
 
         new_user = User(username=username, email=email)
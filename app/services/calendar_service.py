@@ -0,0 +1,143 @@
+import os
+import hashlib
+from datetime import datetime, timedelta
+from flask import current_app
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import select, and_
+from app.extensions import db
+from app.models import DailyAllocations, ReadingPlans
+from .user_cache import load_user
+
+# จำนวนแถวที่ดึงจาก DB ต่อรอบ (yield_per) และจำนวน event ต่อ chunk ที่ส่งออก
+ICS_BATCH_SIZE = int(os.getenv("ICS_BATCH_SIZE", "500"))
+
+CRLF = "\r\n"
+FEED_TOKEN_SALT = "calendar-feed-salt"
+
+
+def escape_text(value):
+    """escape ค่า TEXT ตาม RFC 5545 (\\ ; , และขึ้นบรรทัดใหม่)"""
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line):
+    """ตัดบรรทัดที่ยาวเกิน 75 octet (UTF-8) ต่อด้วย CRLF + ช่องว่าง โดยไม่ตัดกลางตัวอักษร"""
+    if len(line.encode("utf-8")) <= 75:
+        return line + CRLF
+    parts, current, size = [], [], 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > (75 if not parts else 74):
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return (CRLF + " ").join(parts) + CRLF
+
+
+def vevent(uid, day, summary, stamp, description=None):
+    """VEVENT แบบทั้งวันของวันที่ day"""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+        f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:{escape_text(summary)}",
+    ]
+    if description:
+        lines.append(f"DESCRIPTION:{escape_text(description)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+class CalendarService:
+    """
+    export ตารางอ่านหนังสือเป็น iCalendar (RFC 5545)
+    - วันอ่าน (DailyAllocations ก่อนวันสอบของ plan) และวันสอบ (ReadingPlans) เป็น event ทั้งวัน
+    - stream ทีละ batch ด้วย yield_per → หน่วยความจำคงที่ไม่ว่าประวัติจะยาวแค่ไหน
+    """
+    @staticmethod
+    def password_fingerprint(user):
+        """ส่วนหนึ่งของ hash รหัสผ่าน ใส่ใน feed token → เปลี่ยนรหัสผ่านแล้วลิงก์เก่าใช้ไม่ได้"""
+        return hashlib.sha256((user.password or "").encode()).hexdigest()[:16]
+
+    @staticmethod
+    def feed_token(user):
+        """
+        token ของลิงก์ subscribe ปฏิทิน (?token=) สำหรับแอปปฏิทินที่ไม่มี cookie
+        ไม่มีวันหมดอายุ แต่ถูกยกเลิกเมื่อ user เปลี่ยนรหัสผ่าน
+        """
+        s = URLSafeSerializer(current_app.config['SECRET_KEY'], salt=FEED_TOKEN_SALT)
+        return s.dumps([user.id, CalendarService.password_fingerprint(user)])
+
+    @staticmethod
+    def verify_feed_token(token):
+        """คืน user ของ feed token หรือ None ถ้า token ไม่ถูกต้อง / ถูกยกเลิกแล้ว"""
+        s = URLSafeSerializer(current_app.config['SECRET_KEY'], salt=FEED_TOKEN_SALT)
+        try:
+            user_id, fingerprint = s.loads(token)
+            user = load_user(user_id)
+        except (BadSignature, TypeError, ValueError):
+            return None
+        if user is None or CalendarService.password_fingerprint(user) != fingerprint:
+            return None
+        return user
+
+    @staticmethod
+    def etag(user, since=None):
+        """ETag (ส่งแบบ weak) ของ /api/schedule.ics: เปลี่ยนเมื่อ schedule_version ของ user เปลี่ยน (แยกตาม since)"""
+        return f"ics-{user.id}-{user.schedule_version}-{since.isoformat() if since else 'all'}"
+
+    @staticmethod
+    def iter_ics(user_id, domain, since=None, batch_size=ICS_BATCH_SIZE):
+        """
+        generator ของข้อความ VCALENDAR (str ทีละ chunk) ต้องวนภายใน app context
+        - since (date): เอาเฉพาะ event ตั้งแต่วันนั้น
+        - allocation ที่ไม่มี plan ชื่อตรงกัน หรืออยู่ตั้งแต่วันสอบไปแล้ว จะไม่ถูกใส่ (เหมือน /api/schedule)
+        """
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        yield "".join(fold(line) for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//reading-planner//schedule//TH",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            "X-WR-CALNAME:ตารางอ่านหนังสือ",
+            "X-WR-TIMEZONE:Asia/Bangkok",
+        ))
+
+        plans = select(ReadingPlans.id, ReadingPlans.exam_name, ReadingPlans.exam_date, ReadingPlans.level) \
+            .where(ReadingPlans.user_id == user_id)
+        if since:
+            plans = plans.where(ReadingPlans.exam_date >= since)
+        chunk = [
+            vevent(f"exam-{plan.id}@{domain}", plan.exam_date, f"สอบ {plan.exam_name}", stamp,
+                   f"ระดับความยาก {plan.level}")
+            for plan in db.session.execute(plans.order_by(ReadingPlans.exam_date, ReadingPlans.id))
+        ]
+
+        allocations = (
+            select(DailyAllocations.id, DailyAllocations.date, DailyAllocations.slots,
+                   DailyAllocations.exam_name_snapshot, DailyAllocations.feedback_done)
+            .join(ReadingPlans, and_(
+                ReadingPlans.user_id == DailyAllocations.user_id,
+                ReadingPlans.exam_name == DailyAllocations.exam_name_snapshot,
+            ))
+            .where(DailyAllocations.user_id == user_id, DailyAllocations.date < ReadingPlans.exam_date)
+            .order_by(DailyAllocations.date, DailyAllocations.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if since:
+            allocations = allocations.where(DailyAllocations.date >= since)
+        for alloc in db.session.execute(allocations):
+            summary = f"อ่าน {alloc.exam_name_snapshot} {alloc.slots} ชม."
+            chunk.append(vevent(f"alloc-{alloc.id}@{domain}", alloc.date, summary, stamp,
+                                "อ่านแล้ว" if alloc.feedback_done else None))
+            if len(chunk) >= batch_size:
+                yield "".join(chunk)
+                chunk = []
+        chunk.append(fold("END:VCALENDAR"))
+        yield "".join(chunk)
@@ -1,9 +1,16 @@
 from .schedule_service import ScheduleService
 from .user_service import UserUpdateService
+from .reschedule_service import RescheduleService
 import datetime
+import logging
 from app.extensions import db
 from app.models import DailyAllocations, ReadingPlans
-from app.utils.utils import get_today, log
+from app.utils.utils import get_today
+
+logger = logging.getLogger(__name__)
+
+# ประเภท feedback ที่ apply_feedback รองรับ (stats_service ใช้เป็น column ของ user_daily_stats)
+FEEDBACK_TYPES = ("read_in_time", "harder", "easier", "read_all")
 
 
 
@@ -15,7 +22,7 @@ def full_oneday_weight(weight, total_weight, days_till_exam):
     if days_till_exam == 1:
         return 0
     output = (total_weight - (weight * days_till_exam)) / (1 - days_till_exam)
-    log(f"weight: {weight}, oneday_weight: {output}", debug=True)
+    logger.debug("weight: %s, oneday_weight: %s", weight, output)
     return weight - output
 
 
@@ -58,16 +65,14 @@ class Feedback:
                 .first())
 
     @staticmethod
-    def submit_feedback(user, allocation, feedback_type, persist=True):
+    def apply_feedback(user, allocation, feedback_type):
         """
-        รับ feedback จากผู้ใช้และปรับ weight ของแผนตามประเภท feedback
+        ปรับ weight ของแผนตามประเภท feedback และ mark allocation ว่าตอบแล้ว (ยังไม่ commit / reschedule)
         - read_in_time: อ่านทัน → ลด weight
         - harder: ยาก → เพิ่ม weight
         - easier: ง่าย → ลด weight
         - read_all: อ่านหมด → ปรับ weight ตามสูตร
-        ถ้า weight หมดหรือวันสอบเลยแล้วจะลบแผนออก
-        อัปเดตตาราง schedule ใหม่หลัง feedback
-        persist=True จะ commit ลง DB ทันที
+        คืน True ถ้าแผนควรถูกลบ (weight หมดหรือวันสอบเลยแล้ว)
         """
         plan = allocation.plan
         # apply feedback logic
@@ -87,15 +92,76 @@ class Feedback:
         allocation.feedback_done = True
         allocation.feedback_type = feedback_type
 
+        review_day = plan.exam_date
+        return plan.weight <= 0 or (review_day < get_today() and allocation.feedback_done)
+
+    @staticmethod
+    def submit_feedback(user, allocation, feedback_type, persist=True):
+        """
+        รับ feedback จากผู้ใช้และปรับ weight ของแผนตามประเภท feedback (ดู apply_feedback)
+        ถ้า weight หมดหรือวันสอบเลยแล้วจะลบแผนออก
+        อัปเดตตาราง schedule ใหม่หลัง feedback
+        เพิ่มสถิติรายวันใน user_daily_stats (StatsService.record_feedback)
+        persist=True จะ commit ลง DB ทันที
+        ข้าม allocation ที่ตอบไปแล้ว หรือแผนถูกลบไปแล้ว (กดซ้ำ/ส่งซ้ำไม่นับสถิติซ้ำ)
+        คืน True ถ้า apply feedback, False ถ้าข้าม
+        """
+        plan = allocation.plan
+        if allocation.feedback_done or plan is None:
+            return False
+        expired = Feedback.apply_feedback(user, allocation, feedback_type)
+        # import ตอนใช้: stats_service import FEEDBACK_TYPES จาก module นี้
+        from .stats_service import StatsService
+        StatsService.record_feedback(user.id, [(allocation.date, allocation.slots, feedback_type)])
+        ScheduleService.bump_version(user.id)
+
         if persist:
             db.session.commit()
 
-        review_day = plan.exam_date
         # ถ้า weight หมดหรือวันสอบเลยแล้วให้ลบแผนออก
-        if plan.weight <= 0 or (review_day < get_today() and allocation.feedback_done):
+        if expired:
             UserUpdateService.delete_plan(user, plan)
         
-        ScheduleService.update_schedule(user, persist=persist)
+        RescheduleService.request(user, persist=persist)
 
         if persist:
             db.session.commit()
+        return True
+
+    @staticmethod
+    def submit_feedback_batch(user, items):
+        """
+        รับ feedback หลายรายการพร้อมกัน (เช่นกลับมาหลังหายไปหลายวัน)
+        - items: list ของ (allocation, feedback_type) เรียงตามลำดับที่ต้องการ apply
+        - ปรับ weight ทีละรายการตามลำดับ, ลบแผนที่หมดทีเดียว, reschedule ครั้งเดียว และ commit ครั้งเดียว
+        - ข้ามรายการที่ตอบไปแล้ว หรือแผนถูกลบไปแล้ว
+        คืน (applied, skipped) เป็น list ของ allocation id
+        """
+        applied, skipped = [], []
+        expired_plans = []
+        recorded = []
+        for allocation, feedback_type in items:
+            plan = allocation.plan
+            if allocation.feedback_done or plan is None or plan in expired_plans:
+                skipped.append(allocation.id)
+                continue
+            if Feedback.apply_feedback(user, allocation, feedback_type):
+                expired_plans.append(plan)
+            applied.append(allocation.id)
+            recorded.append((allocation.date, allocation.slots, feedback_type))
+
+        if not applied:
+            return applied, skipped
+        from .stats_service import StatsService
+        StatsService.record_feedback(user.id, recorded)
+        ScheduleService.bump_version(user.id)
+
+        # ลบแผนที่ weight หมด/เลยวันสอบ (ยังไม่ reschedule)
+        for plan in expired_plans:
+            db.session.delete(plan)
+        db.session.flush()
+        db.session.expire(user, ["reading_plans"])
+
+        RescheduleService.request(user, commit=False)
+        db.session.commit()
+        return applied, skipped
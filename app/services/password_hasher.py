@@ -0,0 +1,135 @@
+import os
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+logger = logging.getLogger(__name__)
+
+# method ของ werkzeug สำหรับ hash ใหม่ เช่น "scrypt:32768:8:1" (ค่าเริ่มต้นของ werkzeug), "scrypt:16384:8:1", "pbkdf2:sha256:600000"
+# ค่าเริ่มต้น scrypt N=2^15, r=8, p=1: หน่วยความจำ 32 MiB, ~145 ms ต่อครั้งบน 1 core (benchmarks/bench_password)
+# throughput ตอน login ถล่มมาจาก pool ไม่ใช่จากการลด cost → ลด cost ได้ผ่าน config เท่านั้น
+# hash ที่เก็บไว้ด้วย method อื่นจะถูก hash ใหม่ตอน login สำเร็จครั้งถัดไป ยกเว้น method ใหม่ถูกกว่าของเดิม
+# (algorithm เดียวกันแต่ค่าใดค่าหนึ่งน้อยกว่า) ต้องเปิด PASSWORD_REHASH_DOWNGRADE=1 ก่อน
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_REHASH_DOWNGRADE = os.getenv("PASSWORD_REHASH_DOWNGRADE", "0") == "1"
+# ที่คำนวณ hash: "thread" (hashlib ปล่อย GIL ระหว่างคำนวณ), "process", "inline" (บน request thread แบบเดิม)
+PASSWORD_POOL = os.getenv("PASSWORD_POOL", "thread")
+# จำนวนงาน hash ที่รันพร้อมกันได้ (ที่เหลือรอคิว) → login ถล่มพร้อมกันใช้ CPU ได้ไม่เกินนี้
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+# งานที่รอคิวได้สูงสุด (รวมที่กำลังรัน) และเวลาที่ยอมรอคิว ก่อนตอบว่า server ไม่ว่าง
+# request thread ยังต้องรอผล hash ของตัวเอง (WSGI แบบ sync คืน thread ก่อนได้คำตอบไม่ได้) → ตั้งคิวสั้นและ timeout สั้น
+# ให้ thread ถูกจองไม่เกิน ~2 รอบ hash แล้วตอบ 503 ทันทีตอนคิวเต็ม แทนการรอจน worker หมด
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 2)))
+PASSWORD_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_QUEUE_TIMEOUT", "0.1"))
+
+
+def method_prefix(method):
+    """
+    ส่วน method ที่ werkzeug เขียนนำหน้า hash ของ method นี้ (คำนวณจาก string ไม่ต้อง hash จริง)
+    เติมค่า default แบบเดียวกับ werkzeug เช่น "scrypt" → "scrypt:32768:8:1", "pbkdf2" → "pbkdf2:sha256:<DEFAULT_PBKDF2_ITERATIONS>"
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"unsupported password hash method: {method}")
+
+
+def is_weaker(prefix, than):
+    """
+    True ถ้า prefix (เช่น "scrypt:16384:8:1") ถูกกว่า than: algorithm เดียวกัน (pbkdf2 ต้อง hash เดียวกัน)
+    และค่า cost ตัวใดตัวหนึ่งน้อยกว่า, ต่าง algorithm ถือว่าเทียบไม่ได้ (False)
+    """
+    name, *args = prefix.split(":")
+    other, *other_args = than.split(":")
+    if name != other:
+        return False
+    if name == "pbkdf2":
+        if args[:1] != other_args[:1]:
+            return False
+        args, other_args = args[1:], other_args[1:]
+    try:
+        return any(int(a) < int(b) for a, b in zip(args, other_args))
+    except ValueError:
+        return False
+
+
+class PasswordHasherBusy(RuntimeError):
+    """คิว hash เต็มเกิน PASSWORD_QUEUE_TIMEOUT (ให้ route ตอบ 503 / ให้ลองใหม่)"""
+
+
+class PasswordHasher:
+    """
+    hash / ตรวจรหัสผ่านด้วย werkzeug ใน pool ขนาดจำกัด
+    - hash() ใช้ method ที่ตั้งไว้, needs_rehash() บอกว่า hash ที่เก็บไว้ใช้ method อื่นอยู่ (ไม่ลด cost ถ้าไม่ได้เปิด allow_downgrade)
+    - งานที่รอเกิน max_pending / timeout จะได้ PasswordHasherBusy แทนการรอไม่จำกัด (ก่อนเริ่มคำนวณ)
+    - pool สร้างตอนใช้ครั้งแรก (process pool ต้องสร้างหลัง gunicorn fork)
+    """
+    def __init__(self, method=PASSWORD_HASH_METHOD, mode=PASSWORD_POOL, workers=PASSWORD_WORKERS,
+                 max_pending=PASSWORD_MAX_PENDING, timeout=PASSWORD_QUEUE_TIMEOUT,
+                 allow_downgrade=PASSWORD_REHASH_DOWNGRADE):
+        self.method = method
+        self.prefix = method_prefix(method)
+        self.allow_downgrade = allow_downgrade
+        self.mode = mode
+        self.workers = workers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max(max_pending, workers))
+        self.lock = threading.Lock()
+        self.executor = None
+        self.stats = defaultdict(int)
+
+    def _executor(self):
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    if self.mode == "process":
+                        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self.executor
+
+    def count(self, op):
+        """เพิ่มตัวนับ stats[op] (request หลาย thread เรียกพร้อมกันได้)"""
+        with self.lock:
+            self.stats[op] += 1
+
+    def _run(self, func, *args):
+        if self.mode == "inline":
+            return func(*args)
+        if not self.slots.acquire(timeout=self.timeout):
+            self.count("busy")
+            raise PasswordHasherBusy("password hashing queue is full")
+        try:
+            return self._executor().submit(func, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        self.count("hash")
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        self.count("verify")
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        prefix = stored.split("$", 1)[0]
+        if prefix == self.prefix:
+            return False
+        return self.allow_downgrade or not is_weaker(self.prefix, prefix)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+PASSWORD_HASHER = PasswordHasher()
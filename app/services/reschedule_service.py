@@ -0,0 +1,393 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, select, update, insert, case, func, and_, or_
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import User, RescheduleJobs
+from app.utils.utils import get_simulated_date, worker_id
+from .schedule_service import ScheduleService, SLOTS_CACHE
+
+logger = logging.getLogger(__name__)
+
+# โหมด reschedule: "inline" (คำนวณใน request เหมือนเดิม), "thread" (thread pool ใน process), "db" (คิวใน DB แชร์หลาย process)
+RESCHEDULE_MODE = os.getenv("RESCHEDULE_MODE", "inline")
+RESCHEDULE_WORKERS = int(os.getenv("RESCHEDULE_WORKERS", "2"))
+# trigger ของ user เดียวกันภายในช่วงนี้จะถูกรวมเป็นการรันครั้งเดียว
+RESCHEDULE_COALESCE_SECONDS = float(os.getenv("RESCHEDULE_COALESCE_SECONDS", "2"))
+RESCHEDULE_POLL_SECONDS = float(os.getenv("RESCHEDULE_POLL_SECONDS", "1"))
+# claim ที่ค้างนานกว่านี้ (worker ตาย) ให้ worker อื่นเอาไปทำต่อได้
+RESCHEDULE_LEASE_SECONDS = float(os.getenv("RESCHEDULE_LEASE_SECONDS", "60"))
+# งานที่ล้มจะลองใหม่หลัง backoff * 2^(ครั้งที่ล้ม - 1) วินาที ไม่เกิน max_attempts ครั้ง แล้วเลิก (status failed)
+RESCHEDULE_MAX_ATTEMPTS = int(os.getenv("RESCHEDULE_MAX_ATTEMPTS", "5"))
+RESCHEDULE_BACKOFF_SECONDS = float(os.getenv("RESCHEDULE_BACKOFF_SECONDS", "5"))
+# โหมด db: เริ่ม worker thread ในทุก process ที่ enqueue (deploy process เดียว)
+# ค่าเริ่มต้นปิด → ใช้ flask reschedule-worker เป็น process แยก
+RESCHEDULE_EMBEDDED_WORKERS = os.getenv("RESCHEDULE_EMBEDDED_WORKERS", "0") == "1"
+
+
+def run_reschedule(app, user_id, simulated_date=None):
+    """
+    รัน update_schedule ของ user ใน app context ของ worker
+    - simulated_date: วันจำลองของ request ที่สั่ง (ตั้งเป็น g.simulated_date ให้ get_today ใช้), None = วันจริง
+    """
+    with app.app_context():
+        g.simulated_date = simulated_date
+        try:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                ScheduleService.update_schedule(user)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("reschedule user %s failed", user_id)
+            raise
+        finally:
+            db.session.remove()
+
+
+class ThreadRescheduleQueue:
+    """
+    คิว reschedule ใน process เดียว (thread pool)
+    - เก็บ version ต่อ user ในหน่วยความจำ: requested (ถูกสั่ง) / completed (คำนวณเสร็จ)
+    - user หนึ่งคนมีงานรอหรือกำลังรันได้แค่ 1 งาน, trigger ที่เข้ามาระหว่างนั้นจะรวมเป็นรอบถัดไป
+      (ใช้ simulated_date ของ trigger ล่าสุด)
+    - รันไม่สำเร็จ: completed ไม่ขยับ ลองใหม่แบบ backoff ไม่เกิน max_attempts ครั้ง แล้วถือว่า failed
+      (จนกว่าจะมี trigger ใหม่)
+    """
+    def __init__(self, app, workers=RESCHEDULE_WORKERS, window=RESCHEDULE_COALESCE_SECONDS,
+                 max_attempts=RESCHEDULE_MAX_ATTEMPTS, backoff=RESCHEDULE_BACKOFF_SECONDS):
+        self.app = app
+        self.window = window
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reschedule")
+        self.lock = threading.Lock()
+        self.state = {}
+
+    def _schedule(self, user_id, state, delay=None):
+        state["scheduled"] = True
+        timer = threading.Timer(self.window if delay is None else delay,
+                                self.executor.submit, args=(self._run, user_id))
+        timer.daemon = True
+        timer.start()
+
+    def enqueue(self, user_id, simulated_date=None):
+        with self.lock:
+            state = self.state.setdefault(user_id, {"requested": 0, "completed": 0, "attempts": 0,
+                                                    "failed": False, "scheduled": False, "running": False,
+                                                    "simulated_date": None})
+            state["requested"] += 1
+            state["simulated_date"] = simulated_date
+            # trigger ใหม่ → ได้โควตาลองใหม่ครบอีกรอบ
+            state["attempts"] = 0
+            state["failed"] = False
+            if not state["scheduled"] and not state["running"]:
+                self._schedule(user_id, state)
+            return state["requested"]
+
+    def _run(self, user_id):
+        with self.lock:
+            state = self.state[user_id]
+            state["scheduled"] = False
+            state["running"] = True
+            version = state["requested"]
+            simulated_date = state["simulated_date"]
+        try:
+            run_reschedule(self.app, user_id, simulated_date)
+            failed = False
+        except Exception:
+            failed = True
+        with self.lock:
+            state["running"] = False
+            if failed:
+                state["attempts"] += 1
+                if state["attempts"] < self.max_attempts:
+                    if not state["scheduled"]:
+                        self._schedule(user_id, state, self.backoff * 2 ** (state["attempts"] - 1))
+                else:
+                    logger.error("reschedule user %s gave up after %d attempts", user_id, state["attempts"])
+                    state["failed"] = True
+                return
+            state["attempts"] = 0
+            state["completed"] = max(state["completed"], version)
+            # มี trigger ใหม่ระหว่างรัน → รันอีกรอบ
+            if state["requested"] > version and not state["scheduled"]:
+                self._schedule(user_id, state)
+
+    def status(self, user_id):
+        """(requested, completed, failed) ของ user"""
+        with self.lock:
+            state = self.state.get(user_id)
+            if state is None:
+                return 0, 0, False
+            return state["requested"], state["completed"], state["failed"]
+
+
+class DbRescheduleQueue:
+    """
+    คิว reschedule ในตาราง reschedule_jobs (1 แถวต่อ user) ให้หลาย process ใช้ร่วมกัน
+    - enqueue: requested_version + 1, ตั้ง due_at = now + window ถ้ายังไม่มีงานรอ (ถ้ามีแล้วก็รวมไปกับงานเดิม)
+      เขียนอยู่ใน transaction ของคนเรียก → worker เห็นงานหลังคนเรียก commit เท่านั้น
+    - worker: claim แถวที่ถึง due_at ด้วย claimed_by/claimed_at (lease) แล้วรัน และบันทึก completed_version
+    - รันไม่สำเร็จ: attempts + 1 แล้วคืนเข้าคิวแบบ backoff, ครบ max_attempts → due_at = None (failed)
+    - worker thread เริ่มจาก flask reschedule-worker (หรือตอน enqueue ถ้าเปิด embedded)
+    """
+    def __init__(self, app, workers=RESCHEDULE_WORKERS, window=RESCHEDULE_COALESCE_SECONDS,
+                 poll=RESCHEDULE_POLL_SECONDS, lease=RESCHEDULE_LEASE_SECONDS,
+                 max_attempts=RESCHEDULE_MAX_ATTEMPTS, backoff=RESCHEDULE_BACKOFF_SECONDS,
+                 embedded=RESCHEDULE_EMBEDDED_WORKERS):
+        self.app = app
+        self.workers = workers
+        self.window = timedelta(seconds=window)
+        self.poll = poll
+        self.lease = timedelta(seconds=lease)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.embedded = embedded
+        self.worker_id = worker_id()
+        self.threads = []
+        self.stopped = threading.Event()
+
+    def enqueue(self, user_id, simulated_date=None, commit=True):
+        """
+        ส่ง user เข้าคิว คืน requested_version ใหม่
+        commit=False ไม่ commit เอง (งานจะเข้าคิวพร้อมกับ transaction ของคนเรียก)
+        """
+        jobs = RescheduleJobs.__table__
+        now = datetime.utcnow()
+        bump = (update(jobs)
+                .where(jobs.c.user_id == user_id)
+                .values(
+                    requested_version=jobs.c.requested_version + 1,
+                    attempts=0,
+                    simulated_date=simulated_date,
+                    due_at=case((jobs.c.due_at.is_(None), now + self.window), else_=jobs.c.due_at)
+                ))
+        if db.session.execute(bump).rowcount == 0:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(jobs).values(
+                        user_id=user_id, requested_version=1, completed_version=0, attempts=0,
+                        due_at=now + self.window, simulated_date=simulated_date,
+                    ))
+            except IntegrityError:
+                # process อื่น insert ไปก่อน → bump แทน
+                db.session.execute(bump)
+        version = db.session.execute(
+            select(jobs.c.requested_version).where(jobs.c.user_id == user_id)
+        ).scalar_one()
+        if commit:
+            db.session.commit()
+        if self.embedded:
+            self.start()
+        return version
+
+    def status(self, user_id):
+        """(requested, completed, failed) ของ user"""
+        jobs = RescheduleJobs.__table__
+        row = db.session.execute(
+            select(jobs.c.requested_version, jobs.c.completed_version, jobs.c.attempts)
+            .where(jobs.c.user_id == user_id)
+        ).first()
+        if row is None:
+            return 0, 0, False
+        return row.requested_version, row.completed_version, row.attempts >= self.max_attempts
+
+    def claim(self):
+        """
+        claim งานที่ถึงเวลา 1 งาน คืน (user_id, version, simulated_date) หรือ None
+        - งานที่ถึง due_at และไม่มีใคร claim อยู่ (หรือ lease หมดแล้ว)
+        - งานที่ worker เดิมตายระหว่างรัน: lease หมดและยังทำไม่ถึง requested_version (claim ตั้ง due_at = None ไปแล้ว)
+        """
+        jobs = RescheduleJobs.__table__
+        now = datetime.utcnow()
+        expired = jobs.c.claimed_at < now - self.lease
+        ready = or_(
+            and_(jobs.c.due_at <= now, or_(jobs.c.claimed_by.is_(None), expired)),
+            and_(expired, jobs.c.completed_version < jobs.c.requested_version),
+        )
+        candidates = db.session.execute(
+            select(jobs.c.user_id)
+            .where(ready)
+            .order_by(func.coalesce(jobs.c.due_at, jobs.c.claimed_at))
+            .limit(self.workers)
+        ).scalars().all()
+        for user_id in candidates:
+            claimed = db.session.execute(
+                update(jobs)
+                .where(jobs.c.user_id == user_id, ready)
+                .values(claimed_by=self.worker_id, claimed_at=now, due_at=None)
+            ).rowcount
+            if claimed:
+                row = db.session.execute(
+                    select(jobs.c.requested_version, jobs.c.simulated_date).where(jobs.c.user_id == user_id)
+                ).one()
+                db.session.commit()
+                return user_id, row.requested_version, row.simulated_date
+        db.session.commit()
+        return None
+
+    def finish(self, user_id, version, failed=False):
+        jobs = RescheduleJobs.__table__
+        mine = (jobs.c.user_id == user_id) & (jobs.c.claimed_by == self.worker_id)
+        values = {"claimed_by": None, "claimed_at": None}
+        if failed:
+            attempts = db.session.execute(select(jobs.c.attempts).where(mine)).scalar()
+            if attempts is None:
+                # lease หมดและ worker อื่นเอาไปแล้ว
+                db.session.commit()
+                return
+            attempts += 1
+            values["attempts"] = attempts
+            if attempts < self.max_attempts:
+                # คืนงานเข้าคิว ลองใหม่แบบ backoff (trigger ใหม่ระหว่างนี้ก็รวมเข้ารอบนี้)
+                values["due_at"] = datetime.utcnow() + timedelta(seconds=self.backoff * 2 ** (attempts - 1))
+            else:
+                logger.error("reschedule user %s gave up after %d attempts", user_id, attempts)
+                values["due_at"] = None
+        else:
+            values["completed_version"] = version
+            values["attempts"] = 0
+        db.session.execute(
+            update(jobs)
+            .where(mine)
+            .values(**values)
+        )
+        db.session.commit()
+
+    def work_once(self):
+        """ทำงานที่ถึงเวลา 1 งาน คืน True ถ้ามีงานให้ทำ"""
+        with self.app.app_context():
+            try:
+                job = self.claim()
+            finally:
+                db.session.remove()
+        if job is None:
+            return False
+        user_id, version, simulated_date = job
+        failed = False
+        try:
+            run_reschedule(self.app, user_id, simulated_date)
+        except Exception:
+            failed = True
+        with self.app.app_context():
+            try:
+                self.finish(user_id, version, failed=failed)
+            finally:
+                db.session.remove()
+        return True
+
+    def work_forever(self):
+        while not self.stopped.is_set():
+            try:
+                busy = self.work_once()
+            except Exception as e:
+                logger.exception("reschedule worker error")
+                busy = False
+            if not busy:
+                self.stopped.wait(self.poll)
+
+    def start(self):
+        """เริ่ม worker thread ใน process นี้ (จาก CLI หรือครั้งแรกที่ enqueue ถ้าเปิด embedded)"""
+        if self.threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work_forever, name=f"reschedule-db-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+
+def get_queue(app=None):
+    """คืนคิว reschedule ของ app ตาม RESCHEDULE_MODE (สร้างครั้งแรกที่เรียก)"""
+    app = app or current_app._get_current_object()
+    queue = app.extensions.get("reschedule_queue")
+    if queue is None:
+        if RESCHEDULE_MODE == "db":
+            queue = DbRescheduleQueue(app)
+        else:
+            queue = ThreadRescheduleQueue(app)
+        app.extensions["reschedule_queue"] = queue
+    return queue
+
+
+def _enqueue_pending(session):
+    """after_commit: ส่ง user ที่รอ commit อยู่เข้าคิว (โหมด thread)"""
+    pending = session.info.pop("reschedule_pending", None)
+    if not pending:
+        return
+    queue = get_queue()
+    for user_id, simulated_date in pending.items():
+        version = queue.enqueue(user_id, simulated_date)
+        if has_app_context():
+            g.reschedule_version = version
+
+
+def _drop_pending(session):
+    """after_rollback: transaction ที่สั่ง reschedule ถูก rollback → ไม่ต้องเข้าคิว"""
+    session.info.pop("reschedule_pending", None)
+
+
+def enqueue_after_commit(user_id, simulated_date=None):
+    """
+    รอส่ง user เข้าคิว (โหมด thread) จนกว่า session ปัจจุบันจะ commit
+    คิวในหน่วยความจำไม่อยู่ใน transaction → ถ้า enqueue ก่อน commit worker อาจอ่านข้อมูลเก่า
+    """
+    session = db.session()
+    session.info.setdefault("reschedule_pending", {})[user_id] = simulated_date
+    if not event.contains(session, "after_commit", _enqueue_pending):
+        event.listen(session, "after_commit", _enqueue_pending)
+        event.listen(session, "after_rollback", _drop_pending)
+
+
+class RescheduleService:
+    """
+    Service สำหรับสั่งจัดตารางใหม่หลังมีการเขียนข้อมูล (เพิ่ม/ลบแผน, feedback, เปลี่ยนชั่วโมงอ่าน)
+    - inline: เรียก update_schedule ทันที (เหมือนเดิม)
+    - thread/db: ส่ง user เข้าคิวพร้อม commit ของคนเรียก → endpoint ตอบกลับได้เลย
+    version ของคิวที่สั่งล่าสุดเก็บไว้ใน g.reschedule_version ให้ route ส่งกลับไปให้ client poll /api/schedule/status
+    (คนละตัวกับ User.schedule_version ที่ใช้ทำ ETag)
+    """
+    @staticmethod
+    def request(user, persist=True, commit=True):
+        """
+        สั่ง reschedule ของ user
+        - persist=False จะคำนวณ inline เสมอ (ไม่เขียนอะไรลง DB อยู่แล้ว)
+        - commit=False ไม่ commit แทนคนเรียก: โหมด db เขียนงานลงคิวใน transaction เดียวกัน,
+          โหมด thread รอ enqueue หลังคนเรียก commit
+        - งานในคิวใช้ simulated_date ของ request นี้
+        คืน version ของคิวที่สั่ง (0 ในโหมด inline, None ถ้ารอ commit)
+        """
+        if persist:
+            SLOTS_CACHE.invalidate(user.id)
+        if RESCHEDULE_MODE == "inline" or not persist:
+            ScheduleService.update_schedule(user, persist=persist, commit=commit)
+            return 0
+
+        simulated_date = get_simulated_date()
+        if RESCHEDULE_MODE == "db":
+            version = get_queue().enqueue(user.id, simulated_date, commit=commit)
+        elif commit:
+            db.session.commit()
+            version = get_queue().enqueue(user.id, simulated_date)
+        else:
+            enqueue_after_commit(user.id, simulated_date)
+            return None
+        if has_app_context():
+            g.reschedule_version = version
+        return version
+
+    @staticmethod
+    def status(user):
+        """คืน (requested_version, completed_version, failed) ของ user (failed = ลองครบแล้วยังไม่สำเร็จ)"""
+        if RESCHEDULE_MODE == "inline":
+            return 0, 0, False
+        return get_queue().status(user.id)
+
+    @staticmethod
+    def current_version():
+        """version ของคิวที่ถูกสั่งใน request นี้ (0 ถ้าไม่มี/โหมด inline) เทียบกับ requested_version ของ /api/schedule/status"""
+        return g.get("reschedule_version", 0) if has_app_context() else 0
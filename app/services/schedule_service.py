@@ -1,12 +1,33 @@
+import os
 import math
+import logging
+import heapq
+import copy
+import time
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import List, Dict, Tuple
 from collections import defaultdict
 from datetime import date, datetime, timedelta
+from sqlalchemy import select, insert, update, delete, bindparam
 from app.extensions import db
 from app.models import DailyAllocations, ReadingPlans, User
 from datetime import date, timedelta
-from app.utils.utils import log, get_today
+from app.utils.utils import get_today
+from app.services.user_cache import mark_dirty
+
+logger = logging.getLogger(__name__)
+
+# เลือก engine ของ schedule_backward: "heap" (ค่าเริ่มต้น) หรือ "reference" (แบบเดิม ไว้เทียบผล)
+SCHEDULE_ENGINE = os.getenv("SCHEDULE_ENGINE", "heap")
+
+# metric สะสม: จำนวนแถว DailyAllocations ที่ save_schedule เขียนลง DB
+WRITE_STATS: Dict[str, int] = defaultdict(int)
+
+# cache ผล calculate_slots(persist=False) สำหรับหน้า dashboard / GET /api/plans (0 = ปิด cache)
+SLOTS_CACHE_SIZE = int(os.getenv("SLOTS_CACHE_SIZE", "1024"))
+SLOTS_CACHE_TTL = float(os.getenv("SLOTS_CACHE_TTL", "300"))
 
 @dataclass
 class Subject:
@@ -24,7 +45,7 @@ def check_feasible(start_day: int, daily_hours: int, subjects: List[Subject]) ->
 	last_day = max(s.exam_day for s in subjects)
 	total_time = (last_day - start_day) * daily_hours
 	total_required = sum(s.required for s in subjects)
-	log(f"check feasible: total_time {total_time}, total_required {total_required}", debug=True)
+	logger.debug("check feasible: total_time %s, total_required %s", total_time, total_required)
 	return total_time == total_required
 
 def redistribute_subject(start_day: int, daily_hours: int, subjects: List[Subject]) -> bool:
@@ -39,14 +60,15 @@ def redistribute_subject(start_day: int, daily_hours: int, subjects: List[Subjec
 		available = (s.exam_day - start_day) * daily_hours
 		if (s.required + redistributeted) > available: # เพิ่มการหักด้วย redistributeted
 			excess = (s.required + redistributeted) - available # คิดกับ redistributeted
-			print(f"Subject '{s.name}' requires {s.required} but only {available - redistributeted} hours available before exam day {s.exam_day}")
-			print(f"Redistributing excess {excess} hours to later subjects...")
+			logger.debug("subject %r requires %s but only %s hours available before exam day %s",
+						 s.name, s.required, available - redistributeted, s.exam_day)
+			logger.debug("redistributing excess %s hours to later subjects", excess)
 			redistributeted += s.required - excess # เพิ่มการเก็บ redistributeted
 
 			# หา subjects ที่สอบหลังจาก s.exam_day
 			later_subjects = [t for t in subjects if t.exam_day > s.exam_day]
 			if not later_subjects:
-				print("No later subjects to redistribute to → Impossible")
+				logger.debug("no later subjects to redistribute to → impossible")
 				return False
 
 			weights = [t.required for t in later_subjects]
@@ -75,9 +97,42 @@ def largest_remainder_allocation(weights: List[int], capacity: int) -> List[int]
 		result[frac[i][0]] += 1
 	return result
 
-def schedule_backward(start_day: int, daily_hours: int, subjects: List[Subject]) -> Dict[int, List[Tuple[str, int]]]:
+def round_largest_remainder_batch(shares, mask, capacity):
+	"""
+	(NumPy) ปัดเศษ shares ทีละแถวแบบ largest remainder
+	- shares, mask: array (R, K) / capacity: array (R,)
+	- เศษเท่ากันให้ตัวที่มาก่อนได้ก่อน (เหมือน sort แบบ stable ของเวอร์ชัน Python)
+	"""
+	import numpy as np
+	floors = np.floor(shares)
+	remainder = (capacity - floors.sum(axis=1)).astype(np.int64)
+	frac = np.where(mask, shares - floors, -np.inf)
+	order = np.argsort(-frac, axis=1, kind="stable")
+	rank = np.empty_like(order)
+	np.put_along_axis(rank, order, np.arange(shares.shape[1])[None, :].repeat(shares.shape[0], axis=0), axis=1)
+	counts = np.maximum(mask.sum(axis=1), 1)
+	extra = (remainder // counts)[:, None] + (rank < (remainder % counts)[:, None])
+	return np.where(mask, floors + extra, 0).astype(np.int64)
+
+def largest_remainder_allocation_batch(weights, mask, capacity):
+	"""
+	(NumPy) largest_remainder_allocation หลายแถวพร้อมกัน
+	- weights, mask: array (R, K) (ช่องที่ mask=False คือ padding) / capacity: array (R,)
+	- คืน array (R, K) ที่ผลแต่ละแถวเหมือน largest_remainder_allocation ทุกประการ
 	"""
-	สร้างตารางอ่านหนังสือย้อนหลัง (backward scheduling)
+	import numpy as np
+	weights = np.where(mask, weights, 0).astype(np.float64)
+	capacity = np.asarray(capacity, dtype=np.float64)
+	total = np.cumsum(weights, axis=1)[:, -1]  # บวกซ้ายไปขวาเหมือน sum() ของ Python
+	valid = total > 0
+	shares = np.divide(weights * capacity[:, None], total[:, None], out=np.zeros_like(weights), where=valid[:, None])
+	result = round_largest_remainder_batch(shares, mask, capacity)
+	result[~valid] = 0
+	return result
+
+def schedule_backward_reference(start_day: int, daily_hours: int, subjects: List[Subject]) -> Dict[int, List[Tuple[str, int]]]:
+	"""
+	(reference) สร้างตารางอ่านหนังสือย้อนหลัง (backward scheduling)
 	- ใส่วันที่ทบทวนก่อน (วันก่อนสอบ)
 	- ไล่จากวันหลัง → วันหน้า กระจายชั่วโมงที่เหลือ
 	คืน dict: day ordinal → list ของ (subject, hours)
@@ -86,7 +141,7 @@ def schedule_backward(start_day: int, daily_hours: int, subjects: List[Subject])
 	schedule: Dict[int, List[Tuple[str, int]]] = {day: [] for day in range(start_day, last_day)}
 
 	if not check_feasible(start_day, daily_hours, subjects):
-		log(f"it's feasible return null", debug=True)
+		logger.debug("it's feasible return null")
 		return None
     
 	redistribute_subject(start_day, daily_hours, subjects)
@@ -133,12 +188,196 @@ def schedule_backward(start_day: int, daily_hours: int, subjects: List[Subject])
 
 	return schedule
 
+def schedule_backward_heap(start_day: int, daily_hours: int, subjects: List[Subject]) -> Dict[int, List[Tuple[str, int]]]:
+	"""
+	สร้างตารางอ่านหนังสือย้อนหลังแบบเดียวกับ schedule_backward_reference แต่ใช้ priority queue
+	- วิชาจะถูกใส่ใน heap ตอนไล่วันย้อนมาถึงวันก่อนสอบ และถูกเอาออกเมื่อ remaining หมด
+	- ไม่ต้อง filter/sort วิชาทั้งหมดใหม่ทุกวัน → O((D+S) log S)
+	คืน dict: day ordinal → list ของ (subject, hours) (ผลเหมือน reference ทุกประการ)
+	"""
+	last_day = max(s.exam_day for s in subjects)
+	schedule: Dict[int, List[Tuple[str, int]]] = {day: [] for day in range(start_day, last_day)}
+
+	if not check_feasible(start_day, daily_hours, subjects):
+		logger.debug("it's feasible return null")
+		return None
+
+	redistribute_subject(start_day, daily_hours, subjects)
+
+	# 1. ใส่วันที่ทบทวนก่อน (วันก่อนสอบ) เหมือน reference
+	for review_day, subs in review_day_groups(start_day, subjects).items():
+		weights = [s.remaining for s in subs]
+		allocation = largest_remainder_allocation(weights, daily_hours)
+		apply_review_allocation(schedule, review_day, subs, allocation)
+
+	# 2. ไล่จากวันหลัง → วันหน้า โดยเก็บ candidates ไว้ใน heap
+	fill_backward_heap(start_day, last_day, daily_hours, subjects, schedule)
+	return schedule
+
+def review_day_groups(start_day: int, subjects: List[Subject]) -> Dict[int, List[Subject]]:
+	"""
+	จับกลุ่มวิชาตามวันทบทวน (วันก่อนสอบ) ที่ยังอยู่ใน horizon (เรียงตามลำดับวิชาเดิม)
+	"""
+	exam_groups: Dict[int, List[Subject]] = {}
+	for s in subjects:
+		review_day = s.exam_day - 1
+		if review_day >= start_day:
+			exam_groups.setdefault(review_day, []).append(s)
+	return exam_groups
+
+def apply_review_allocation(schedule, review_day: int, subs: List[Subject], allocation: List[int]):
+	"""
+	ใส่ชั่วโมงวันทบทวนที่คำนวณแล้วลง schedule และหัก remaining ของวิชา
+	"""
+	entries = []
+	for s, hrs in zip(subs, allocation):
+		if hrs > 0:
+			s.remaining -= hrs
+			entries.append((s.name, hrs))
+	schedule[review_day].extend(entries)
+
+def fill_backward_heap(start_day: int, last_day: int, daily_hours: int, subjects: List[Subject], schedule):
+	"""
+	ไล่จากวันหลัง → วันหน้า เติมชั่วโมงที่เหลือของแต่ละวันด้วยวิชาที่ง่ายที่สุดก่อน (ใช้ heap)
+	key เดียวกับ reference (level, -exam_day, ชื่อกลับด้าน) + index เดิมแทน stable sort
+	"""
+	by_exam = sorted(range(len(subjects)), key=lambda i: subjects[i].exam_day, reverse=True)
+	pointer = 0
+	heap: List[Tuple[int, int, str, int]] = []
+
+	for day in range(last_day-1, start_day-1, -1):
+		# วิชาที่สอบหลังจากวันนี้ เข้า heap (เข้าครั้งเดียว เพราะวันลดลงเรื่อย ๆ)
+		while pointer < len(by_exam) and subjects[by_exam[pointer]].exam_day > day:
+			i = by_exam[pointer]
+			s = subjects[i]
+			if s.remaining > 0:
+				heapq.heappush(heap, (s.level, -s.exam_day, s.name[::-1], i))
+			pointer += 1
+
+		remaining_capacity = daily_hours - sum(hrs for _, hrs in schedule[day])
+		if remaining_capacity <= 0:
+			continue
+
+		while remaining_capacity > 0 and heap:
+			s = subjects[heap[0][3]]
+			hrs = min(s.remaining, remaining_capacity)
+			s.remaining -= hrs
+			schedule[day].append((s.name, hrs))
+			remaining_capacity -= hrs
+			if s.remaining == 0:
+				heapq.heappop(heap)
+
+def schedule_backward(start_day: int, daily_hours: int, subjects: List[Subject]) -> Dict[int, List[Tuple[str, int]]]:
+	"""
+	สร้างตารางอ่านหนังสือย้อนหลัง เลือก engine ตาม SCHEDULE_ENGINE
+	- "heap": schedule_backward_heap (ค่าเริ่มต้น)
+	- "reference": schedule_backward_reference (แบบเดิม)
+	"""
+	if SCHEDULE_ENGINE == "reference":
+		return schedule_backward_reference(start_day, daily_hours, subjects)
+	return schedule_backward_heap(start_day, daily_hours, subjects)
+
+
+class SlotsPreviewCache:
+	"""
+	LRU + TTL cache ของผล calculate_slots แบบ preview (persist=False)
+	- key เป็น fingerprint ของ input ทั้งหมด (แผน, daily_read_hours, latest_exam_date, วันนี้)
+	  ถ้าข้อมูลเปลี่ยนจาก process อื่น (เช่น reschedule worker) key ก็เปลี่ยนตาม ไม่ได้ค่าเก่า
+	- invalidate(user_id) ใช้จาก write path เพื่อคืนหน่วยความจำทันที
+	- นับ hits / misses / evictions ไว้ดูประสิทธิภาพ
+	"""
+	def __init__(self, maxsize=SLOTS_CACHE_SIZE, ttl=SLOTS_CACHE_TTL):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.lock = threading.Lock()
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	@staticmethod
+	def fingerprint(user, today, next_day=False, mode="latest"):
+		"""
+		คืน key ของ input ที่ calculate_slots ใช้ หรือ None ถ้าไม่ควร cache
+		(horizon ยังไม่ถูกอัปเดต → calculate_slots จะแก้ weight ใน session ต้องรันจริง)
+		"""
+		plans = user.reading_plans
+		if plans and user.latest_exam_date != max(p.exam_date for p in plans):
+			return None
+		return (
+			user.id, today, next_day, mode, user.daily_read_hours, user.latest_exam_date,
+			tuple(sorted(
+				(p.id, p.exam_name, p.exam_date, p.level, p.weight, p.allocated_slot)
+				for p in plans
+			))
+		)
+
+	def get(self, key):
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is not None and entry[0] > time.monotonic():
+				self.entries.move_to_end(key)
+				self.hits += 1
+				return copy.deepcopy(entry[1])
+			if entry is not None:
+				del self.entries[key]
+				self.evictions += 1
+			self.misses += 1
+			return None
+
+	def put(self, key, value):
+		with self.lock:
+			self.entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.maxsize:
+				self.entries.popitem(last=False)
+				self.evictions += 1
+
+	def invalidate(self, user_id=None):
+		"""ลบ entry ของ user (หรือทั้งหมดถ้าไม่ระบุ user_id)"""
+		with self.lock:
+			if user_id is None:
+				self.entries.clear()
+				return
+			for key in [k for k in self.entries if k[0] == user_id]:
+				del self.entries[key]
+
+	def stats(self):
+		with self.lock:
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"evictions": self.evictions,
+				"size": len(self.entries),
+			}
+
+
+SLOTS_CACHE = SlotsPreviewCache()
+
 
 class ScheduleService:
 	"""
 	Service สำหรับจัดการตารางเรียน/อ่านหนังสือของ user
 	- ใช้เมื่อมีการเพิ่ม/ลบแผน, เปลี่ยน weight, เปลี่ยนเวลาต่อวัน ฯลฯ
 	"""
+	@staticmethod
+	def bump_version(*user_ids):
+		"""
+		เพิ่ม User.schedule_version ของ user ที่ plans/allocations เปลี่ยน (ยังไม่ commit)
+		- ใช้ UPDATE ... SET schedule_version = schedule_version + 1 ให้ถูกต้องแม้หลาย process เขียนพร้อมกัน
+		- bulk UPDATE ไม่ผ่าน flush จึงต้องล้าง USER_CACHE เอง (ETag ของ /api/schedule อ่านจาก version นี้)
+		"""
+		if not user_ids:
+			return
+		db.session.execute(
+			update(User)
+			.where(User.id.in_(user_ids))
+			.values(schedule_version=User.schedule_version + 1)
+			.execution_options(synchronize_session=False)
+		)
+		mark_dirty(db.session(), *user_ids)
+
+
 	@staticmethod
 	def get_total_weight(user):
 		"""
@@ -155,7 +394,7 @@ class ScheduleService:
 		latest_exam = max(p.exam_date for p in user.reading_plans)
 		if start_days is None:
 			start_days = get_today()
-		log(f"start_days: {start_days}", debug=True)
+		logger.debug("start_days: %s", start_days)
 		start_days = (latest_exam - start_days).days
 		if next_day:
 			start_days -= 1
@@ -164,13 +403,13 @@ class ScheduleService:
 
 
 	@staticmethod
-	def update_schedule(user, persist=True):
+	def update_schedule(user, persist=True, commit=True):
 		"""
 		อัปเดตตาราง schedule ของ user
 		- ถ้าวันนี้ตอบ feedback ครบแล้ว → สร้างตารางใหม่เริ่มพรุ่งนี้
 		- ถ้ายังไม่เคยมี allocation วันนี้เลย → สร้างตารางเริ่มวันนี้
 		- ถ้ายังตอบ feedback ไม่ครบ → คำนวณตารางใหม่ (แต่ไม่เปลี่ยน horizon)
-		persist=True จะ commit ลง DB ทันที
+		persist=True จะ commit ลง DB ทันที (commit=False เขียนลง session แต่ให้คนเรียก commit เอง)
 		"""
 		today = get_today()
 
@@ -190,26 +429,27 @@ class ScheduleService:
 		if pending_today == 0:
 			if has_today:
 				# ✅ มี allocation วันนี้แล้ว และตอบครบ → สร้างตารางใหม่เริ่มพรุ่งนี้
-				ScheduleService.calculate_slots(user, next_day=True, persist=persist)
-				ScheduleService.distribute_schedule(user, next_day=True, persist=persist)
+				ScheduleService.calculate_slots(user, next_day=True, persist=persist, commit=commit)
+				ScheduleService.distribute_schedule(user, next_day=True, persist=persist, commit=commit)
 			else:
 				# ✅ ยังไม่เคยมี allocation วันนี้เลย (เพิ่งเพิ่มวิชาแรก)
 				# → สร้างตารางเริ่มจากวันนี้
-				ScheduleService.calculate_slots(user, next_day=False, persist=persist)
-				ScheduleService.distribute_schedule(user, next_day=False, persist=persist)
+				ScheduleService.calculate_slots(user, next_day=False, persist=persist, commit=commit)
+				ScheduleService.distribute_schedule(user, next_day=False, persist=persist, commit=commit)
 		else:
-			ScheduleService.calculate_slots(user, persist=persist)
-			ScheduleService.distribute_schedule(user, persist=persist)
+			ScheduleService.calculate_slots(user, persist=persist, commit=commit)
+			ScheduleService.distribute_schedule(user, persist=persist, commit=commit)
 
 
 
 	@staticmethod
-	def calculate_slots(user, start_days=None, next_day=False, mode="latest", persist=True):
+	def calculate_slots(user, start_days=None, next_day=False, mode="latest", persist=True, commit=True):
 		"""
 		คำนวณ slot ของแต่ละวิชา
 		- start_days: วันเริ่มอ่าน (ถ้าไม่ใส่จะใช้วันนี้)
 		- next_day: ความคลาดเคลื่อนของวัน (อย่างลงวันนี้อ่านพรุ่งนี้ กันบรีฟแตก)
 		- persist: ถ้า True จะอัปเดต weight และ allocated_slot ลง DB
+		- commit: ถ้า False จะไม่ commit เอง (ใช้ตอนรวมหลายงานไว้ใน transaction เดียว)
 		"""
 		if not user.reading_plans:
 			return {}
@@ -219,7 +459,7 @@ class ScheduleService:
 		if start_days is None:
 			start_days = get_today()
         
-		log(f"start_days: {start_days}", debug=True)
+		logger.debug("start_days: %s", start_days)
 
 		start_days = (latest_exam - start_days).days
 		if next_day:
@@ -232,7 +472,8 @@ class ScheduleService:
 				for plan in user.reading_plans:
 					plan.weight = 0
 					plan.allocated_slot = 0
-				db.session.commit()
+				if commit:
+					db.session.commit()
 			return result
 
 		# slot ทั้งหมดที่มี
@@ -244,7 +485,7 @@ class ScheduleService:
 			user.latest_exam_date = latest_exam
 			old_latest = latest_exam
 
-		log(f"check horizon")
+		logger.debug("check horizon")
 
 		if latest_exam > old_latest:
 			# horizon ขยาย → เพิ่ม weight
@@ -252,7 +493,7 @@ class ScheduleService:
 			if next_day:
 				delta_days -= 1
 
-			log("calculate_slots", f"horizon extended, delta_days: {delta_days}")
+			logger.info("calculate_slots: horizon extended, delta_days: %s", delta_days)
 
 			for plan in user.reading_plans:
 				if plan.allocated_slot > 0:
@@ -266,7 +507,7 @@ class ScheduleService:
 			if next_day:
 				delta_days -= 1
 
-			log("calculate_slots", f"horizon shrunk, delta_days: {delta_days}")
+			logger.info("calculate_slots: horizon shrunk, delta_days: %s", delta_days)
 
 			for plan in user.reading_plans:
 				if plan.allocated_slot > 0:
@@ -311,7 +552,8 @@ class ScheduleService:
 				for s in subjects:
 					s["plan"].weight = 0
 					s["plan"].allocated_slot = 0
-				db.session.commit()
+				if commit:
+					db.session.commit()
 			return result
 
 		# --- 6) คำนวณ slot ตามสัดส่วน weight ---
@@ -335,7 +577,8 @@ class ScheduleService:
 			for plan, val, weight in raw:
 				plan.weight = weight
 				plan.allocated_slot = floored[plan.exam_name]
-			db.session.commit()
+			if commit:
+				db.session.commit()
 
 		# --- 8) return พร้อม weight ---
 		result = {
@@ -349,7 +592,28 @@ class ScheduleService:
 
 
 	@staticmethod
-	def distribute_schedule(user, start_day=None, next_day=False, persist=True):
+	def preview_slots(user, next_day=False, mode="latest"):
+		"""
+		calculate_slots แบบไม่ persist (ใช้แสดงผล) ผ่าน SLOTS_CACHE
+		- ผลเหมือน calculate_slots(user, persist=False) ทุกกรณี
+		"""
+		if SLOTS_CACHE.maxsize <= 0:
+			return ScheduleService.calculate_slots(user, next_day=next_day, mode=mode, persist=False)
+
+		key = SLOTS_CACHE.fingerprint(user, get_today(), next_day=next_day, mode=mode)
+		if key is not None:
+			cached = SLOTS_CACHE.get(key)
+			if cached is not None:
+				return cached
+
+		result = ScheduleService.calculate_slots(user, next_day=next_day, mode=mode, persist=False)
+		if key is not None:
+			SLOTS_CACHE.put(key, result)
+		return result
+
+
+	@staticmethod
+	def distribute_schedule(user, start_day=None, next_day=False, persist=True, commit=True):
 		"""
 		โหลด ReadingPlans ของ user จาก DB, แปลงเป็น Subject,
 		เรียก schedule_backward, และ persist ลง DailyAllocations ถ้าต้องการ
@@ -360,7 +624,7 @@ class ScheduleService:
 		"""
 		plans = ReadingPlans.query.filter_by(user_id=user.id).all()
 		if not plans:
-			log("no plan", debug=True)
+			logger.debug("no plan")
 			return None
 
 		# แปลงเป็น Subject (copy ค่า primitive จริง ๆ + plan_id)
@@ -385,36 +649,214 @@ class ScheduleService:
 
 		schedule = schedule_backward(start_day, daily_hours, subjects)
 		if schedule is None:
-			log("no schedule")
+			logger.debug("no schedule")
 			return None
 
 		if persist:
-			today = get_today()
-			# ลบเฉพาะ allocation ที่ยังไม่ได้ feedback และเป็นวันอนาคต
-			# เปลี่ยนเป็นลบเป็นวันอนาคตเฉยๆ
-			DailyAllocations.query.filter(
-				DailyAllocations.user_id == user.id,
-				DailyAllocations.feedback_done == False,
-				DailyAllocations.date >= today
-			).delete()
+			ScheduleService.save_schedule(user, subjects, schedule, commit=commit)
+			return schedule # คืนตารางด้วยเพื่อให้ route แสดงหรือ redirect ได้
+
+		return schedule
 
-			db.session.commit()
-			
-			# เพิ่ม allocations ใหม่จาก schedule
-			for d in sorted(schedule.keys()):
-				for subject_name, hours in schedule[d]:
-					subj = next((s for s in subjects if s.name == subject_name), None)
-					if not subj:
-						continue
-					db.session.add(DailyAllocations(
-						user_id=user.id,
-						plan_id=subj.plan_id,
-						date=date.fromordinal(d),
-						slots=hours,
-						exam_name_snapshot=subj.name  # ✅ copy ชื่อวิชาเก็บไว้
-					))
 
+	@staticmethod
+	def save_schedule(user, subjects, schedule, today=None, commit=True):
+		"""
+		เขียน schedule ลง DailyAllocations แบบ diff (ไม่ลบทิ้งทั้งหมดแล้ว insert ใหม่)
+		- โหลด allocation อนาคตที่ยังไม่ได้ feedback มาเทียบกับ schedule ใหม่ ต่อ (วัน, plan)
+		- insert เฉพาะที่เพิ่มมา, update เฉพาะที่ slots/ชื่อเปลี่ยน, delete ที่ไม่อยู่ในตารางใหม่
+		- ใช้ bulk Core statement และ commit ครั้งเดียว (commit=False ให้คนเรียก commit เอง)
+		คืน dict จำนวนแถวที่เขียน (inserted/updated/deleted/rows_written)
+		"""
+		if today is None:
+			today = get_today()
+		table = DailyAllocations.__table__
+		by_name = {s.name: s for s in subjects}
+
+		# allocation อนาคตที่ยังไม่ได้ feedback (ชุดที่ตารางใหม่จะมาแทน)
+		existing = defaultdict(list)
+		rows = db.session.execute(
+			select(table.c.id, table.c.date, table.c.plan_id, table.c.slots, table.c.exam_name_snapshot)
+			.where(
+				table.c.user_id == user.id,
+				table.c.feedback_done == False,
+				table.c.date >= today
+			)
+			.order_by(table.c.id)
+		).all()
+		for row in rows:
+			existing[(row.date.toordinal(), row.plan_id)].append(row)
+
+		inserts, updates = [], []
+		for d in sorted(schedule.keys()):
+			for subject_name, hours in schedule[d]:
+				subj = by_name.get(subject_name)
+				if not subj:
+					continue
+				matched = existing.get((d, subj.plan_id))
+				if matched:
+					row = matched.pop(0)
+					if row.slots != hours or row.exam_name_snapshot != subj.name:
+						updates.append({"_id": row.id, "_slots": hours, "_snapshot": subj.name})
+				else:
+					inserts.append({
+						"user_id": user.id,
+						"plan_id": subj.plan_id,
+						"date": date.fromordinal(d),
+						"slots": hours,
+						"feedback_done": False,
+						"exam_name_snapshot": subj.name  # ✅ copy ชื่อวิชาเก็บไว้
+					})
+		deletes = [row.id for left in existing.values() for row in left]
+
+		if deletes:
+			db.session.execute(delete(table).where(table.c.id.in_(deletes)))
+		if updates:
+			db.session.execute(
+				update(table)
+				.where(table.c.id == bindparam("_id"))
+				.values(slots=bindparam("_slots"), exam_name_snapshot=bindparam("_snapshot")),
+				updates
+			)
+		if inserts:
+			db.session.execute(insert(table), inserts)
+		if deletes or updates or inserts:
+			ScheduleService.bump_version(user.id)
+		if commit:
 			db.session.commit()
-			return schedule # คืนตารางด้วยเพื่อให้ route แสดงหรือ redirect ได้
 
-		return schedule
\ No newline at end of file
+		stats = {
+			"inserted": len(inserts),
+			"updated": len(updates),
+			"deleted": len(deletes),
+			"rows_written": len(inserts) + len(updates) + len(deletes),
+		}
+		for key, value in stats.items():
+			WRITE_STATS[key] += value
+		logger.debug("save_schedule user %s: %s", user.id, stats)
+		return stats
+
+
+	@staticmethod
+	def schedule_many(users, today=None, next_day=False, persist=False):
+		"""
+		(NumPy) คำนวณ calculate_slots + distribute_schedule ของ user หลายคนพร้อมกัน (ใช้ตอน rollover / เปลี่ยน algorithm)
+		- pack วิชาของทุก user เป็น array แบบ padding (level, weight, exam_day, daily_hours)
+		- ปรับ horizon, คิด weight และแจก slot แบบ largest remainder ทีเดียวทั้ง cohort
+		- แจกชั่วโมงวันทบทวนของทุก user ทีเดียว แล้วค่อยไล่ heap รายคน
+		- ผลเหมือนเรียก calculate_slots(persist=True) แล้ว distribute_schedule ทีละคน (mode="latest")
+		- persist=True จะเขียน weight/allocated_slot/latest_exam_date และ DailyAllocations ลง DB
+		ควรโหลด users พร้อม reading_plans มาก่อน (selectinload) เพื่อไม่ให้เกิด N+1
+		คืน dict: user_id → schedule (None เมื่อไม่มีแผนหรือ impossible)
+		"""
+		import numpy as np
+
+		if today is None:
+			today = get_today()
+		users = list(users)
+		results: Dict[int, Dict[int, List[Tuple[str, int]]]] = {u.id: None for u in users}
+		cohort = [(u, list(u.reading_plans)) for u in users]
+		cohort = [(u, plans) for u, plans in cohort if plans]
+		if not cohort:
+			return results
+
+		# --- 1) pack เป็น array (U, P) ---
+		n_users = len(cohort)
+		width = max(len(plans) for _, plans in cohort)
+		mask = np.zeros((n_users, width), dtype=bool)
+		level = np.zeros((n_users, width))
+		weight = np.zeros((n_users, width))
+		had_slot = np.zeros((n_users, width), dtype=bool)
+		exam_day = np.zeros((n_users, width), dtype=np.int64)
+		daily_hours = np.array([u.daily_read_hours for u, _ in cohort], dtype=np.float64)
+		old_latest = np.array([
+			u.latest_exam_date.toordinal() if u.latest_exam_date else 0 for u, _ in cohort
+		], dtype=np.int64)
+		for row, (u, plans) in enumerate(cohort):
+			k = len(plans)
+			mask[row, :k] = True
+			level[row, :k] = [p.level for p in plans]
+			weight[row, :k] = [p.weight or 0 for p in plans]
+			had_slot[row, :k] = [p.allocated_slot > 0 for p in plans]
+			exam_day[row, :k] = [p.exam_date.toordinal() for p in plans]
+
+		shift = 1 if next_day else 0
+		latest = np.where(mask, exam_day, np.iinfo(np.int64).min).max(axis=1)
+		start_days = latest - today.toordinal() - shift
+		active = start_days > 0  # ไม่มีวันเหลือ → slot เป็น 0 ทั้งหมด
+		old_latest = np.where(old_latest == 0, latest, old_latest)
+
+		# --- 2) ปรับ horizon (ขยาย → เพิ่ม weight / หด → ลด weight) ---
+		delta = latest - old_latest
+		grow = (delta > 0) & active
+		shrink = (delta < 0) & active
+		adjust = level * (np.abs(delta) - shift)[:, None]
+		weight = np.where(grow[:, None] & had_slot, weight + adjust, weight)
+		weight = np.where(shrink[:, None] & had_slot, np.maximum(0, weight - adjust), weight)
+
+		# --- 3) weight ของแต่ละวิชา + แจก slot ตามสัดส่วน ---
+		days_until_exam = latest - today.toordinal() + (1 - shift)
+		base_weight = level * (days_until_exam * daily_hours)[:, None]
+		final_weight = np.where(mask, np.where(weight != 0, weight, base_weight), 0)
+		total_weight = np.cumsum(final_weight, axis=1)[:, -1]
+		day_slots = np.where(active, start_days * daily_hours, 0)
+		valid = active & (total_weight != 0)
+		shares = np.divide(final_weight, total_weight[:, None], out=np.zeros_like(final_weight), where=valid[:, None]) * day_slots[:, None]
+		slots = round_largest_remainder_batch(shares, mask, day_slots)
+		slots[~valid] = 0
+		final_weight[~valid] = 0
+
+		# --- 4) แปลงเป็น Subject + feasibility/redistribute รายคน ---
+		start_day = today.toordinal() + shift
+		prepared = []
+		for row, (u, plans) in enumerate(cohort):
+			if persist:
+				if active[row]:
+					u.latest_exam_date = date.fromordinal(int(latest[row]))
+				for col, p in enumerate(plans):
+					p.weight = float(final_weight[row, col])
+					p.allocated_slot = int(slots[row, col])
+			subjects = [Subject(
+				name=str(p.exam_name),
+				level=int(p.level),
+				required=int(slots[row, col]),
+				exam_day=int(exam_day[row, col]),
+				remaining=int(slots[row, col]),
+				plan_id=int(p.id)
+			) for col, p in enumerate(plans)]
+			hours = int(daily_hours[row])
+			last_day = int(latest[row])
+			if not check_feasible(start_day, hours, subjects):
+				continue
+			redistribute_subject(start_day, hours, subjects)
+			schedule = {day: [] for day in range(start_day, last_day)}
+			prepared.append((u, subjects, hours, last_day, schedule))
+
+		# --- 5) แจกชั่วโมงวันทบทวนของทุก user ทีเดียว (แถวละ (user, review_day)) ---
+		groups = [
+			(schedule, review_day, subs, hours)
+			for u, subjects, hours, last_day, schedule in prepared
+			for review_day, subs in review_day_groups(start_day, subjects).items()
+		]
+		if groups:
+			group_width = max(len(subs) for _, _, subs, _ in groups)
+			group_mask = np.zeros((len(groups), group_width), dtype=bool)
+			group_weights = np.zeros((len(groups), group_width))
+			for row, (_, _, subs, _) in enumerate(groups):
+				group_mask[row, :len(subs)] = True
+				group_weights[row, :len(subs)] = [s.remaining for s in subs]
+			capacity = np.array([hours for _, _, _, hours in groups])
+			allocation = largest_remainder_allocation_batch(group_weights, group_mask, capacity)
+			for row, (schedule, review_day, subs, _) in enumerate(groups):
+				apply_review_allocation(schedule, review_day, subs, allocation[row, :len(subs)].tolist())
+
+		# --- 6) ไล่ heap รายคน + persist ---
+		for u, subjects, hours, last_day, schedule in prepared:
+			fill_backward_heap(start_day, last_day, hours, subjects, schedule)
+			results[u.id] = schedule
+			if persist:
+				ScheduleService.save_schedule(u, subjects, schedule, today=today, commit=False)
+
+		if persist:
+			db.session.commit()
+		return results
\ No newline at end of file
@@ -0,0 +1,162 @@
+import os
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import select, insert, update, delete, func, case
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import DailyAllocations, UserDailyStats
+from .feedback_service import FEEDBACK_TYPES
+
+# อ่านสถิติรายวันจาก rollup user_daily_stats (Feedback ดูแลให้ทีละ feedback)
+# 0 = GROUP BY จาก daily_allocations ทุกครั้ง และไม่เขียน rollup (เปิดใหม่ต้องรัน flask stats-rebuild)
+STATS_ROLLUP = os.getenv("STATS_ROLLUP", "1") == "1"
+# จำนวนสัปดาห์ของ heatmap ที่คืนเป็นค่าเริ่มต้น / สูงสุด
+STATS_HEATMAP_WEEKS = int(os.getenv("STATS_HEATMAP_WEEKS", "12"))
+STATS_HEATMAP_MAX_WEEKS = 53
+
+
+def feedback_by_day(user_id=None):
+    """SELECT ชั่วโมงที่ยืนยัน + จำนวน feedback แต่ละประเภท ต่อ (user, วัน) จาก daily_allocations ที่ตอบแล้ว"""
+    a = DailyAllocations
+    query = (
+        select(
+            a.user_id, a.date,
+            func.sum(a.slots).label("confirmed_hours"),
+            *[func.sum(case((a.feedback_type == kind, 1), else_=0)).label(kind) for kind in FEEDBACK_TYPES],
+        )
+        .where(a.feedback_done == True)
+        .group_by(a.user_id, a.date)
+    )
+    if user_id is not None:
+        query = query.where(a.user_id == user_id)
+    return query
+
+
+def streaks(days, today):
+    """(ปัจจุบัน, ยาวที่สุด) ของจำนวนวันติดกันที่มี feedback (นับต่อจากเมื่อวานได้ ถ้าวันนี้ยังไม่ได้ตอบ)"""
+    longest = run = 0
+    previous = None
+    for day in days:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous is not None and (today - previous).days <= 1 else 0
+    return current, longest
+
+
+class StatsService:
+    """
+    สถิติการอ่านของ user สำหรับ stat.html (GET /api/stats)
+    - ชั่วโมงตามแผน vs ที่ยืนยันแล้ว ต่อวิชา: GROUP BY exam_name_snapshot บน daily_allocations
+    - สัดส่วน feedback, streak, heatmap รายสัปดาห์: จากแถวรายวัน (rollup หรือ GROUP BY date)
+    """
+    @staticmethod
+    def record_feedback(user_id, items):
+        """
+        เพิ่มค่าใน user_daily_stats ตาม feedback ที่เพิ่ง apply (ยังไม่ commit)
+        - items: [(วันของ allocation, slots, feedback_type)]
+        - UPDATE ... SET x = x + n ก่อน ถ้ายังไม่มีแถวค่อย INSERT (ชนกับ process อื่นก็ UPDATE ซ้ำ)
+        """
+        if not STATS_ROLLUP or not items:
+            return
+        deltas = defaultdict(lambda: defaultdict(int))
+        for day, slots, feedback_type in items:
+            deltas[day]["confirmed_hours"] += slots or 0
+            if feedback_type in FEEDBACK_TYPES:
+                deltas[day][feedback_type] += 1
+
+        table = UserDailyStats.__table__
+        zeros = dict.fromkeys(("confirmed_hours",) + FEEDBACK_TYPES, 0)
+        for day, delta in deltas.items():
+            increment = update(table).where(table.c.user_id == user_id, table.c.date == day) \
+                .values({column: table.c[column] + value for column, value in delta.items()})
+            if db.session.execute(increment).rowcount:
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(table).values(user_id=user_id, date=day, **{**zeros, **delta}))
+            except IntegrityError:
+                db.session.execute(increment)
+
+    @staticmethod
+    def rebuild(user_id=None, commit=True):
+        """สร้าง user_daily_stats ใหม่จาก daily_allocations (user_id=None คือทุก user) คืนจำนวนแถว"""
+        table = UserDailyStats.__table__
+        clear = delete(table)
+        if user_id is not None:
+            clear = clear.where(table.c.user_id == user_id)
+        db.session.execute(clear)
+        source = feedback_by_day(user_id)
+        db.session.execute(insert(table).from_select(
+            ["user_id", "date", "confirmed_hours", *FEEDBACK_TYPES], source
+        ))
+        count_query = select(func.count()).select_from(table)
+        if user_id is not None:
+            count_query = count_query.where(table.c.user_id == user_id)
+        count = db.session.execute(count_query).scalar()
+        if commit:
+            db.session.commit()
+        return count
+
+    @staticmethod
+    def daily(user_id):
+        """แถวรายวันที่มี feedback เรียงตามวัน: date, confirmed_hours และจำนวนแต่ละ FEEDBACK_TYPES"""
+        if STATS_ROLLUP:
+            t = UserDailyStats
+            query = select(t.date, t.confirmed_hours, *[getattr(t, kind) for kind in FEEDBACK_TYPES]) \
+                .where(t.user_id == user_id).order_by(t.date)
+        else:
+            query = feedback_by_day(user_id).order_by(DailyAllocations.date)
+        return db.session.execute(query).all()
+
+    @staticmethod
+    def plans(user_id, today):
+        """ชั่วโมงตามแผน (ทั้งหมด / ถึงวันนี้) และที่ยืนยันแล้ว ต่อวิชา (รวมวิชาที่ลบแผนไปแล้ว)"""
+        a = DailyAllocations
+        rows = db.session.execute(
+            select(
+                a.exam_name_snapshot,
+                func.max(a.plan_id).label("plan_id"),
+                func.sum(a.slots).label("planned_hours"),
+                func.sum(case((a.date <= today, a.slots), else_=0)).label("planned_to_date"),
+                func.sum(case((a.feedback_done == True, a.slots), else_=0)).label("confirmed_hours"),
+            )
+            .where(a.user_id == user_id)
+            .group_by(a.exam_name_snapshot)
+            .order_by(a.exam_name_snapshot)
+        ).all()
+        return [{
+            "exam_name": row.exam_name_snapshot,
+            "plan_id": row.plan_id,
+            "planned_hours": int(row.planned_hours or 0),
+            "planned_to_date": int(row.planned_to_date or 0),
+            "confirmed_hours": int(row.confirmed_hours or 0),
+        } for row in rows]
+
+    @staticmethod
+    def summary(user_id, today, weeks=STATS_HEATMAP_WEEKS):
+        """สถิติทั้งหมดของ /api/stats (2 query)"""
+        plans = StatsService.plans(user_id, today)
+        days = [row for row in StatsService.daily(user_id) if row.date <= today]
+
+        feedback = {kind: sum(getattr(row, kind) for row in days) for kind in FEEDBACK_TYPES}
+        current, longest = streaks([row.date for row in days], today)
+
+        # heatmap: สัปดาห์ละแถว (จันทร์-อาทิตย์) ของชั่วโมงที่ยืนยัน ย้อนหลัง weeks สัปดาห์ถึงสัปดาห์นี้
+        start = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+        grid = [[0] * 7 for _ in range(weeks)]
+        for row in days:
+            offset = (row.date - start).days
+            if offset >= 0:
+                grid[offset // 7][offset % 7] = int(row.confirmed_hours)
+
+        return {
+            "today": today.isoformat(),
+            "source": "rollup" if STATS_ROLLUP else "allocations",
+            "plans": plans,
+            "totals": {key: sum(p[key] for p in plans)
+                       for key in ("planned_hours", "planned_to_date", "confirmed_hours")},
+            "feedback": feedback,
+            "streaks": {"current": current, "longest": longest, "active_days": len(days)},
+            "heatmap": {"start": start.isoformat(), "weeks": grid},
+        }
@@ -0,0 +1,130 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.extensions import db
+from app.models import User
+
+# cache ค่า column ของ User ต่อ process สำหรับ user_loader (0 = ปิด, โหลดจาก DB ทุก request แบบเดิม)
+# แต่ละ process ล้าง cache เฉพาะที่ตัวเองเขียน → หลาย process อาจเห็นค่าเก่าได้นานสุด TTL วินาที
+# จึง cache เฉพาะ column ที่แทบไม่เปลี่ยน (USER_CACHE_COLUMNS) ส่วน column อื่น (password, schedule_version,
+# daily_read_hours, latest_exam_date ฯลฯ) โหลดจาก DB ใหม่ทุกครั้งที่ใช้
+USER_CACHE_COLUMNS = ("id", "username", "email", "username_lower", "email_lower")
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "0"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+
+class UserCache:
+    """
+    LRU + TTL cache ของค่า USER_CACHE_COLUMNS ของ User (ไม่เก็บ object ของ session ไหน)
+    - load() สร้าง User กลับเข้า session ปัจจุบันโดยไม่ SELECT: request ที่ใช้แค่ id / ชื่อ ไม่ต้อง query users
+      column อื่นยังไม่โหลด → SELECT ครั้งเดียวตอนใช้ครั้งแรก (relationship ยัง lazy load ได้ตามปกติ)
+    - เขียน User ผ่าน ORM (flush) หรือ ScheduleService.bump_version → invalidate ทั้งตอน flush และหลัง commit
+    """
+    def __init__(self, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user):
+        columns = {key: getattr(user, key) for key in USER_CACHE_COLUMNS}
+        with self.lock:
+            self.entries[user.id] = (time.monotonic() + self.ttl, columns)
+            self.entries.move_to_end(user.id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        """ลบ entry ของ user (หรือทั้งหมดถ้าไม่ระบุ)"""
+        with self.lock:
+            if not user_ids:
+                self.entries.clear()
+                return
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+
+    def load(self, user_id):
+        """User ใน db.session (จาก cache ถ้ามีและยังไม่หมดอายุ) หรือ None"""
+        if not self.enabled:
+            return db.session.get(User, user_id)
+        # อยู่ใน session แล้ว (เช่น เพิ่งโหลด/เขียนใน request นี้) ใช้ตัวนั้นเลย
+        user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+        if user is not None:
+            return user
+        columns = self.get(user_id)
+        if columns is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self.put(user)
+            return user
+        user = User(**columns)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+USER_CACHE = UserCache()
+
+
+def load_user(user_id):
+    """user_loader ของ Flask-Login"""
+    return USER_CACHE.load(int(user_id))
+
+
+def get_current_user():
+    """
+    User ของ request นี้ หรือ None ถ้ายังไม่ login
+    ใช้ object เดียวกับ flask_login.current_user (user_loader ถูกเรียกแค่ครั้งเดียวต่อ request)
+    """
+    user = current_user._get_current_object()
+    return user if user.is_authenticated else None
+
+
+def mark_dirty(session, *user_ids):
+    """จด user ที่ถูกเขียนใน transaction นี้ ไว้ล้าง cache อีกครั้งหลัง commit"""
+    if user_ids and USER_CACHE.enabled:
+        USER_CACHE.invalidate(*user_ids)
+        session.info.setdefault("user_cache_dirty", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    mark_dirty(session, *(obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    # ล้างซ้ำหลัง commit: request อื่นอาจโหลดค่าก่อน commit เข้า cache ไประหว่างนั้น
+    dirty = session.info.pop("user_cache_dirty", None)
+    if dirty:
+        USER_CACHE.invalidate(*dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("user_cache_dirty", None)
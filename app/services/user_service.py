@@ -1,17 +1,18 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import URLSafeTimedSerializer
 from flask import current_app, session
 from app.extensions import db
-from app.models import User, ReadingPlans
-from .schedule_service import ScheduleService
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import selectinload
+from app.models import User, ReadingPlans, DailyAllocations, login_key
+from .schedule_service import ScheduleService, SLOTS_CACHE
+from .reschedule_service import RescheduleService
+from .password_hasher import PASSWORD_HASHER
 from datetime import datetime
 from app.utils.utils import get_today
 
 import logging
 logger = logging.getLogger(__name__)
 
-import logging
-
 
 
 class AuthService:
@@ -22,19 +23,52 @@ class AuthService:
 	@staticmethod
 	def set_password(user, password, persist=True):
 		"""
-		กำหนดรหัสผ่านใหม่ให้ user (hash ก่อนเก็บ)
+		กำหนดรหัสผ่านใหม่ให้ user (hash ด้วย PASSWORD_HASH_METHOD ใน pool ก่อนเก็บ)
 		persist=True จะ commit ลง DB ทันที
 		"""
-		user.password = generate_password_hash(password)
+		user.password = PASSWORD_HASHER.hash(password)
 		if persist:
 			db.session.commit()
 
 	@staticmethod
-	def check_password(user, password):
+	def check_password(user, password, persist=True):
+		"""
+		ตรวจสอบรหัสผ่าน (hash แล้วเทียบกับที่เก็บใน DB) ใน pool ของ PASSWORD_HASHER
+		- ถ้าถูกต้องแต่ hash ที่เก็บไว้ใช้ method อื่น จะ hash ใหม่ด้วย method ปัจจุบัน (persist=True จะ commit)
+		- คิวเต็มจะ raise PasswordHasherBusy
+		"""
+		if not PASSWORD_HASHER.verify(user.password, password):
+			return False
+		if PASSWORD_HASHER.needs_rehash(user.password):
+			logger.info("rehash password of user %s", user.id)
+			PASSWORD_HASHER.count("rehash")
+			AuthService.set_password(user, password, persist=persist)
+		return True
+
+	# login lookup
+	@staticmethod
+	def find_login_users(username_or_email, limit=2):
 		"""
-		ตรวจสอบรหัสผ่าน (hash แล้วเทียบกับที่เก็บใน DB)
+		หา user จากช่อง login (username หรือ email ไม่สนตัวพิมพ์เล็กใหญ่) ผ่าน index ของ email_lower / username_lower
+		- มี "@" → ค้น email ก่อน ถ้าไม่เจอค่อยค้น username, ไม่มี "@" → ค้น username อย่างเดียว
+		- คืน list ไม่เกิน limit คน (มากกว่า 1 คน = username ซ้ำ ให้ login ด้วย email แทน)
 		"""
-		return check_password_hash(user.password, password)
+		if not username_or_email:
+			return []
+		key = login_key(username_or_email)
+		if "@" in key:
+			# email_lower เป็น unique → เจอได้ไม่เกิน 1 คน
+			users = User.query.filter(User.email_lower == key).limit(1).all()
+			if users:
+				return users
+		return User.query.filter(User.username_lower == key).limit(limit).all()
+
+	@staticmethod
+	def find_by_email(email):
+		"""user ที่มี email นี้ (ไม่สนตัวพิมพ์เล็กใหญ่) หรือ None"""
+		if not email:
+			return None
+		return User.query.filter(User.email_lower == login_key(email)).first()
 
 	# reset password
 	@staticmethod
@@ -56,7 +90,7 @@ class AuthService:
 			email = s.loads(token, salt="password-reset-salt", max_age=max_age)
 		except Exception:
 			return None
-		return User.query.filter_by(email=email).first()
+		return AuthService.find_by_email(email)
 
 
 
@@ -82,7 +116,7 @@ class UserUpdateService:
 	@staticmethod
 	def set_password(user, new_password, old_password, persist=True):
 		if old_password and new_password:
-			if not check_password_hash(user.password, old_password):
+			if not PASSWORD_HASHER.verify(user.password, old_password):
 				raise UnicodeError("old password is incorrect")
 			AuthService.set_password(user, new_password)
 		else:
@@ -104,7 +138,7 @@ class UserUpdateService:
 		for plan in user.reading_plans:
 			plan.weight = (plan.weight / user.daily_read_hours) * daily_hours
 		user.daily_read_hours = daily_hours
-		ScheduleService.update_schedule(user, persist=persist)
+		RescheduleService.request(user, persist=persist)
 		if persist:
 			db.session.commit()
 
@@ -134,7 +168,7 @@ class UserUpdateService:
 		- แปลง exam_date จาก string → date
 		- persist ลง DB
 		"""
-		logger.debug(f"add {exam_name}")
+		logger.debug("add %s", exam_name)
 
 		# กันชื่อซ้ำ
 		existing = ReadingPlans.query.filter_by(user_id=user.id, exam_name=exam_name).first()
@@ -153,9 +187,10 @@ class UserUpdateService:
 		)
 		db.session.add(plan)
 		db.session.flush()   # ให้ plan.id ถูกสร้างก่อน
+		ScheduleService.bump_version(user.id)
 
 		# เรียกคำนวณ slots ใหม่ (จะจัดการ weight/horizon ให้เอง)
-		ScheduleService.update_schedule(user, persist=persist)
+		RescheduleService.request(user, persist=persist)
 
 		if persist:
 			db.session.commit()
@@ -170,35 +205,98 @@ class UserUpdateService:
 		- เรียกคำนวณ slots ใหม่ (จะจัดการ weight/horizon ให้เอง)
 		- persist ลง DB
 		"""
-		logger.debug(f"delete {plan.exam_name}")
+		logger.debug("delete %s", plan.exam_name)
 
 		# ลบ plan ออกจาก session
 		db.session.delete(plan)
 		db.session.flush()
+		ScheduleService.bump_version(user.id)
 
 		# เรียกคำนวณ slots ใหม่ (ลดน้ำหนัก/จัดสรรใหม่)
-		ScheduleService.update_schedule(user, persist=persist)
+		RescheduleService.request(user, persist=persist)
 
 		if persist:
 			db.session.commit()
 
+	@staticmethod
+	def delete_expired_plans(today=None, user_id=None):
+		"""
+		ลบแผนที่หมดอายุ (วันสอบ < วันนี้) แบบ bulk โดยไม่ reschedule
+		- snapshot allocation ของแผนเหล่านั้น (plan_id → NULL, เก็บชื่อวิชาไว้) ใน statement เดียว
+		- ลบแผนทั้งหมดใน statement เดียว
+		- user_id=None คือทำกับทุก user
+		คืน set ของ user_id ที่มีแผนถูกลบ
+		"""
+		if today is None:
+			today = get_today()
+		query = select(ReadingPlans.id, ReadingPlans.user_id).where(ReadingPlans.exam_date < today)
+		if user_id is not None:
+			query = query.where(ReadingPlans.user_id == user_id)
+		rows = db.session.execute(query).all()
+		if not rows:
+			return set()
+
+		plan_ids = [row.id for row in rows]
+		plan_name = (select(ReadingPlans.exam_name)
+					 .where(ReadingPlans.id == DailyAllocations.plan_id)
+					 .scalar_subquery())
+		db.session.execute(
+			update(DailyAllocations)
+			.where(DailyAllocations.plan_id.in_(plan_ids))
+			.values(
+				exam_name_snapshot=func.coalesce(DailyAllocations.exam_name_snapshot, plan_name),
+				plan_id=None
+			)
+			.execution_options(synchronize_session="fetch")
+		)
+		db.session.execute(
+			delete(ReadingPlans)
+			.where(ReadingPlans.id.in_(plan_ids))
+			.execution_options(synchronize_session="fetch")
+		)
+		user_ids = {row.user_id for row in rows}
+		ScheduleService.bump_version(*user_ids)
+		logger.debug("deleted %d expired plans", len(plan_ids))
+		return user_ids
+
 	@staticmethod
 	def cleanup_expired_plans(user):
 		"""
 		ลบแผนที่หมดอายุ (วันสอบ < วันนี้) ออกจาก user
-		- เรียกใช้ delete_plan กับทุกแผนที่หมดอายุ
+		- ลบทุกแผนที่หมดอายุทีเดียวด้วย delete_expired_plans
+		- reschedule ครั้งเดียว (ถ้ามีแผนถูกลบ)
 		- อัปเดต last_cleanup_date
 		- commit ลง DB
 		"""
 		today = get_today()
-		expired_plans = ReadingPlans.query.filter(
-			ReadingPlans.user_id == user.id,
-			ReadingPlans.exam_date < today
-		).all()
-
-		for plan in expired_plans:
-			UserUpdateService.delete_plan(user, plan)
+		if UserUpdateService.delete_expired_plans(today, user_id=user.id):
+			db.session.expire(user, ["reading_plans"])
+			RescheduleService.request(user)
 
 		user.last_cleanup_date = today
 		db.session.commit()
 
+	@staticmethod
+	def cleanup_all_expired_plans():
+		"""
+		ลบแผนที่หมดอายุของทุก user (ใช้จาก CLI: flask cleanup-expired-plans)
+		- ลบแผนของทุก user ทีเดียว แล้ว reschedule แต่ละ user ที่โดนลบครั้งเดียว
+		คืนจำนวน user ที่ถูก reschedule
+		"""
+		today = get_today()
+		user_ids = UserUpdateService.delete_expired_plans(today)
+		if not user_ids:
+			return 0
+
+		db.session.expire_all()
+		users = (User.query
+				 .options(selectinload(User.reading_plans))
+				 .filter(User.id.in_(user_ids))
+				 .all())
+		for user in users:
+			SLOTS_CACHE.invalidate(user.id)
+			ScheduleService.update_schedule(user)
+			user.last_cleanup_date = today
+		db.session.commit()
+		return len(users)
+
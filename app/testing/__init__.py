@@ -0,0 +1 @@
+# __init__.py for testing package (helper ที่ test และ benchmark ใช้ร่วมกัน)
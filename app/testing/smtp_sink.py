@@ -0,0 +1,134 @@
+# app/testing/smtp_sink.py
+"""
+SMTP server จำลองสำหรับทดสอบ/benchmark การส่งอีเมล (ไม่ส่งต่อจริง แค่นับข้อความ)
+รองรับ EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT (ไม่มี TLS/AUTH)
+
+    python -m app.testing.smtp_sink --port 1025     # รันค้างไว้ แล้วตั้ง MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_USE_TLS=0
+
+ใช้ใน code:
+    with SmtpSink() as sink:
+        ... ส่งไปที่ sink.host, sink.port ...
+        sink.messages, sink.connections
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        sink.count("connections")
+        sink.wait()
+        self.reply("220 smtp-sink ready")
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line in (b".\r\n", b".\n"):
+                    in_data = False
+                    received = sink.count("messages")
+                    sink.wait()
+                    if sink.fail_every and received % sink.fail_every == 0:
+                        self.reply("451 temporary failure")
+                    else:
+                        self.reply("250 OK queued")
+                continue
+
+            sink.wait()
+            command = line.decode("ascii", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-smtp-sink\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                in_data = True
+                self.reply("354 end data with <CR><LF>.<CR><LF>")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SmtpSink:
+    """
+    SMTP sink แบบ thread ใน process เดียว
+    - fail_every=N ตอบ 451 ทุกข้อความที่ N (ทดสอบ retry)
+    - latency=วินาที หน่วงก่อนตอบทุกคำสั่ง (จำลอง round-trip ไป SMTP server จริง)
+    """
+    def __init__(self, host="127.0.0.1", port=0, fail_every=0, latency=0.0):
+        self.fail_every = fail_every
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.counters = {"connections": 0, "messages": 0}
+        self.server = _Server((host, port), _SmtpHandler)
+        self.server.sink = self
+        self.host, self.port = self.server.server_address
+        self.thread = None
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+            return self.counters[name]
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def messages(self):
+        return self.counters["messages"]
+
+    @property
+    def connections(self):
+        return self.counters["connections"]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="smtp-sink", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0, help="หน่วงก่อนตอบทุกคำสั่ง (วินาที)")
+    args = parser.parse_args(argv)
+
+    with SmtpSink(args.host, args.port, latency=args.latency) as sink:
+        print(f"smtp sink listening on {sink.host}:{sink.port}")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"connections={sink.connections} messages={sink.messages}")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
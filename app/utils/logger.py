@@ -0,0 +1,71 @@
+# app\utils\logger.py
+
+import os
+import json
+import logging
+from datetime import datetime, timezone
+
+# ระดับ log เริ่มต้น (MYAPP_DEBUG=1 เท่ากับ LOG_LEVEL=DEBUG แบบเดิม)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG" if os.getenv("MYAPP_DEBUG", "0") == "1" else "INFO").upper()
+# ระดับราย module เช่น "app.routes=WARNING,app.services.schedule_service=DEBUG"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# รูปแบบ output: "text" หรือ "json" (บรรทัดละ 1 JSON object)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(filename)s:%(lineno)d - %(message)s"
+
+# field มาตรฐานของ LogRecord (ที่เหลือคือ extra={...} จากคนเรียก)
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    format log เป็น JSON บรรทัดเดียว
+    - time, level, logger, file, line, message + field จาก extra={...}
+    """
+    def format(self, record):
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def parse_levels(spec):
+    """แปลง "a=DEBUG,b.c=WARNING" เป็น dict {logger_name: level}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, level = item.split("=", 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=LOG_LEVEL, levels=LOG_LEVELS, fmt=LOG_FORMAT):
+    """
+    ตั้งค่า logger "app" (เรียกจาก create_app, เรียกซ้ำได้)
+    - message ใช้ %-style args (logger.debug("x=%s", x)) → ถ้า level ปิดอยู่จะไม่ format string และไม่หา caller frame
+    """
+    root = logging.getLogger("app")
+    handler = next((h for h in root.handlers if getattr(h, "_app_handler", False)), None)
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler._app_handler = True
+        root.addHandler(handler)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root.setLevel(level)
+    root.propagate = False
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+    return root
@@ -1,31 +1,48 @@
 # app\utils\utils.py
 
 import os
+import logging
+import socket
+import uuid
 import pytz
 from datetime import date, datetime
-from flask import session
+from flask import g, session, has_app_context, has_request_context
 
 APP_TIMEZONE = os.getenv("APP_TIMEZONE", "Asia/Bangkok")
 TIMEZONE = pytz.timezone(APP_TIMEZONE)
 
-def get_today():
-    """คืนวันที่จำลอง ถ้าไม่มีให้ใช้วันจริง"""
-    if "simulated_date" in session:
+def get_simulated_date():
+    """
+    คืนวันที่จำลอง (None ถ้าไม่ได้จำลอง)
+    - worker reschedule: g.simulated_date ที่ส่งมากับงาน
+    - request: session["simulated_date"]
+    """
+    if has_app_context() and g.get("simulated_date") is not None:
+        return g.simulated_date
+    if has_request_context() and "simulated_date" in session:
         return date.fromisoformat(session["simulated_date"])
-    return datetime.now(TIMEZONE).date()
+    return None
 
-import inspect
-import os
+def get_today():
+    """คืนวันที่จำลอง ถ้าไม่มีให้ใช้วันจริง (นอก request เช่น CLI/cron ใช้วันจริงเสมอ)"""
+    simulated = get_simulated_date()
+    if simulated is not None:
+        return simulated
+    return datetime.now(TIMEZONE).date()
 
-DEBUG_MODE = os.getenv("MYAPP_DEBUG", "0") == "1"
+def worker_id():
+    """
+    id ของ worker สำหรับ claimed_by / holder ของ lease: "<hostname>:<pid>:<random 8 ตัว>"
+    ตัด hostname ให้ทั้งหมดไม่เกิน 64 ตัวอักษร (ขนาด column)
+    """
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
 def log(text="", name="myapp", debug=False):
-    if debug and not DEBUG_MODE:
-        return
-    frame = inspect.currentframe().f_back
-    filename = os.path.basename(frame.f_code.co_filename)
-    lineno = frame.f_lineno
-    prefix = f"[DEBUG][{name}]" if debug else f"[{name}]"
-    print(f"{prefix} {filename}:{lineno} - {text}")
-
-
+    """
+    (เลิกใช้แล้ว) ใช้ logger = logging.getLogger(__name__) แทน
+    คงไว้ให้ code เก่า: ส่งต่อไปที่ logger "app.<name>"
+    """
+    logger = logging.getLogger(f"app.{name}")
+    level = logging.DEBUG if debug else logging.INFO
+    if logger.isEnabledFor(level):
+        logger.log(level, "%s", text, stacklevel=2)
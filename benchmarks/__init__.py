@@ -0,0 +1 @@
+# benchmarks package (python -m benchmarks.bench_scheduler)
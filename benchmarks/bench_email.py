@@ -0,0 +1,87 @@
+# benchmarks/bench_email.py
+"""
+Benchmark การส่งอีเมลไปที่ SMTP sink ในเครื่อง (app.testing.smtp_sink)
+เทียบ send_email ทีละฉบับ (เปิด connection ใหม่ทุกฉบับ) กับ MailDelivery (connection pool + thread pool)
+
+    python -m benchmarks.bench_email                        # pooled 10k ฉบับ, workers 1/4/8, RTT จำลอง 2ms
+    python -m benchmarks.bench_email --messages 2000 --workers 4 --fail-every 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# ต้องตั้ง mail config ก่อนสร้าง app (Flask-Mail อ่าน config ตอน init_app)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SCHEDULER_MODE", "off")
+os.environ["MAIL_USE_TLS"] = "0"
+os.environ["SENDER_MAIL"] = "bench@example.com"
+os.environ["SENDER_PASSWORD"] = ""
+
+from app.testing.smtp_sink import SmtpSink
+
+BODY = "<html><body><h2>สรุปการอ่าน</h2><p>รวมเวลาที่อ่าน: 4 ชั่วโมง</p></body></html>"
+
+
+def make_app(sink):
+    os.environ["MAIL_SERVER"] = sink.host
+    os.environ["MAIL_PORT"] = str(sink.port)
+    from app import create_app
+    return create_app()
+
+
+def bench_serial(app, count):
+    """send_email ทีละฉบับ (แบบเดิม)"""
+    from app.notification.email_service import send_email
+    with app.app_context():
+        start = time.perf_counter()
+        for i in range(count):
+            send_email(f"user{i}@example.com", "digest", BODY)
+        seconds = time.perf_counter() - start
+    return {"sent": count, "seconds": round(seconds, 3), "per_second": round(count / seconds, 1)}
+
+
+def bench_pooled(app, count, workers, retries):
+    from app.notification.email_service import MailDelivery
+    with app.app_context():
+        with MailDelivery(app, workers=workers, retries=retries, backoff=0) as delivery:
+            for i in range(count):
+                delivery.submit(f"user{i}@example.com", "digest", BODY)
+    return dict(delivery.stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000, help="จำนวนข้อความต่อรอบแบบ pooled")
+    parser.add_argument("--serial-messages", type=int, default=500, help="จำนวนข้อความแบบ send_email ทีละฉบับ (0 = ข้าม)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="จำนวน thread/connection ที่จะลอง")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.002, help="RTT จำลองต่อคำสั่ง SMTP (วินาที)")
+    parser.add_argument("--fail-every", type=int, default=0, help="ให้ sink ตอบ 451 ทุกข้อความที่ N (ทดสอบ retry)")
+    parser.add_argument("--output", help="เขียนผล JSON ลงไฟล์ (ไม่ใส่จะพิมพ์ออก stdout)")
+    args = parser.parse_args(argv)
+
+    results = {"messages": args.messages, "latency": args.latency, "runs": {}}
+    with SmtpSink(fail_every=args.fail_every, latency=args.latency) as sink:
+        app = make_app(sink)
+        if args.serial_messages:
+            before = sink.connections
+            results["runs"]["serial"] = bench_serial(app, args.serial_messages)
+            results["runs"]["serial"]["connections"] = sink.connections - before
+        for workers in args.workers:
+            results["runs"][f"pooled-{workers}"] = bench_pooled(app, args.messages, workers, args.retries)
+        results["sink"] = {"connections": sink.connections, "messages": sink.messages}
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    failed = sum(run.get("failed", 0) for run in results["runs"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# benchmarks/bench_login.py
+"""
+Benchmark การค้นหา user ตอน login บนตาราง users ขนาดใหญ่ (SQLite ไฟล์ชั่วคราว)
+เทียบ OR(username, email) แบบเดิม (scan ทั้งตาราง) กับ AuthService.find_login_users (index ของ *_lower)
+
+    python -m benchmarks.bench_login                         # 1M users
+    python -m benchmarks.bench_login --users 100000 --lookups 500
+    python -m benchmarks.bench_login --db /tmp/users.db      # เก็บไฟล์ไว้ใช้ซ้ำ (สร้างข้อมูลครั้งเดียว)
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SCHEDULER_MODE", "off")
+
+
+def populate(db, count, chunk=50000):
+    """เติม user จำลองจนครบ count คน (username ซ้ำกันได้บางส่วนแบบข้อมูลจริง)"""
+    from sqlalchemy import insert, func, select
+    from app.models import User
+    have = db.session.execute(select(func.count()).select_from(User)).scalar()
+    for start in range(have, count, chunk):
+        rows = []
+        for i in range(start, min(start + chunk, count)):
+            username, email = f"User{i % (count // 2 or 1)}", f"User{i}@Example.com"
+            rows.append({"username": username, "email": email, "username_lower": username.lower(),
+                         "email_lower": email.lower(), "password": "-", "schedule_version": 0})
+        db.session.execute(insert(User), rows)
+        db.session.commit()
+
+
+def measure(func, inputs):
+    times = []
+    for value in inputs:
+        start = time.perf_counter()
+        func(value)
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(times), 3), "max_ms": round(max(times), 3),
+            "lookups": len(times)}
+
+
+def query_plan(db, query):
+    """EXPLAIN QUERY PLAN ของ statement ที่ ORM สร้าง"""
+    compiled = query.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {compiled}"))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000000, help="จำนวน user ในตาราง")
+    parser.add_argument("--lookups", type=int, default=200, help="จำนวนครั้งที่ค้นหาแบบใช้ index")
+    parser.add_argument("--scan-lookups", type=int, default=20, help="จำนวนครั้งที่ค้นหาแบบเดิม (scan ทั้งตาราง)")
+    parser.add_argument("--db", help="ไฟล์ SQLite ที่ใช้ (ไม่ใส่จะสร้างไฟล์ชั่วคราวแล้วลบทิ้ง)")
+    parser.add_argument("--output", help="เขียนผล JSON ลงไฟล์ (ไม่ใส่จะพิมพ์ออก stdout)")
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="bench_login_"), "users.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+    from sqlalchemy import or_
+    from app import create_app
+    from app.extensions import db
+    from app.models import User
+    from app.services.user_service import AuthService
+
+    app = create_app()
+    rng = random.Random(0)
+    report = {"users": args.users, "results": {}}
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        populate(db, args.users)
+        report["populate_seconds"] = round(time.perf_counter() - start, 1)
+
+        ids = [rng.randrange(args.users) for _ in range(max(args.lookups, args.scan_lookups))]
+        # แบบเดิมต้องพิมพ์ตรงตัวพิมพ์ที่เก็บไว้ แบบใหม่ใช้ตัวพิมพ์เล็กก็เจอ
+        emails = [f"User{i}@Example.com" for i in ids]
+        usernames = [f"User{i % (args.users // 2 or 1)}" for i in ids]
+
+        def scan(value):
+            db.session.expunge_all()
+            return User.query.filter(or_(User.username == value, User.email == value)).all()
+
+        def indexed(value):
+            db.session.expunge_all()
+            return AuthService.find_login_users(value)
+
+        report["results"]["or_scan[email]"] = measure(scan, emails[:args.scan_lookups])
+        report["results"]["or_scan[username]"] = measure(scan, usernames[:args.scan_lookups])
+        report["results"]["indexed[email]"] = measure(indexed, [e.lower() for e in emails[:args.lookups]])
+        report["results"]["indexed[username]"] = measure(indexed, [u.lower() for u in usernames[:args.lookups]])
+        report["plans"] = {
+            "or_scan": query_plan(db, User.query.filter(or_(User.username == "x", User.email == "x"))),
+            "indexed[email]": query_plan(db, User.query.filter(User.email_lower == "x@x")),
+            "indexed[username]": query_plan(db, User.query.filter(User.username_lower == "x")),
+        }
+
+    if not args.db:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# benchmarks/bench_password.py
+"""
+Benchmark การตรวจรหัสผ่าน (AuthService.check_password → PasswordHasher)
+- เวลาต่อ 1 ครั้งของแต่ละ hash method (บน thread เดียว)
+- login/วินาที เมื่อมี client พร้อมกันหลายตัวผ่าน pool แบบ thread / process ขนาดต่าง ๆ และค่าต่อ core
+
+    python -m benchmarks.bench_password
+    python -m benchmarks.bench_password --methods scrypt:32768:8:1 pbkdf2:sha256:600000 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app.services.password_hasher import PasswordHasher, PASSWORD_HASH_METHOD
+
+DEFAULT_METHODS = ["scrypt:32768:8:1", "scrypt:16384:8:1", "pbkdf2:sha256:600000"]
+PASSWORD = "correct horse battery staple"
+
+
+def single(method, count):
+    """ms ต่อการตรวจ 1 ครั้ง (inline)"""
+    hasher = PasswordHasher(method=method, mode="inline")
+    stored = generate_password_hash(PASSWORD, method)
+    start = time.perf_counter()
+    for _ in range(count):
+        assert hasher.verify(stored, PASSWORD)
+    return round((time.perf_counter() - start) * 1000 / count, 2)
+
+
+def burst(method, mode, workers, logins, clients):
+    """client หลาย thread ยิง login พร้อมกันทั้งหมด logins ครั้ง ผ่าน pool ขนาด workers"""
+    hasher = PasswordHasher(method=method, mode=mode, workers=workers, max_pending=clients, timeout=60)
+    stored = generate_password_hash(PASSWORD, method)
+    hasher.verify(stored, PASSWORD)  # สร้าง pool / process ก่อนจับเวลา
+    remaining = [logins]
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            assert hasher.verify(stored, PASSWORD)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    hasher.shutdown()
+    per_second = logins / seconds
+    cores = min(workers, os.cpu_count() or 1)
+    return {"logins_per_second": round(per_second, 1), "per_core": round(per_second / cores, 1),
+            "seconds": round(seconds, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", nargs="+", default=None, help="hash method ของ werkzeug ที่จะลอง")
+    parser.add_argument("--modes", nargs="+", default=["thread", "process"], choices=["thread", "process"])
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="ขนาด pool (ค่าเริ่มต้น 1 และจำนวน core)")
+    parser.add_argument("--logins", type=int, default=100, help="จำนวน login ต่อรอบ")
+    parser.add_argument("--clients", type=int, default=16, help="จำนวน client (request thread) พร้อมกัน")
+    parser.add_argument("--single", type=int, default=10, help="จำนวนครั้งที่วัดแบบ inline")
+    parser.add_argument("--output", help="เขียนผล JSON ลงไฟล์ (ไม่ใส่จะพิมพ์ออก stdout)")
+    args = parser.parse_args(argv)
+
+    methods = args.methods or list(dict.fromkeys([PASSWORD_HASH_METHOD] + DEFAULT_METHODS))
+    workers = args.workers or sorted({1, os.cpu_count() or 1})
+    report = {"python": platform.python_version(), "cpus": os.cpu_count(), "configured": PASSWORD_HASH_METHOD,
+              "logins": args.logins, "clients": args.clients, "methods": {}}
+    for method in methods:
+        result = {"verify_ms": single(method, args.single), "pools": {}}
+        for mode in args.modes:
+            for size in workers:
+                result["pools"][f"{mode}-{size}"] = burst(method, mode, size, args.logins, args.clients)
+        report["methods"][method] = result
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# benchmarks/bench_scheduler.py
+"""
+Micro-benchmark ของแกน scheduler (schedule_backward, redistribute_subject,
+largest_remainder_allocation, ScheduleService.calculate_slots บน SQLite in-memory)
+
+    python -m benchmarks.bench_scheduler                      # รันแล้วเทียบกับ baseline.json
+    python -m benchmarks.bench_scheduler --output result.json # เก็บผลเป็นไฟล์
+    python -m benchmarks.bench_scheduler --save-baseline      # อัปเดต baseline.json
+
+exit code 1 ถ้ามี benchmark ที่ช้ากว่า baseline เกิน --tolerance
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.synthetic import START_DAY, make_subjects
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# ชุดข้อมูลจำลอง: จำนวนวิชา, จำนวนวัน, ช่วง level, วันสอบกระจุกหรือกระจาย
+CASES = [
+    {"name": "small-spread", "subjects": 5, "horizon": 30, "levels": (1, 10), "clustered": False},
+    {"name": "medium-clustered", "subjects": 15, "horizon": 90, "levels": (3, 7), "clustered": True},
+    {"name": "large-spread", "subjects": 30, "horizon": 365, "levels": (1, 10), "clustered": False},
+    {"name": "large-clustered", "subjects": 30, "horizon": 365, "levels": (1, 10), "clustered": True},
+]
+DAILY_HOURS = 4
+NUMBER = 20  # จำนวนครั้งที่เรียกต่อ 1 รอบจับเวลา
+
+
+def measure(func, make_args, repeat, number=NUMBER):
+    """
+    จับเวลา func แบบ timeit: แต่ละรอบเรียก number ครั้ง (เตรียม args ใหม่ทุกครั้งนอกช่วงจับเวลา)
+    คืนเวลาเฉลี่ยต่อการเรียก 1 ครั้ง เป็น ms
+    """
+    func(*make_args())  # warm-up
+    samples = []
+    for _ in range(repeat):
+        batch = [make_args() for _ in range(number)]
+        start = time.perf_counter()
+        for args in batch:
+            func(*args)
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def bench_pure(case, repeat):
+    """benchmark ฟังก์ชันที่ไม่แตะ DB"""
+    from app.services.schedule_service import (
+        largest_remainder_allocation, redistribute_subject,
+        schedule_backward_heap, schedule_backward_reference,
+    )
+    subjects = make_subjects(case["subjects"], case["horizon"], DAILY_HOURS, case["levels"], case["clustered"])
+    fresh = lambda: (START_DAY, DAILY_HOURS, copy.deepcopy(subjects))
+    weights = [s.required for s in subjects]
+    return {
+        "schedule_backward[heap]": measure(schedule_backward_heap, fresh, repeat),
+        "schedule_backward[reference]": measure(schedule_backward_reference, fresh, repeat),
+        "redistribute_subject": measure(redistribute_subject, fresh, repeat),
+        "largest_remainder_allocation": measure(
+            largest_remainder_allocation, lambda: (weights, case["horizon"] * DAILY_HOURS), repeat
+        ),
+    }
+
+
+def bench_calculate_slots(app, case, repeat):
+    """benchmark ScheduleService.calculate_slots(persist=False) กับ user จำลองใน SQLite in-memory"""
+    from app.extensions import db
+    from app.models import ReadingPlans, User
+    from app.services.schedule_service import ScheduleService
+
+    today = date.today()
+    subjects = make_subjects(case["subjects"], case["horizon"], DAILY_HOURS, case["levels"], case["clustered"])
+    with app.app_context():
+        user = User(email=f"{case['name']}@bench", username=case["name"], password="-", daily_read_hours=DAILY_HOURS)
+        db.session.add(user)
+        db.session.flush()
+        for s in subjects:
+            db.session.add(ReadingPlans(
+                user_id=user.id,
+                exam_name=s.name,
+                exam_date=today + timedelta(days=s.exam_day - START_DAY),
+                level=s.level,
+            ))
+        db.session.commit()
+        user = db.session.get(User, user.id)
+        return measure(lambda: ScheduleService.calculate_slots(user, persist=False), lambda: (), repeat)
+
+
+def run(repeat):
+    # sqlite in-memory เสมอ (เหมือน tests/conftest.py): benchmark สร้างตารางและ user สังเคราะห์ ห้ามลง DATABASE_URL ที่ export ไว้
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.setdefault("SCHEDULER_MODE", "off")
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    results = {}
+    for case in CASES:
+        results[case["name"]] = bench_pure(case, repeat)
+        results[case["name"]]["ScheduleService.calculate_slots"] = bench_calculate_slots(app, case, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """เทียบ min_ms (นิ่งกว่า median สำหรับงานระดับ µs) กับ baseline → ratio (>1 คือช้าลง) และ regression ที่เกิน tolerance"""
+    comparison, regressions = {}, []
+    for case, benches in results.items():
+        for name, stats in benches.items():
+            base = baseline.get(case, {}).get(name)
+            if not base or not base.get("min_ms"):
+                continue
+            ratio = round(stats["min_ms"] / base["min_ms"], 3)
+            comparison[f"{case}/{name}"] = ratio
+            if ratio > 1 + tolerance:
+                regressions.append(f"{case}/{name}")
+    return comparison, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=15, help="จำนวนรอบจับเวลาต่อ benchmark")
+    parser.add_argument("--output", help="เขียนผล JSON ลงไฟล์ (ไม่ใส่จะพิมพ์ออก stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="ไฟล์ baseline ที่ใช้เทียบ")
+    parser.add_argument("--save-baseline", action="store_true", help="บันทึกผลรอบนี้เป็น baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="ช้าลงได้ไม่เกินกี่เท่า (0.5 = 50%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"], regressions = compare(results, baseline, args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# benchmarks/bench_startup.py
+"""
+วัดเวลา cold start ของ create_app() ด้วย python -X importtime (process ใหม่ทุกรอบ)
+
+    python -m benchmarks.bench_startup                       # รันแล้วเทียบกับ baseline_startup.json
+    python -m benchmarks.bench_startup --top 15              # ดู module ที่ import ช้าที่สุด
+    python -m benchmarks.bench_startup --save-baseline       # อัปเดต baseline_startup.json
+    python -m benchmarks.bench_startup --env SCHEDULER_MODE=app
+
+exit code 1 ถ้า create_app ช้ากว่า baseline เกิน --tolerance
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_startup.json")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# โค้ดที่รันใน process ลูก: จับเวลา import app + create_app() แล้วพิมพ์ผลเป็น JSON บรรทัดสุดท้ายของ stdout
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (done - imported) * 1000,
+                  "total_ms": (done - start) * 1000, "modules": len(sys.modules)}))
+"""
+
+# ค่าเริ่มต้นของ process ลูก: DB ใน memory และไม่เริ่ม scheduler (วัดเฉพาะงานตอนบูต)
+DEFAULT_ENV = {"DATABASE_URL": "sqlite://", "SCHEDULER_MODE": "off"}
+
+
+def parse_importtime(stderr):
+    """แปลง output ของ -X importtime → {module: (self_us, cumulative_us, ความลึกของการ import)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative), depth)
+    return modules
+
+
+def run_once(env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+
+def top_modules(modules, count):
+    """module ที่ถูก import ตรงจาก app/create_app (ความลึก ≤ 1) ที่ใช้เวลา import สะสมมากที่สุด"""
+    roots = [(name, cumulative) for name, (_, cumulative, depth) in modules.items() if depth <= 1]
+    roots.sort(key=lambda item: item[1], reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in roots[:count]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7, help="จำนวน process ที่จะลอง (ใช้ median)")
+    parser.add_argument("--top", type=int, default=10, help="แสดง module ที่ import ช้าที่สุดกี่อัน")
+    parser.add_argument("--env", action="append", default=[], help="ตั้ง env ของ process ลูก เช่น SCHEDULER_MODE=app")
+    parser.add_argument("--output", help="เขียนผล JSON ลงไฟล์ (ไม่ใส่จะพิมพ์ออก stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="ไฟล์ baseline ที่ใช้เทียบ")
+    parser.add_argument("--save-baseline", action="store_true", help="บันทึกผลรอบนี้เป็น baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="ช้าลงได้ไม่เกินกี่เท่า (0.5 = 50%%)")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, **DEFAULT_ENV)
+    env.update(item.split("=", 1) for item in args.env)
+
+    runs, modules = [], {}
+    for _ in range(args.repeat):
+        timings, modules = run_once(env)
+        runs.append(timings)
+
+    results = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ("import_ms", "create_app_ms", "total_ms")
+    }
+    results["min_total_ms"] = round(min(run["total_ms"] for run in runs), 1)
+    results["modules"] = runs[-1]["modules"]
+    report = {
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+        "slowest_imports": top_modules(modules, args.top),
+    }
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        ratio = round(results["min_total_ms"] / baseline["min_total_ms"], 3)
+        report["comparison"] = {"min_total_ms": ratio}
+        if ratio > 1 + args.tolerance:
+            regressions.append("min_total_ms")
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
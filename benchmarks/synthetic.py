@@ -0,0 +1,48 @@
+# benchmarks/synthetic.py
+"""สร้างชุด Subject จำลองสำหรับ benchmark ตัว scheduler"""
+import random
+from typing import List, Tuple
+
+from app.services.schedule_service import Subject, largest_remainder_allocation
+
+START_DAY = 740000  # day ordinal สมมติ (ประมาณปี 2027) ใช้เป็นวันเริ่มของทุกชุด
+
+
+def make_exam_days(count: int, horizon: int, clustered: bool, rng: random.Random) -> List[int]:
+    """
+    สุ่มวันสอบ (ordinal) ของแต่ละวิชา
+    - clustered: สอบกระจุกช่วง 10% สุดท้ายของ horizon (แบบช่วงสอบปลายภาค)
+    - spread: กระจายทั่ว horizon
+    วิชาแรกสอบวันสุดท้ายเสมอ เพื่อให้ horizon ยาวเท่าที่กำหนดพอดี
+    """
+    if clustered:
+        low = max(1, horizon - max(1, horizon // 10))
+    else:
+        low = 1
+    days = [START_DAY + horizon]
+    days += [START_DAY + rng.randint(low, horizon) for _ in range(count - 1)]
+    return days
+
+
+def make_subjects(count: int, horizon: int, daily_hours: int = 4, levels: Tuple[int, int] = (1, 10),
+                  clustered: bool = False, seed: int = 0) -> List[Subject]:
+    """
+    สร้าง Subject จำลองที่ feasible (ชั่วโมงรวม = horizon * daily_hours) แบบเดียวกับที่ calculate_slots แจกให้
+    - count: จำนวนวิชา, horizon: จำนวนวันจนถึงสอบวิชาสุดท้าย
+    - levels: ช่วงความยากที่สุ่ม, clustered: วันสอบกระจุกหรือกระจาย
+    """
+    rng = random.Random(seed)
+    exam_days = make_exam_days(count, horizon, clustered, rng)
+    level_values = [rng.randint(*levels) for _ in range(count)]
+    required = largest_remainder_allocation(level_values, horizon * daily_hours)
+    return [
+        Subject(
+            name=f"subject-{i}",
+            level=level_values[i],
+            required=required[i],
+            exam_day=exam_days[i],
+            remaining=required[i],
+            plan_id=i + 1,
+        )
+        for i in range(count)
+    ]
@@ -11,7 +11,8 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-fileConfig(config.config_file_name)
+# ไม่ปิด logger ที่สร้างไว้ก่อนแล้ว (app.* ของ run.py / scheduler ที่ upgrade ตอนบูต)
+fileConfig(config.config_file_name, disable_existing_loggers=False)
 logger = logging.getLogger('alembic.env')
 
 
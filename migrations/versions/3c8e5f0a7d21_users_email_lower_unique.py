@@ -0,0 +1,40 @@
+"""users email_lower unique
+
+Revision ID: 3c8e5f0a7d21
+Revises: f1b7d4a92c38
+Create Date: 2025-10-27 11:26:09.731402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e5f0a7d21'
+down_revision = 'f1b7d4a92c38'
+branch_labels = None
+depends_on = None
+
+
+def duplicates(conn):
+    """email_lower ที่มีมากกว่า 1 user (email ที่ต่างกันแค่ตัวพิมพ์)"""
+    users = sa.table('users', sa.column('email_lower', sa.String))
+    return conn.execute(
+        sa.select(users.c.email_lower).group_by(users.c.email_lower).having(sa.func.count() > 1).limit(20)
+    ).scalars().all()
+
+
+def upgrade():
+    found = duplicates(op.get_bind())
+    if found:
+        # ต้องรวม / แก้ user ที่ซ้ำเองก่อน (เลือกไม่ได้ว่าจะเก็บบัญชีไหน)
+        raise RuntimeError(f"users.email_lower has case-insensitive duplicates, deduplicate before upgrading: {found}")
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_email_lower')
+        batch_op.create_index('ix_users_email_lower', ['email_lower'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_email_lower')
+        batch_op.create_index('ix_users_email_lower', ['email_lower'], unique=False)
@@ -0,0 +1,38 @@
+"""reschedule_jobs
+
+Revision ID: 5f2b8e61d0a3
+Revises: c3d9a1f27b54
+Create Date: 2025-10-21 09:41:07.118352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2b8e61d0a3'
+down_revision = 'c3d9a1f27b54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reschedule_jobs',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('requested_version', sa.Integer(), nullable=False),
+    sa.Column('completed_version', sa.Integer(), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=True),
+    sa.Column('claimed_by', sa.String(length=64), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('reschedule_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_reschedule_jobs_due_at', ['due_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reschedule_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_reschedule_jobs_due_at')
+
+    op.drop_table('reschedule_jobs')
@@ -0,0 +1,26 @@
+"""user schedule_version
+
+Revision ID: 8d4e07b3c912
+Revises: 5f2b8e61d0a3
+Create Date: 2025-10-22 10:15:32.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e07b3c912'
+down_revision = '5f2b8e61d0a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('schedule_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('schedule_version')
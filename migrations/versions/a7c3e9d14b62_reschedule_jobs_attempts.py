@@ -0,0 +1,26 @@
+"""reschedule_jobs attempts
+
+Revision ID: a7c3e9d14b62
+Revises: d9a6f3b2c815
+Create Date: 2025-10-26 10:14:03.512877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d14b62'
+down_revision = 'd9a6f3b2c815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reschedule_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('reschedule_jobs', schema=None) as batch_op:
+        batch_op.drop_column('attempts')
@@ -0,0 +1,30 @@
+"""scheduler_leases
+
+Revision ID: a7c5e2d9f4b1
+Revises: 8d4e07b3c912
+Create Date: 2025-10-23 10:12:44.503918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c5e2d9f4b1'
+down_revision = '8d4e07b3c912'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduler_leases',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('holder', sa.String(length=64), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_leases')
@@ -0,0 +1,73 @@
+"""users login keys
+
+Revision ID: b4e1c7d5a260
+Revises: e2f8b6c41a97
+Create Date: 2025-10-25 09:41:07.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e1c7d5a260'
+down_revision = 'e2f8b6c41a97'
+branch_labels = None
+depends_on = None
+
+BATCH = 10000
+
+
+def backfill(conn):
+    """
+    เติม email_lower / username_lower ให้ user เดิม
+    - lower() ของ SQL ทำทั้งตารางใน statement เดียว
+    - lower() ของ SQLite แปลงแค่ ASCII → ไล่เทียบกับ str.lower() ของ Python ทีละ BATCH แถว แล้วแก้เฉพาะแถวที่ไม่ตรง
+    """
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('email', sa.String),
+                     sa.column('username', sa.String), sa.column('email_lower', sa.String),
+                     sa.column('username_lower', sa.String))
+    conn.execute(users.update().values(email_lower=sa.func.lower(users.c.email),
+                                       username_lower=sa.func.lower(users.c.username)))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(users.c.id, users.c.email, users.c.username, users.c.email_lower, users.c.username_lower)
+            .where(users.c.id > last_id).order_by(users.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        fixes = [
+            {"uid": row.id, "e": row.email.lower(), "u": row.username.lower()}
+            for row in rows
+            if row.email_lower != row.email.lower() or row.username_lower != row.username.lower()
+        ]
+        if fixes:
+            conn.execute(
+                users.update().where(users.c.id == sa.bindparam('uid'))
+                .values(email_lower=sa.bindparam('e'), username_lower=sa.bindparam('u')),
+                fixes,
+            )
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email_lower', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('username_lower', sa.String(length=100), nullable=True))
+
+    backfill(op.get_bind())
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('email_lower', existing_type=sa.String(length=200), nullable=False)
+        batch_op.alter_column('username_lower', existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_index('ix_users_email_lower', ['email_lower'], unique=False)
+        batch_op.create_index('ix_users_username_lower', ['username_lower'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_username_lower')
+        batch_op.drop_index('ix_users_email_lower')
+        batch_op.drop_column('username_lower')
+        batch_op.drop_column('email_lower')
@@ -0,0 +1,32 @@
+"""daily_allocations indexes
+
+Revision ID: c3d9a1f27b54
+Revises: 1181698604ad
+Create Date: 2025-10-20 10:12:31.204718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9a1f27b54'
+down_revision = '1181698604ad'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('daily_allocations', schema=None) as batch_op:
+        batch_op.create_index('ix_daily_allocations_user_date', ['user_id', 'date'], unique=False)
+        batch_op.create_index(
+            'ix_daily_allocations_pending', ['user_id', 'feedback_done', 'date'], unique=False,
+            sqlite_where=sa.text('feedback_done = 0'),
+            postgresql_where=sa.text('feedback_done = false'),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('daily_allocations', schema=None) as batch_op:
+        batch_op.drop_index('ix_daily_allocations_pending')
+        batch_op.drop_index('ix_daily_allocations_user_date')
@@ -0,0 +1,52 @@
+"""user_daily_stats
+
+Revision ID: d9a6f3b2c815
+Revises: b4e1c7d5a260
+Create Date: 2025-10-25 16:22:48.107395
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a6f3b2c815'
+down_revision = 'b4e1c7d5a260'
+branch_labels = None
+depends_on = None
+
+FEEDBACK_TYPES = ('read_in_time', 'harder', 'easier', 'read_all')
+
+
+def upgrade():
+    op.create_table('user_daily_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('confirmed_hours', sa.Integer(), nullable=False),
+    sa.Column('read_in_time', sa.Integer(), nullable=False),
+    sa.Column('harder', sa.Integer(), nullable=False),
+    sa.Column('easier', sa.Integer(), nullable=False),
+    sa.Column('read_all', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+    # เติม rollup จาก feedback ที่มีอยู่แล้ว (เหมือน flask stats-rebuild)
+    allocations = sa.table('daily_allocations', sa.column('user_id', sa.Integer), sa.column('date', sa.Date),
+                           sa.column('slots', sa.Integer), sa.column('feedback_done', sa.Boolean),
+                           sa.column('feedback_type', sa.String))
+    stats = sa.table('user_daily_stats', *[sa.column(name) for name in
+                     ('user_id', 'date', 'confirmed_hours') + FEEDBACK_TYPES])
+    source = (
+        sa.select(
+            allocations.c.user_id, allocations.c.date, sa.func.sum(allocations.c.slots),
+            *[sa.func.sum(sa.case((allocations.c.feedback_type == kind, 1), else_=0)) for kind in FEEDBACK_TYPES],
+        )
+        .where(allocations.c.feedback_done == sa.true())
+        .group_by(allocations.c.user_id, allocations.c.date)
+    )
+    op.execute(stats.insert().from_select(['user_id', 'date', 'confirmed_hours', *FEEDBACK_TYPES], source))
+
+
+def downgrade():
+    op.drop_table('user_daily_stats')
@@ -0,0 +1,26 @@
+"""reschedule_jobs simulated_date
+
+Revision ID: f1b7d4a92c38
+Revises: a7c3e9d14b62
+Create Date: 2025-10-27 09:02:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d4a92c38'
+down_revision = 'a7c3e9d14b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reschedule_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('simulated_date', sa.Date(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reschedule_jobs', schema=None) as batch_op:
+        batch_op.drop_column('simulated_date')
@@ -1,14 +1,27 @@
 
 import sys
 import subprocess
+import os
+
+# python run.py test ไม่ต้องเริ่ม scheduler (pytest สร้าง app ของตัวเอง)
+if sys.argv[1:2] == ["test"]:
+    os.environ.setdefault("SCHEDULER_MODE", "off")
+
 from app import create_app, db
+from app.extensions import init_migrate
 from flask_migrate import upgrade, migrate, init, stamp
-import os
 from alembic.util.exc import CommandError
 import sqlite3
-from app.utils.utils import log
+import logging
+import time
 
 app = create_app()
+init_migrate(app)
+logger = logging.getLogger("app.run")
+
+# python run.py --autogenerate (หรือ MIGRATE_AUTOGENERATE=1): autogenerate revision ใหม่จาก model ทุกครั้งที่เริ่ม (ใช้ตอน dev)
+# ค่าเริ่มต้น: แค่ upgrade ถ้า DB ยังไม่ถึง head (ไม่สร้างไฟล์ migration ใหม่)
+MIGRATE_AUTOGENERATE = os.environ.get("MIGRATE_AUTOGENERATE", "0") == "1"
 
 def unlock_database():
     try:
@@ -16,30 +29,57 @@ def unlock_database():
         if os.path.exists(db_path):
             conn = sqlite3.connect(db_path)
             conn.close()
-            print("Database unlocked successfully")
+            logger.info("Database unlocked successfully")
     except Exception as e:
-        print(f"Error unlocking database: {e}")
+        logger.error("Error unlocking database: %s", e)
 
-def setup_database():
+def setup_database_autogenerate():
+    """แบบเดิม (dev): init ถ้ายังไม่มี migrations, autogenerate revision ใหม่ แล้ว upgrade"""
+    unlock_database()
+    if not os.path.exists("migrations"):
+        logger.info("Initializing new database...")
+        init()
+        stamp()
+    logger.info("Generating migration and upgrading database...")
     try:
-        unlock_database()
-        if not os.path.exists("migrations"):
-            print("Initializing new database...")
-            init()
-            stamp()
-        # อัปเกรด DB ให้ตรงกับ migration ล่าสุด
-        print("Upgrading database to latest revision...")
-        try:
-            migrate(message="auto migration")
-        except CommandError as e:
-            print("Migration failed, attempting to upgrade first...")
-            upgrade()
-            migrate(message="auto migration")
+        migrate(message="auto migration")
+    except CommandError as e:
+        logger.warning("Migration failed, attempting to upgrade first...")
         upgrade()
-        print("Database migration completed successfully")
+        migrate(message="auto migration")
+    upgrade()
+
+def database_revisions():
+    """คืน (revision ปัจจุบันของ DB, head ของ migration scripts) เป็น set"""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    config = app.extensions["migrate"].migrate.get_config()
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    with db.engine.connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    return current, heads
+
+def setup_database_fast():
+    """แบบ production: เทียบ revision ของ DB กับ head แล้ว upgrade เฉพาะเมื่อยังไม่ตรง (ไม่ autogenerate)"""
+    current, heads = database_revisions()
+    if current == heads:
+        logger.info("Database at head %s, no upgrade needed", ", ".join(sorted(heads)))
+        return
+    logger.info("Upgrading database %s -> %s", ", ".join(sorted(current)) or "<empty>", ", ".join(sorted(heads)))
+    upgrade()
+
+def setup_database(autogenerate=MIGRATE_AUTOGENERATE):
+    start = time.perf_counter()
+    try:
+        if autogenerate:
+            setup_database_autogenerate()
+        else:
+            setup_database_fast()
     except Exception as e:
-        print(f"Database setup error: {e}")
+        logger.error("Database setup error: %s", e)
         raise
+    logger.info("Database setup (%s) completed in %.3fs",
+                "autogenerate" if autogenerate else "fast", time.perf_counter() - start)
 
 def run_tests():
     print("Running tests...")
@@ -60,8 +100,8 @@ if __name__ == "__main__":
         run_tests()
     else:
         with app.app_context():
-            setup_database()
-        log("✅ Starting Flask app with debug logger", name="system")
+            setup_database(autogenerate=MIGRATE_AUTOGENERATE or "--autogenerate" in sys.argv[1:])
+        logger.info("starting Flask app")
         port = int(os.environ.get("PORT", 5000))  # Render/Heroku จะส่งค่า PORT มา
         app.run(host="0.0.0.0", port=port, debug=False)
 
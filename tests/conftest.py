@@ -0,0 +1,156 @@
+# tests/conftest.py
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+# ใช้ sqlite in-memory, จัดตารางแบบ inline และไม่เริ่ม scheduler ในการทดสอบ (ต้องตั้งก่อน import app)
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("RESCHEDULE_MODE", "inline")
+os.environ.setdefault("SCHEDULER_MODE", "off")
+
+from app import create_app, db
+from app.extensions import init_mail
+from app.models import User, DailyAllocations
+from app.services.user_service import AuthService, UserUpdateService
+from app.services.schedule_service import SLOTS_CACHE
+from app.utils.utils import get_today
+from app.testing.smtp_sink import SmtpSink
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    """
+    สร้างตารางใหม่ทุก test
+    - ไม่ค้าง app context ไว้ระหว่าง test เพื่อให้แต่ละ request ได้ session ใหม่เหมือนใช้งานจริง
+    """
+    with app.app_context():
+        db.create_all()
+    SLOTS_CACHE.invalidate()
+    yield db
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class QueryCounter:
+    """เก็บ SQL statement ที่ถูก execute ระหว่างอยู่ใน count_queries()"""
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """นับ SQL statement ที่ engine execute ภายใน with block"""
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture
+def query_budget(app):
+    """
+    ใช้: with query_budget(5): client.get(...)
+    fail ถ้าจำนวน SQL statement ใน block เกิน budget (แสดง statement ทั้งหมดใน error)
+    """
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def budget(limit):
+        with count_queries(engine) as counter:
+            yield counter
+        if len(counter) > limit:
+            listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(counter.statements))
+            pytest.fail(f"query budget exceeded: {len(counter)} > {limit}\n{listing}")
+    return budget
+
+
+@pytest.fixture
+def mail_sink(app, monkeypatch):
+    """
+    ใช้: sink = mail_sink(fail_every=3)
+    เปิด SMTP sink ในเครื่องแล้วชี้ Flask-Mail ไปที่ sink (ปิดเองตอนจบ test)
+    """
+    sinks = []
+
+    def start(fail_every=0):
+        sink = SmtpSink(fail_every=fail_every).start()
+        sinks.append(sink)
+        init_mail(app)
+        state = app.extensions["mail"]
+        monkeypatch.setattr(state, "server", sink.host)
+        monkeypatch.setattr(state, "port", sink.port)
+        monkeypatch.setattr(state, "use_tls", False)
+        # app.testing ทำให้ Flask-Mail ไม่ส่งจริง (MAIL_SUPPRESS_SEND) แต่ test นี้ต้องส่งไปที่ sink
+        monkeypatch.setattr(state, "suppress", False)
+        monkeypatch.setattr(state, "password", None)
+        monkeypatch.setattr(state, "default_sender", "test@example.com")
+        return sink
+
+    yield start
+    for sink in sinks:
+        sink.stop()
+
+
+@pytest.fixture
+def user(app):
+    """id ของ user ที่ cleanup แล้ววันนี้ (ยังไม่มีแผน)"""
+    with app.test_request_context():
+        user = User(username="tester", email="tester@example.com", last_cleanup_date=get_today())
+        AuthService.set_password(user, "password123", persist=False)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def plans(app, user):
+    """เพิ่มแผน 3 วิชา (สอบอีก 10/20/30 วัน) พร้อมตาราง คืน list ของ plan id"""
+    with app.test_request_context():
+        owner = db.session.get(User, user)
+        today = get_today()
+        for i, (name, level) in enumerate([("math", 5), ("physics", 3), ("chem", 7)], start=1):
+            UserUpdateService.add_plan(owner, name, (today + timedelta(days=10 * i)).isoformat(), level)
+        return [plan.id for plan in owner.reading_plans]
+
+
+@pytest.fixture
+def pending(app, user, plans):
+    """id ของ allocation วันนี้ที่ยังไม่ได้ feedback"""
+    with app.test_request_context():
+        return [alloc.id for alloc in (DailyAllocations.query
+                                       .filter_by(user_id=user, date=get_today(), feedback_done=False)
+                                       .order_by(DailyAllocations.id))]
+
+
+@pytest.fixture
+def auth_client(client, user):
+    """test client ที่ login แล้ว (session ของ Flask-Login)"""
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user)
+        sess["_fresh"] = True
+    return client
@@ -0,0 +1,163 @@
+# tests/test_auth_api.py
+
+def test_register(client, query_budget):
+    with query_budget(2):
+        res = client.post("/api/auth/register", json={
+            "username": "new", "email": "new@example.com", "password": "pw"
+        })
+    assert res.status_code == 201
+
+
+def test_register_duplicate_email(client, user, query_budget):
+    with query_budget(1):
+        res = client.post("/api/auth/register", json={
+            "username": "other", "email": "tester@example.com", "password": "pw"
+        })
+    assert res.status_code == 400
+
+
+def test_register_duplicate_email_other_case(client, user):
+    res = client.post("/api/auth/register", json={
+        "username": "other", "email": "Tester@Example.COM", "password": "pw"
+    })
+    assert res.status_code == 400
+
+
+def test_login(client, user, query_budget):
+    with query_budget(1):
+        res = client.post("/api/auth/login", json={"username": "tester", "password": "password123"})
+    assert res.status_code == 200
+
+
+def test_login_wrong_password(client, user, query_budget):
+    with query_budget(1):
+        res = client.post("/api/auth/login", json={"username": "tester", "password": "wrong"})
+    assert res.status_code == 401
+
+
+def test_login_case_insensitive(client, user, query_budget):
+    for name in ("TESTER", "Tester@Example.com"):
+        with query_budget(1):
+            res = client.post("/api/auth/login", json={"username": name, "password": "password123"})
+        assert res.status_code == 200, name
+
+
+def test_login_duplicate_username(app, client, user):
+    from app.extensions import db
+    from app.models import User
+    from app.services.user_service import AuthService
+
+    with app.app_context():
+        other = User(username="Tester", email="other@example.com")
+        AuthService.set_password(other, "password123", persist=False)
+        db.session.add(other)
+        db.session.commit()
+    res = client.post("/api/auth/login", json={"username": "tester", "password": "password123"})
+    assert res.status_code == 400
+    res = client.post("/api/auth/login", json={"username": "other@example.com", "password": "password123"})
+    assert res.status_code == 200
+
+
+def test_login_lookup_uses_index(app):
+    from app.extensions import db
+    with app.app_context():
+        for column in ("email_lower", "username_lower"):
+            plan = db.session.execute(db.text(
+                f"EXPLAIN QUERY PLAN SELECT id FROM users WHERE {column} = 'x'"
+            )).all()
+            assert f"ix_users_{column}" in str(plan)
+
+
+def test_logout(client, query_budget):
+    with query_budget(0):
+        res = client.post("/api/auth/logout")
+    assert res.status_code == 200
+
+
+def test_forgot_and_reset(client, user, query_budget):
+    with query_budget(1):
+        res = client.post("/api/auth/forgot", json={"email": "tester@example.com"})
+    assert res.status_code == 200
+    token = res.get_json()["token"]
+
+    with query_budget(2):
+        res = client.post("/api/auth/reset", json={"token": token, "new_password": "changed"})
+    assert res.status_code == 200
+    res = client.post("/api/auth/login", json={"username": "tester", "password": "changed"})
+    assert res.status_code == 200
+
+
+def test_login_rehashes_old_hash(app, client, user, query_budget):
+    from werkzeug.security import generate_password_hash
+    from app.extensions import db
+    from app.models import User
+    from app.services.password_hasher import PASSWORD_HASHER
+
+    with app.app_context():
+        db.session.get(User, user).password = generate_password_hash("password123", "pbkdf2:sha256:1000")
+        db.session.commit()
+
+    # hash ใหม่ด้วย method ปัจจุบัน: UPDATE + โหลด user ใหม่หลัง commit (ครั้งเดียวต่อ user)
+    with query_budget(3):
+        res = client.post("/api/auth/login", json={"username": "tester", "password": "password123"})
+    assert res.status_code == 200
+    with app.app_context():
+        stored = db.session.get(User, user).password
+    assert not PASSWORD_HASHER.needs_rehash(stored)
+
+    res = client.post("/api/auth/login", json={"username": "tester", "password": "password123"})
+    assert res.status_code == 200
+
+
+def test_login_busy_returns_503(client, user, monkeypatch):
+    from app.services.password_hasher import PASSWORD_HASHER
+    monkeypatch.setattr(PASSWORD_HASHER, "timeout", 0)
+    monkeypatch.setattr(PASSWORD_HASHER, "slots", __import__("threading").BoundedSemaphore(1))
+    PASSWORD_HASHER.slots.acquire()
+    try:
+        res = client.post("/api/auth/login", json={"username": "tester", "password": "password123"})
+    finally:
+        PASSWORD_HASHER.slots.release()
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+
+def test_password_busy_returns_503(client, auth_client, user, monkeypatch):
+    from app.services.password_hasher import PASSWORD_HASHER, PasswordHasherBusy
+
+    def busy(*args):
+        raise PasswordHasherBusy("password hashing queue is full")
+
+    token = client.post("/api/auth/forgot", json={"email": "tester@example.com"}).get_json()["token"]
+    monkeypatch.setattr(PASSWORD_HASHER, "_run", busy)
+    responses = [
+        client.post("/api/auth/reset", json={"token": token, "new_password": "changed"}),
+        client.post("/api/auth/register", json={"username": "new", "email": "new@example.com", "password": "pw"}),
+        auth_client.put("/api/user/change-password", json={"old_password": "password123", "new_password": "x"}),
+        auth_client.put("/api/user/settings", json={"old_password": "password123", "new_password": "x"}),
+    ]
+    for res in responses:
+        assert res.status_code == 503
+        assert res.headers["Retry-After"] == "1"
+        assert res.get_json() == {"error": "Server busy, please try again"}
+
+
+def test_method_prefix_matches_werkzeug():
+    from werkzeug.security import generate_password_hash
+    from app.services.password_hasher import method_prefix
+
+    for method in ("scrypt", "scrypt:16384:8:1", "pbkdf2", "pbkdf2:sha512", "pbkdf2:sha256:1000"):
+        assert method_prefix(method) == generate_password_hash("x", method).split("$", 1)[0]
+
+
+def test_needs_rehash_keeps_stronger_hash():
+    from app.services.password_hasher import PasswordHasher
+
+    hasher = PasswordHasher(method="scrypt:16384:8:1", mode="inline")
+    assert not hasher.needs_rehash("scrypt:32768:8:1$salt$hash")
+    assert hasher.needs_rehash("scrypt:8192:8:1$salt$hash")
+    assert hasher.needs_rehash("pbkdf2:sha256:600000$salt$hash")
+    assert not PasswordHasher(method="pbkdf2:sha256:1000", mode="inline").needs_rehash("pbkdf2:sha256:600000$s$h")
+
+    downgrade = PasswordHasher(method="scrypt:16384:8:1", mode="inline", allow_downgrade=True)
+    assert downgrade.needs_rehash("scrypt:32768:8:1$salt$hash")
@@ -0,0 +1,64 @@
+# tests/test_digest.py
+from datetime import timedelta
+
+from app.extensions import db
+from app.models import User
+from app.notification.scheduler import iter_daily_summaries
+from app.routes.api.study import get_daily_summary
+from app.services.user_service import AuthService, UserUpdateService
+from app.utils.utils import get_today
+
+
+def make_users(count):
+    today = get_today()
+    for i in range(count):
+        user = User(username=f"u{i}", email=f"u{i}@example.com", email_notifications=(i % 3 != 0))
+        AuthService.set_password(user, "pw", persist=False)
+        db.session.add(user)
+        db.session.commit()
+        for j in range(i % 3):
+            UserUpdateService.add_plan(user, f"exam{j}", (today + timedelta(days=5 + 7 * j)).isoformat(), 3 + j)
+
+
+def test_iter_daily_summaries_matches_per_user(app, query_budget):
+    with app.test_request_context():
+        make_users(12)
+        today = get_today()
+        db.session.expunge_all()
+
+        # users 1 query + summary ของทุก user 1 query ไม่ว่าจะมีกี่ user
+        with query_budget(2):
+            results = [(user.id, summary) for user, summary in iter_daily_summaries(today, batch_size=4)]
+
+        expected_ids = [u.id for u in User.query.filter_by(email_notifications=True).order_by(User.id)]
+        assert [user_id for user_id, _ in results] == expected_ids
+        for user_id, summary in results:
+            expected = get_daily_summary(user_id, today)
+            assert summary["total_hours"] == expected["total_hours"]
+            assert sorted(summary["subjects"], key=lambda s: s["name"]) == \
+                sorted(expected["subjects"], key=lambda s: s["name"])
+
+
+def test_batch_job_enqueues_every_user(app, mail_sink):
+    from app.models import EmailOutbox
+    from app.notification.scheduler import batch_job
+
+    sink = mail_sink()
+    with app.test_request_context():
+        make_users(18)
+        today = get_today()
+        expected = sorted(
+            f"u{i}@example.com" for i in range(18)
+            if i % 3 != 0 and get_daily_summary(User.query.filter_by(username=f"u{i}").one().id, today)["total_hours"]
+        )
+        assert len(expected) > 5
+        db.session.remove()
+
+        # commit ของ outbox ทุก 2 ฉบับ ระหว่าง stream users ทีละ 5 แถว ต้องไม่ทำให้ user ที่เหลือหายไป
+        stats = batch_job(date_local=today, batch_size=2, yield_per=5)
+        assert stats["enqueued"] == len(expected)
+        assert sorted(row.to_email for row in EmailOutbox.query) == expected
+        assert sink.messages == len(expected)
+
+        # รันซ้ำในวันเดียวกันไม่เขียนซ้ำ
+        assert batch_job(date_local=today, batch_size=2, yield_per=5)["enqueued"] == 0
@@ -0,0 +1,23 @@
+# tests/test_email_delivery.py
+import pytest
+
+from app.notification.email_service import MailDelivery
+
+
+@pytest.fixture
+def sink(mail_sink):
+    """SMTP sink ที่ตอบ 451 ทุกข้อความที่ 3"""
+    return mail_sink(fail_every=3)
+
+
+def test_mail_delivery_reuses_connections_and_retries(app, sink):
+    with MailDelivery(app, workers=2, retries=2, backoff=0) as delivery:
+        for i in range(20):
+            delivery.submit(f"user{i}@example.com", "digest", "<p>hi</p>")
+
+    stats = delivery.stats
+    assert stats["sent"] == 20
+    assert stats["failed"] == 0
+    assert stats["retries"] > 0
+    # connection ใหม่เฉพาะ thread แรกเริ่ม + หลัง retry เท่านั้น
+    assert sink.connections <= 2 + stats["retries"]
@@ -0,0 +1,55 @@
+# tests/test_feedback_api.py
+from app.extensions import db
+from app.models import DailyAllocations
+
+
+def test_pending_feedback(auth_client, pending, query_budget):
+    with query_budget(2):
+        res = auth_client.get("/api/feedback/pending")
+    assert res.status_code == 200
+    assert [a["alloc_id"] for a in res.get_json()] == pending
+
+
+def test_submit_feedback(app, auth_client, pending, query_budget):
+    # +4: UPDATE / SAVEPOINT + INSERT + RELEASE ของ user_daily_stats (feedback แรกของวัน)
+    with query_budget(22):
+        res = auth_client.post("/api/feedback", json={"alloc_id": pending[0], "feedback_type": "read_in_time"})
+    assert res.status_code == 200
+    with app.app_context():
+        assert db.session.get(DailyAllocations, pending[0]).feedback_done
+
+
+def test_submit_feedback_invalid(auth_client, pending, query_budget):
+    with query_budget(2):
+        res = auth_client.post("/api/feedback", json={"alloc_id": 9999, "feedback_type": "read_in_time"})
+    assert res.status_code == 400
+
+
+def test_submit_feedback_batch(auth_client, pending, query_budget):
+    items = [{"alloc_id": alloc_id, "feedback_type": "read_in_time"} for alloc_id in pending]
+    with query_budget(16):
+        res = auth_client.post("/api/feedback/batch", json=items)
+    assert res.status_code == 200
+    assert res.get_json()["applied"] == pending
+
+
+def test_submit_feedback_invalid_type(app, auth_client, pending, query_budget):
+    with query_budget(2):
+        res = auth_client.post("/api/feedback", json={"alloc_id": pending[0], "feedback_type": "bogus"})
+    assert res.status_code == 400
+    with app.app_context():
+        assert not db.session.get(DailyAllocations, pending[0]).feedback_done
+
+
+def test_submit_feedback_batch_invalid(auth_client, pending, query_budget):
+    for body in ([1, 2],
+                 [{"alloc_id": [1], "feedback_type": "harder"}],
+                 {"items": [{"alloc_id": pending[0], "feedback_type": "bogus"}]}):
+        # ตอบ 400 ก่อน query allocation (เหลือแค่ query โหลด user)
+        with query_budget(1):
+            res = auth_client.post("/api/feedback/batch", json=body)
+        assert res.status_code == 400, body
+        assert res.get_json()["index"] == 0
+    with query_budget(1):
+        res = auth_client.post("/api/feedback/batch", json={"alloc_id": [1]})
+    assert res.status_code == 400
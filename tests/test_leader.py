@@ -0,0 +1,62 @@
+# tests/test_leader.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models import SchedulerLeases
+from app.notification.leader import LeaderElection
+
+
+def expire_lease(app, name):
+    with app.app_context():
+        db.session.execute(
+            update(SchedulerLeases).where(SchedulerLeases.name == name)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        db.session.commit()
+
+
+def test_only_one_leader(app):
+    first = LeaderElection(app, name="test")
+    second = LeaderElection(app, name="test")
+
+    assert first.beat() is True
+    assert second.beat() is False
+    # leader ต่อ lease ของตัวเองได้เรื่อย ๆ
+    assert first.beat() is True
+    assert second.beat() is False
+
+
+def test_expired_lease_is_taken_over(app):
+    first = LeaderElection(app, name="test")
+    second = LeaderElection(app, name="test")
+    assert first.beat() is True
+
+    expire_lease(app, "test")
+    assert second.beat() is True
+    assert first.beat() is False
+
+
+def test_release_hands_over_immediately(app):
+    first = LeaderElection(app, name="test")
+    second = LeaderElection(app, name="test")
+    assert first.beat() is True
+
+    first.release()
+    assert first.is_leader is False
+    assert second.beat() is True
+
+
+def test_leader_only_runs_job_on_leader(app):
+    first = LeaderElection(app, name="test")
+    second = LeaderElection(app, name="test")
+    calls = []
+
+    def job():
+        calls.append(1)
+        return "done"
+
+    assert first.leader_only(job)() == "done"
+    assert second.leader_only(job)() is None
+    assert len(calls) == 1
@@ -0,0 +1,91 @@
+# tests/test_metrics.py
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import create_app, db
+from app import metrics
+from app.models import User
+from app.services.user_service import AuthService, UserUpdateService
+from app.utils.utils import get_today
+
+
+@pytest.fixture
+def metrics_app(monkeypatch):
+    """app แยกที่เปิด METRICS_ENABLED (sqlite in-memory ของตัวเอง) พร้อม route ที่ใช้ Core select()"""
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    app = create_app()
+    app.config["TESTING"] = True
+
+    @app.route("/_test/user-ids")
+    def user_ids():
+        return {"ids": db.session.execute(select(User.id)).scalars().all()}
+
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def metrics_user(metrics_app):
+    """user 1 คนที่มีแผน 2 วิชา (มี allocation ให้ export)"""
+    with metrics_app.test_request_context():
+        user = User(username="metrics", email="metrics@example.com", last_cleanup_date=get_today())
+        AuthService.set_password(user, "password123", persist=False)
+        db.session.add(user)
+        db.session.commit()
+        for i, name in enumerate(["math", "physics"], start=1):
+            UserUpdateService.add_plan(user, name, (get_today() + timedelta(days=10 * i)).isoformat(), 5)
+        return user.id
+
+
+def get(client, url):
+    """GET แล้วอ่าน body จนจบและปิด response (metric ถูกบันทึกตอนปิด)"""
+    res = client.get(url)
+    body = res.get_data(as_text=True)
+    res.close()
+    return res, body
+
+
+def sample(text, name, route, method="GET", **extra):
+    labels = {"method": method, "route": route, **extra}
+    prefix = name + "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "} "
+    values = [line[len(prefix):] for line in text.splitlines() if line.startswith(prefix)]
+    assert values, f"missing {prefix}"
+    return float(values[0])
+
+
+def test_metrics_records_route(metrics_app, metrics_user):
+    client = metrics_app.test_client()
+    for _ in range(2):
+        res, _ = get(client, "/_test/user-ids")
+        assert res.status_code == 200
+    _, text = get(client, "/metrics")
+
+    route = "/_test/user-ids"
+    assert sample(text, "app_requests_total", route, status=200) == 2
+    assert sample(text, "app_request_duration_seconds_count", route) == 2
+    assert sample(text, "app_request_duration_seconds_bucket", route, le="+Inf") == 2
+    assert sample(text, "app_request_sql_statements_total", route) == 2
+    # Core select() คืน 1 แถวต่อ request
+    assert sample(text, "app_request_sql_rows_returned_total", route) == 2
+    assert 'route="/metrics"' not in text
+
+
+def test_metrics_counts_streamed_body(metrics_app, metrics_user):
+    client = metrics_app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(metrics_user)
+        sess["_fresh"] = True
+    res, body = get(client, "/api/schedule.ics")
+    assert res.status_code == 200
+    assert "BEGIN:VEVENT" in body
+    _, text = get(client, "/metrics")
+
+    # โหลด user + query ของ iter_ics ที่รันระหว่าง stream
+    assert sample(text, "app_request_sql_statements_total", "/api/schedule.ics") >= 2
+    assert sample(text, "app_request_sql_rows_returned_total", "/api/schedule.ics") > 1
@@ -0,0 +1,77 @@
+# tests/test_outbox.py
+from app.extensions import db
+from app.models import EmailOutbox
+from app.notification.outbox import OutboxService, OutboxSender
+
+
+def enqueue(app, count, prefix="m"):
+    with app.app_context():
+        return OutboxService.enqueue_many([
+            dict(to_email=f"{prefix}{i}@example.com", subject="hi", body_html="<p>hi</p>", key=f"{prefix}:{i}")
+            for i in range(count)
+        ])
+
+
+def counts(app):
+    with app.app_context():
+        return OutboxService.counts()
+
+
+def test_enqueue_skips_duplicate_keys(app):
+    assert enqueue(app, 3) == 3
+    # รันซ้ำ (เช่น batch_job ที่ล้มกลางทาง) เขียนเฉพาะ key ที่ยังไม่มี
+    assert enqueue(app, 5) == 2
+    with app.app_context():
+        assert OutboxService.enqueue("x@example.com", "hi", body_text="hi", key="m:0") is False
+        assert EmailOutbox.query.count() == 5
+
+
+def test_sender_drains_outbox(app, mail_sink):
+    sink = mail_sink()
+    enqueue(app, 7)
+
+    stats = OutboxSender(app, batch_size=3, workers=2).drain()
+    assert stats["sent"] == 7
+    assert stats["batches"] == 3
+    assert sink.messages == 7
+    assert counts(app)["sent"] == 7
+
+    # ข้อความที่ส่งแล้วไม่ถูกส่งซ้ำ
+    assert OutboxSender(app).drain()["sent"] == 0
+    assert sink.messages == 7
+
+
+def test_sender_backs_off_then_gives_up(app, mail_sink):
+    mail_sink(fail_every=1)
+    enqueue(app, 2)
+
+    sender = OutboxSender(app, max_attempts=2, backoff=0, workers=1, retries=0)
+    stats = sender.drain()
+    assert stats["sent"] == 0
+    assert stats["retried"] == 2
+    assert stats["failed"] == 2
+    with app.app_context():
+        rows = EmailOutbox.query.all()
+        assert {row.status for row in rows} == {"failed"}
+        assert all(row.attempts == 2 and row.last_error for row in rows)
+
+
+def test_sender_waits_for_backoff(app, mail_sink):
+    mail_sink(fail_every=1)
+    enqueue(app, 1)
+
+    stats = OutboxSender(app, max_attempts=3, backoff=60, workers=1, retries=0).drain()
+    assert stats["retried"] == 1
+    assert counts(app)["pending"] == 1
+    # ยังไม่ถึง next_attempt_at → ไม่ claim ซ้ำ
+    assert OutboxSender(app, backoff=60).drain()["batches"] == 0
+
+
+def test_forgot_password_writes_outbox(app, client, user):
+    response = client.post("/req/forgot", data={"email": "tester@example.com"})
+    assert response.status_code == 200
+    with app.app_context():
+        row = db.session.execute(db.select(EmailOutbox)).scalar_one()
+        assert row.to_email == "tester@example.com"
+        assert row.status == "pending"
+        assert "reset" in row.body_text
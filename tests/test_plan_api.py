@@ -0,0 +1,50 @@
+# tests/test_plan_api.py
+from datetime import timedelta
+from app.utils.utils import get_today
+
+
+def test_get_plans(auth_client, plans, query_budget):
+    with query_budget(4):
+        res = auth_client.get("/api/plans")
+    assert res.status_code == 200
+    body = res.get_json()
+    assert sorted(p["exam_name"] for p in body["plans"]) == ["chem", "math", "physics"]
+    assert set(body["slots"]) == {"chem", "math", "physics"}
+
+
+def test_get_plans_unauthorized(client, query_budget):
+    with query_budget(0):
+        res = client.get("/api/plans")
+    assert res.status_code == 401
+
+
+def test_add_plan(auth_client, plans, query_budget):
+    exam_date = (get_today() + timedelta(days=15)).isoformat()
+    with query_budget(22):
+        res = auth_client.post("/api/plans", json={"exam_name": "bio", "exam_date": exam_date, "level": 4})
+    assert res.status_code == 201
+
+
+def test_add_plan_duplicate(auth_client, plans, query_budget):
+    exam_date = (get_today() + timedelta(days=15)).isoformat()
+    with query_budget(2):
+        res = auth_client.post("/api/plans", json={"exam_name": "math", "exam_date": exam_date, "level": 4})
+    assert res.status_code == 400
+
+
+def test_set_daily_hours(auth_client, plans, query_budget):
+    with query_budget(16):
+        res = auth_client.post("/api/plans/daily-hours", json={"daily_read_hours": 5})
+    assert res.status_code == 200
+
+
+def test_delete_plan(auth_client, plans, query_budget):
+    with query_budget(21):
+        res = auth_client.delete(f"/api/plans/{plans[0]}")
+    assert res.status_code == 200
+
+
+def test_delete_plan_not_found(auth_client, plans, query_budget):
+    with query_budget(2):
+        res = auth_client.delete("/api/plans/9999")
+    assert res.status_code == 404
@@ -0,0 +1,232 @@
+# tests/test_reschedule.py
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models import RescheduleJobs, User
+from app.services import reschedule_service
+from app.services.reschedule_service import ThreadRescheduleQueue, DbRescheduleQueue, RescheduleService
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """แทน run_reschedule ด้วยตัวนับ; runs.fail = จำนวนครั้งแรกที่ให้ล้ม, runs.dates = simulated_date ของแต่ละรอบ"""
+    class Runs(list):
+        fail = 0
+        gate = None
+
+    calls = Runs()
+    calls.dates = []
+
+    def fake_run(app, user_id, simulated_date=None):
+        if calls.gate is not None:
+            calls.gate.wait(5)
+        calls.append(user_id)
+        calls.dates.append(simulated_date)
+        if len(calls) <= calls.fail:
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(reschedule_service, "run_reschedule", fake_run)
+    return calls
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.01)
+
+
+def test_thread_queue_coalesces(app, runs):
+    queue = ThreadRescheduleQueue(app, window=0.2)
+    assert [queue.enqueue(1) for _ in range(3)] == [1, 2, 3]
+    wait_until(lambda: queue.status(1) == (3, 3, False))
+    assert runs == [1]
+    assert queue.status(2) == (0, 0, False)
+
+
+def test_thread_queue_reruns_trigger_during_run(app, runs):
+    runs.gate = threading.Event()
+    queue = ThreadRescheduleQueue(app, window=0.01)
+    queue.enqueue(1)
+    wait_until(lambda: queue.state[1]["running"])
+    queue.enqueue(1)
+    runs.gate.set()
+    wait_until(lambda: queue.status(1) == (2, 2, False))
+    assert runs == [1, 1]
+
+
+def test_thread_queue_retries_then_gives_up(app, runs):
+    runs.fail = 1
+    queue = ThreadRescheduleQueue(app, window=0.01, max_attempts=2, backoff=0.01)
+    queue.enqueue(1)
+    wait_until(lambda: queue.status(1) == (1, 1, False))
+    assert runs == [1, 1]
+
+    runs.fail = 10
+    queue.enqueue(1)
+    wait_until(lambda: queue.status(1)[2])
+    # ล้มครบ max_attempts → completed ไม่ขยับ และไม่ลองต่อ
+    assert queue.status(1) == (2, 1, True)
+    time.sleep(0.1)
+    assert len(runs) == 4
+
+    # trigger ใหม่ได้โควตาลองใหม่
+    runs.fail = 0
+    queue.enqueue(1)
+    wait_until(lambda: queue.status(1) == (3, 3, False))
+
+
+def db_queue(app, **kwargs):
+    kwargs = {"window": 0, "backoff": 0, "max_attempts": 2, **kwargs}
+    return DbRescheduleQueue(app, **kwargs)
+
+
+def expire_claim(app, user_id):
+    with app.app_context():
+        db.session.execute(
+            update(RescheduleJobs).where(RescheduleJobs.user_id == user_id)
+            .values(claimed_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        db.session.commit()
+
+
+def test_db_queue_coalesces(app, user, runs):
+    queue = db_queue(app)
+    with app.app_context():
+        assert [queue.enqueue(user) for _ in range(3)] == [1, 2, 3]
+        assert queue.status(user) == (3, 0, False)
+    # enqueue ไม่เริ่ม worker thread เองถ้าไม่ได้เปิด embedded
+    assert queue.threads == []
+
+    assert queue.work_once() is True
+    assert queue.work_once() is False
+    assert runs == [user]
+    with app.app_context():
+        assert queue.status(user) == (3, 3, False)
+
+
+def test_db_queue_claim_and_lease(app, user, runs):
+    first, second = db_queue(app), db_queue(app)
+    with app.app_context():
+        first.enqueue(user)
+        assert first.claim() == (user, 1, None)
+        # trigger ระหว่างรัน → version ใหม่รอรอบถัดไป แต่ยัง claim ซ้ำไม่ได้จนกว่า lease หมด
+        first.enqueue(user)
+        assert second.claim() is None
+
+    expire_claim(app, user)
+    with app.app_context():
+        assert second.claim() == (user, 2, None)
+        # worker เดิมที่ lease หมดไปแล้วบันทึกผลทับไม่ได้
+        first.finish(user, 1)
+        assert first.status(user) == (2, 0, False)
+        second.finish(user, 2)
+        assert second.status(user) == (2, 2, False)
+        assert second.claim() is None
+
+
+def test_db_queue_takes_over_expired_claim(app, user, runs):
+    first, second = db_queue(app), db_queue(app)
+    with app.app_context():
+        first.enqueue(user)
+        assert first.claim() == (user, 1, None)
+        # worker แรกตายโดยไม่มี trigger ใหม่ → ยังไม่คืนงานจนกว่า lease หมด
+        assert second.claim() is None
+
+    expire_claim(app, user)
+    with app.app_context():
+        assert second.claim() == (user, 1, None)
+        second.finish(user, 1)
+        assert second.status(user) == (1, 1, False)
+    # ทำเสร็จแล้ว lease หมดก็ไม่ถูก claim ซ้ำ
+    expire_claim(app, user)
+    with app.app_context():
+        assert second.claim() is None
+
+
+def test_db_queue_retries_then_gives_up(app, user, runs):
+    runs.fail = 10
+    queue = db_queue(app)
+    with app.app_context():
+        queue.enqueue(user)
+    assert queue.work_once() is True
+    with app.app_context():
+        assert db.session.get(RescheduleJobs, user).attempts == 1
+        assert queue.status(user) == (1, 0, False)
+    assert queue.work_once() is True
+    # ครบ max_attempts → ไม่อยู่ในคิวแล้ว
+    assert queue.work_once() is False
+    with app.app_context():
+        job = db.session.get(RescheduleJobs, user)
+        assert (job.attempts, job.due_at) == (2, None)
+        assert queue.status(user) == (1, 0, True)
+
+        runs.fail = 0
+        queue.enqueue(user)
+        assert queue.status(user) == (2, 0, False)
+    assert queue.work_once() is True
+    with app.app_context():
+        assert queue.status(user) == (2, 2, False)
+        assert db.session.get(RescheduleJobs, user).attempts == 0
+
+
+def test_db_queue_backoff(app, user, runs):
+    runs.fail = 1
+    queue = db_queue(app, backoff=60)
+    with app.app_context():
+        queue.enqueue(user)
+    assert queue.work_once() is True
+    # ยังไม่ถึงเวลาลองใหม่
+    assert queue.work_once() is False
+    with app.app_context():
+        due_at = db.session.get(RescheduleJobs, user).due_at
+    assert timedelta(seconds=50) < due_at - datetime.utcnow() <= timedelta(seconds=60)
+
+
+def test_thread_queue_uses_latest_simulated_date(app, runs):
+    queue = ThreadRescheduleQueue(app, window=0.2)
+    queue.enqueue(1, date(2030, 1, 1))
+    queue.enqueue(1, date(2030, 1, 2))
+    wait_until(lambda: queue.status(1) == (2, 2, False))
+    assert runs.dates == [date(2030, 1, 2)]
+
+
+def test_db_queue_passes_simulated_date(app, user, runs):
+    queue = db_queue(app)
+    with app.app_context():
+        queue.enqueue(user, date(2030, 1, 1))
+    assert queue.work_once() is True
+    assert runs.dates == [date(2030, 1, 1)]
+
+
+def test_db_queue_enqueue_joins_caller_transaction(app, user, runs):
+    queue = db_queue(app)
+    with app.app_context():
+        assert queue.enqueue(user, commit=False) == 1
+        db.session.rollback()
+        assert db.session.get(RescheduleJobs, user) is None
+    assert queue.work_once() is False
+
+
+def test_request_without_commit_enqueues_after_commit(app, user, runs, monkeypatch):
+    queue = ThreadRescheduleQueue(app, window=0)
+    monkeypatch.setattr(reschedule_service, "RESCHEDULE_MODE", "thread")
+    monkeypatch.setitem(app.extensions, "reschedule_queue", queue)
+    with app.test_request_context():
+        owner = db.session.get(User, user)
+        assert RescheduleService.request(owner, commit=False) is None
+        assert queue.status(user) == (0, 0, False)
+        db.session.rollback()
+        db.session.commit()
+        assert queue.status(user) == (0, 0, False)
+
+        owner = db.session.get(User, user)
+        RescheduleService.request(owner, commit=False)
+        db.session.commit()
+        assert RescheduleService.current_version() == 1
+    wait_until(lambda: queue.status(user) == (1, 1, False))
@@ -0,0 +1,105 @@
+# tests/test_schedule_api.py
+from datetime import timedelta
+from app.utils.utils import get_today
+
+
+def test_get_schedule(auth_client, plans, query_budget):
+    with query_budget(3):
+        res = auth_client.get("/api/schedule")
+    assert res.status_code == 200
+    events = res.get_json()["events"]
+    assert sum(1 for e in events if e["event_type"] == "exam") == 3
+    assert any(e["event_type"] == "study" for e in events)
+
+
+def test_get_schedule_not_modified(auth_client, plans, query_budget):
+    etag = auth_client.get("/api/schedule").headers["ETag"]
+    with query_budget(1):
+        res = auth_client.get("/api/schedule", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+
+def test_get_schedule_window(auth_client, plans, query_budget):
+    today = get_today()
+    date_from, date_to = today.isoformat(), (today + timedelta(days=6)).isoformat()
+    with query_budget(3):
+        res = auth_client.get(f"/api/schedule?from={date_from}&to={date_to}")
+    assert res.status_code == 200
+    assert all(date_from <= e["day"] <= date_to for e in res.get_json()["events"])
+
+
+def test_get_schedule_pages(auth_client, plans, query_budget):
+    full = auth_client.get("/api/schedule").get_json()["events"]
+    events, cursor = [], None
+    while True:
+        url = "/api/schedule?limit=10" + (f"&cursor={cursor}" if cursor else "")
+        with query_budget(3):
+            body = auth_client.get(url).get_json()
+        events += body["events"]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    key = lambda e: (e["day"], e["event_type"], e["exam"], e["id"] or 0)
+    assert sorted(events, key=key) == sorted(full, key=key)
+
+
+def test_schedule_status(auth_client, query_budget):
+    with query_budget(1):
+        res = auth_client.get("/api/schedule/status")
+    assert res.status_code == 200
+    assert res.get_json()["pending"] is False
+
+
+def test_schedule_ics(auth_client, plans, query_budget):
+    with query_budget(3):
+        res = auth_client.get("/api/schedule.ics")
+        body = res.get_data(as_text=True)
+    assert res.status_code == 200
+    assert res.mimetype == "text/calendar"
+    assert body.startswith("BEGIN:VCALENDAR\r\n") and body.endswith("END:VCALENDAR\r\n")
+    assert body.count("UID:exam-") == 3
+    assert "UID:alloc-" in body
+    assert all(len(line.encode()) <= 75 for line in body.split("\r\n"))
+
+
+def test_schedule_ics_not_modified(auth_client, plans, query_budget):
+    etag = auth_client.get("/api/schedule.ics").headers["ETag"]
+    # DTSTAMP เปลี่ยนทุก response → weak ETag
+    assert etag.startswith('W/"ics-')
+    with query_budget(1):
+        res = auth_client.get("/api/schedule.ics", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+
+def test_schedule_ics_feed_token(app, auth_client, plans, query_budget):
+    feed = auth_client.get("/api/schedule/feed").get_json()
+    assert feed["url"].endswith(f"/api/schedule.ics?token={feed['token']}")
+    client = app.test_client()
+    res = client.get(f"/api/schedule.ics?token={feed['token']}")
+    assert res.status_code == 200
+    assert res.get_data(as_text=True).count("UID:exam-") == 3
+    with query_budget(1):
+        res = client.get(f"/api/schedule.ics?token={feed['token']}", headers={"If-None-Match": res.headers["ETag"]})
+    assert res.status_code == 304
+
+    assert client.get(f"/api/schedule.ics?token={feed['token']}x").status_code == 401
+    # เปลี่ยนรหัสผ่านแล้วลิงก์เดิมใช้ไม่ได้
+    auth_client.put("/api/user/change-password", json={"old_password": "password123", "new_password": "changed"})
+    assert client.get(f"/api/schedule.ics?token={feed['token']}").status_code == 401
+
+
+def test_schedule_ics_since(auth_client, plans):
+    since = get_today() + timedelta(days=15)
+    body = auth_client.get(f"/api/schedule.ics?since={since.isoformat()}").get_data(as_text=True)
+    starts = [line.rsplit(":", 1)[1] for line in body.split("\r\n") if line.startswith("DTSTART")]
+    assert starts and min(starts) >= since.strftime("%Y%m%d")
+    assert body.count("UID:exam-") == 2
+    assert auth_client.get("/api/schedule.ics?since=bad").status_code == 400
+
+
+def test_ics_fold():
+    from app.services.calendar_service import fold
+    line = "SUMMARY:" + "อ่าน" * 40
+    folded = fold(line)
+    assert all(len(part.encode()) <= 75 for part in folded.split("\r\n"))
+    assert folded.replace("\r\n ", "") == line + "\r\n"
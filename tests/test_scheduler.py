@@ -0,0 +1,125 @@
+# tests/test_scheduler.py
+import copy
+import random
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from app.extensions import db
+from app.models import User, ReadingPlans, DailyAllocations
+from app.services.schedule_service import (
+    ScheduleService, Subject, largest_remainder_allocation, largest_remainder_allocation_batch,
+    schedule_backward_heap, schedule_backward_reference,
+)
+from app.utils.utils import get_today
+
+# (daily_read_hours, latest_exam_date เป็นวันจากวันนี้ หรือ None, [(ชื่อ, สอบอีกกี่วัน, level, weight, allocated_slot)])
+COHORT = [
+    # แผนเดียว ยังไม่เคยคำนวณ
+    (3, None, [("math", 10, 5, 0, 0)]),
+    # weight เท่ากัน + สอบวันเดียวกัน → เศษเท่ากันทั้งตอนแจก slot และวันทบทวน
+    (4, None, [("ab", 20, 3, 0, 0), ("ba", 20, 3, 0, 0), ("c", 20, 3, 0, 0)]),
+    # จำนวนวิชาไม่เท่ากัน (padding) และวันสอบซ้อนกันบางวิชา
+    (5, None, [("w", 7, 2, 0, 0), ("x", 14, 9, 0, 0), ("y", 14, 4, 0, 0), ("z", 30, 1, 0, 0)]),
+    # horizon ขยาย (เพิ่มแผนที่สอบหลัง latest_exam_date เดิม)
+    (3, 10, [("old", 10, 6, 90, 30), ("new", 20, 2, 0, 0)]),
+    # horizon หด (ลบแผนที่สอบไกลสุดไปแล้ว)
+    (2, 40, [("p", 12, 7, 300, 40), ("q", 25, 3, 150, 20)]),
+    # สอบวันนี้ → ไม่มีวันเหลือ
+    (3, None, [("today", 0, 5, 10, 3)]),
+    # ไม่มีแผน
+    (3, None, []),
+]
+
+
+def make_cohort(prefix):
+    today = get_today()
+    users = []
+    for i, (hours, latest, plans) in enumerate(COHORT):
+        user = User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", password="-",
+                    daily_read_hours=hours,
+                    latest_exam_date=today + timedelta(days=latest) if latest is not None else None)
+        user.reading_plans = [
+            ReadingPlans(exam_name=name, exam_date=today + timedelta(days=days), level=level,
+                         weight=weight, allocated_slot=slot)
+            for name, days, level, weight, slot in plans
+        ]
+        db.session.add(user)
+        users.append(user)
+    db.session.commit()
+    return users
+
+
+def snapshot(user):
+    allocations = DailyAllocations.query.filter_by(user_id=user.id).all()
+    return (
+        user.latest_exam_date,
+        sorted((p.exam_name, p.weight, p.allocated_slot) for p in user.reading_plans),
+        sorted((a.date, a.exam_name_snapshot, a.slots) for a in allocations),
+    )
+
+
+@pytest.mark.parametrize("next_day", [False, True])
+def test_schedule_many_matches_per_user(app, next_day):
+    with app.test_request_context():
+        single, batch = make_cohort("single"), make_cohort("batch")
+
+        expected = {}
+        for user in single:
+            ScheduleService.calculate_slots(user, next_day=next_day, persist=True)
+            expected[user.username[len("single"):]] = ScheduleService.distribute_schedule(user, next_day=next_day)
+        results = ScheduleService.schedule_many(batch, next_day=next_day, persist=True)
+
+        for one, many in zip(single, batch):
+            key = one.username[len("single"):]
+            assert results[many.id] == expected[key], key
+            assert snapshot(one) == snapshot(many), key
+
+
+def test_largest_remainder_allocation_batch():
+    rng = np.random.default_rng(7)
+    rows = [[5, 5, 5], [1, 2], [0, 0, 0, 0], [3], [7, 7, 1, 1], [2, 4, 4, 2, 6]]
+    rows += [rng.integers(0, 20, size=rng.integers(1, 6)).tolist() for _ in range(200)]
+    capacity = rng.integers(0, 13, size=len(rows))
+    width = max(len(row) for row in rows)
+    mask = np.zeros((len(rows), width), dtype=bool)
+    weights = np.zeros((len(rows), width))
+    for i, row in enumerate(rows):
+        mask[i, :len(row)] = True
+        weights[i, :len(row)] = row
+
+    result = largest_remainder_allocation_batch(weights, mask, capacity)
+    for i, row in enumerate(rows):
+        assert result[i, :len(row)].tolist() == largest_remainder_allocation(row, int(capacity[i])), row
+        assert not result[i, len(row):].any()
+
+
+# ชื่อที่กลับด้านแล้วเป็นอีกชื่อหนึ่ง / เป็น prefix กัน → key ชื่อกลับด้าน (name[::-1]) ของ heap ต้องเรียงเหมือน reference
+NAMES = ["ab", "ba", "abc", "cba", "a", "aa", "b", "bab", "ca", "ac"]
+
+
+def random_subjects(rng, start_day=740000):
+    """วิชาสุ่ม level / วันสอบซ้ำกันบ่อย ชั่วโมงรวมพอดี horizon (บางครั้งไม่ feasible)"""
+    count = rng.randint(1, 7)
+    horizon = rng.randint(1, 12)
+    daily_hours = rng.randint(1, 6)
+    levels = [rng.randint(1, 3) for _ in range(count)]
+    exam_days = [start_day + horizon] + [start_day + rng.randint(1, horizon) for _ in range(count - 1)]
+    required = largest_remainder_allocation(levels, horizon * daily_hours)
+    if rng.random() < 0.1:
+        required[0] += 1
+    names = rng.sample(NAMES, count)
+    subjects = [Subject(name=names[i], level=levels[i], required=required[i], exam_day=exam_days[i],
+                        remaining=required[i], plan_id=i + 1) for i in range(count)]
+    return start_day, daily_hours, subjects
+
+
+def test_schedule_backward_heap_matches_reference():
+    rng = random.Random(20251026)
+    for case in range(2000):
+        start_day, daily_hours, subjects = random_subjects(rng)
+        heap_subjects, reference_subjects = copy.deepcopy(subjects), copy.deepcopy(subjects)
+        expected = schedule_backward_reference(start_day, daily_hours, reference_subjects)
+        assert schedule_backward_heap(start_day, daily_hours, heap_subjects) == expected, (case, subjects)
+        assert heap_subjects == reference_subjects, (case, subjects)
@@ -0,0 +1,89 @@
+# tests/test_slots_cache.py
+from datetime import timedelta
+
+from flask import session
+
+from app.extensions import db
+from app.models import User, ReadingPlans
+from app.services.reschedule_service import RescheduleService
+from app.services.schedule_service import ScheduleService, SLOTS_CACHE
+from app.services.user_service import UserUpdateService
+from app.utils.utils import get_today
+
+
+def preview(user):
+    """preview_slots แล้วคืน (ผล, hits, misses ที่เพิ่มขึ้น)"""
+    before = SLOTS_CACHE.stats()
+    result = ScheduleService.preview_slots(user)
+    after = SLOTS_CACHE.stats()
+    return result, after["hits"] - before["hits"], after["misses"] - before["misses"]
+
+
+def test_preview_hit(app, user, plans):
+    with app.test_request_context():
+        owner = db.session.get(User, user)
+        first, hits, misses = preview(owner)
+        assert (hits, misses) == (0, 1)
+        assert first == ScheduleService.calculate_slots(owner, persist=False)
+
+        # แก้ผลที่ได้ไปไม่กระทบค่าใน cache
+        first["math"]["hours"] = -1
+        second, hits, misses = preview(owner)
+        assert (hits, misses) == (1, 0)
+        assert second == ScheduleService.calculate_slots(owner, persist=False)
+
+
+def test_preview_miss_after_change(app, user, plans):
+    with app.test_request_context():
+        owner = db.session.get(User, user)
+        preview(owner)
+
+        owner.reading_plans[0].level = 9
+        result, hits, misses = preview(owner)
+        assert (hits, misses) == (0, 1)
+        assert result == ScheduleService.calculate_slots(owner, persist=False)
+
+        owner.daily_read_hours = 6
+        result, hits, misses = preview(owner)
+        assert (hits, misses) == (0, 1)
+        assert result == ScheduleService.calculate_slots(owner, persist=False)
+
+
+def test_preview_miss_when_horizon_shifts(app, user, plans):
+    with app.test_request_context():
+        owner = db.session.get(User, user)
+        preview(owner)
+
+        # วันนี้เลื่อนไป → key ใหม่
+        session["simulated_date"] = (get_today() + timedelta(days=1)).isoformat()
+        result, hits, misses = preview(owner)
+        assert (hits, misses) == (0, 1)
+        assert result == ScheduleService.calculate_slots(owner, persist=False)
+
+        # latest_exam_date ยังไม่ตรงกับแผน → calculate_slots ต้องรันจริง ไม่ cache
+        owner.latest_exam_date -= timedelta(days=5)
+        size = SLOTS_CACHE.stats()["size"]
+        _, hits, misses = preview(owner)
+        assert hits == 0
+        assert SLOTS_CACHE.stats()["size"] == size
+
+
+def test_preview_invalidated_by_reschedule(app, user, plans):
+    with app.test_request_context():
+        owner = db.session.get(User, user)
+        preview(owner)
+        assert SLOTS_CACHE.stats()["size"] == 1
+        RescheduleService.request(owner)
+        assert SLOTS_CACHE.stats()["size"] == 0
+
+
+def test_preview_invalidated_by_cleanup(app, user, plans):
+    with app.test_request_context():
+        owner = db.session.get(User, user)
+        preview(owner)
+        db.session.add(ReadingPlans(user_id=user, exam_name="expired", level=3,
+                                    exam_date=get_today() - timedelta(days=1)))
+        db.session.commit()
+        assert SLOTS_CACHE.stats()["size"] == 1
+        assert UserUpdateService.cleanup_all_expired_plans() == 1
+        assert SLOTS_CACHE.stats()["size"] == 0
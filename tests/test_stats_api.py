@@ -0,0 +1,74 @@
+# tests/test_stats_api.py
+from app.extensions import db
+from app.models import DailyAllocations, UserDailyStats
+from app.services import stats_service
+from app.services.stats_service import StatsService, feedback_by_day, streaks
+from app.utils.utils import get_today
+
+
+def test_stats(app, auth_client, pending, query_budget):
+    res = auth_client.post("/api/feedback", json={"alloc_id": pending[0], "feedback_type": "harder"})
+    assert res.status_code == 200
+    with query_budget(3):
+        res = auth_client.get("/api/stats")
+    assert res.status_code == 200
+    body = res.get_json()
+    with app.app_context():
+        confirmed = db.session.get(DailyAllocations, pending[0]).slots
+    assert body["source"] == "rollup"
+    assert body["totals"]["confirmed_hours"] == confirmed
+    assert body["totals"]["planned_hours"] >= body["totals"]["planned_to_date"] >= confirmed
+    assert body["feedback"] == {"read_in_time": 0, "harder": 1, "easier": 0, "read_all": 0}
+    assert body["streaks"] == {"current": 1, "longest": 1, "active_days": 1}
+    assert sum(map(sum, body["heatmap"]["weeks"])) == confirmed
+    assert len(body["heatmap"]["weeks"]) == 12
+
+
+def test_stats_rollup_matches_allocations(app, auth_client, user, pending, monkeypatch):
+    kinds = ["read_all", "easier", "harder"]
+    res = auth_client.post("/api/feedback/batch", json=[
+        {"alloc_id": alloc_id, "feedback_type": kinds[i % 3]} for i, alloc_id in enumerate(pending)
+    ])
+    assert res.status_code == 200
+    rollup = auth_client.get("/api/stats?weeks=4").get_json()
+    with app.app_context():
+        incremental = [tuple(r) for r in db.session.query(UserDailyStats).with_entities(
+            UserDailyStats.date, UserDailyStats.confirmed_hours, UserDailyStats.harder, UserDailyStats.read_all)]
+        assert StatsService.rebuild(user) == 1
+        rebuilt = [tuple(r) for r in db.session.query(UserDailyStats).with_entities(
+            UserDailyStats.date, UserDailyStats.confirmed_hours, UserDailyStats.harder, UserDailyStats.read_all)]
+    assert incremental == rebuilt
+
+    monkeypatch.setattr(stats_service, "STATS_ROLLUP", False)
+    live = auth_client.get("/api/stats?weeks=4").get_json()
+    assert live["source"] == "allocations"
+    assert {**live, "source": "rollup"} == rollup
+
+
+def test_stats_resubmitted_feedback_counts_once(app, auth_client, user, pending):
+    res = auth_client.post("/api/feedback", json={"alloc_id": pending[0], "feedback_type": "harder"})
+    assert res.status_code == 200
+    # ส่งซ้ำ / เปลี่ยนคำตอบ → ไม่นับซ้ำใน rollup
+    res = auth_client.post("/api/feedback", json={"alloc_id": pending[0], "feedback_type": "easier"})
+    assert res.status_code == 409
+    with app.app_context():
+        live = [tuple(r)[1:] for r in db.session.execute(feedback_by_day(user))]
+        assert [tuple(r) for r in StatsService.daily(user)] == live
+        assert db.session.get(DailyAllocations, pending[0]).feedback_type == "harder"
+
+
+def test_stats_unauthorized(client):
+    assert client.get("/api/stats").status_code == 401
+
+
+def test_stats_invalid_weeks(auth_client):
+    assert auth_client.get("/api/stats?weeks=0").status_code == 400
+
+
+def test_streaks():
+    from datetime import timedelta
+    today = get_today()
+    days = [today - timedelta(days=n) for n in (9, 8, 7, 3, 2, 1)]
+    assert streaks(days, today) == (3, 3)
+    assert streaks(days[:3], today) == (0, 3)
+    assert streaks([], today) == (0, 0)
@@ -0,0 +1,17 @@
+# tests/test_study_api.py
+from app.utils.utils import get_today
+
+
+def test_daily_summary(client, user, pending, query_budget):
+    with query_budget(1):
+        res = client.get(f"/api/study/daily-summary?user_id={user}&date={get_today().isoformat()}")
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["total_hours"] > 0
+    assert {s["name"] for s in body["subjects"]} <= {"math", "physics", "chem"}
+
+
+def test_daily_summary_requires_user(client, query_budget):
+    with query_budget(0):
+        res = client.get("/api/study/daily-summary")
+    assert res.status_code == 400
@@ -0,0 +1,70 @@
+# tests/test_user_api.py
+from app.extensions import db
+from app.models import User
+
+
+def test_profile(auth_client, query_budget):
+    with query_budget(1):
+        res = auth_client.get("/api/user/profile")
+    assert res.status_code == 200
+    assert res.get_json()["username"] == "tester"
+
+
+def test_profile_unauthorized(client, query_budget):
+    with query_budget(0):
+        res = client.get("/api/user/profile")
+    assert res.status_code == 401
+
+
+def test_settings_daily_read_hours(auth_client, plans, query_budget):
+    with query_budget(17):
+        res = auth_client.put("/api/user/settings", json={"daily_read_hours": 4})
+    assert res.status_code == 200
+    assert res.get_json()["updated"]["daily_read_hours"] == 4
+
+
+def test_change_daily_read_hours(auth_client, plans, query_budget):
+    with query_budget(18):
+        res = auth_client.put("/api/user/change-daily_read_hours", json={"daily_read_hours": 2})
+    assert res.status_code == 200
+
+
+def test_change_username(app, auth_client, user, query_budget):
+    with query_budget(3):
+        res = auth_client.put("/api/user/change-username", json={"username": "renamed"})
+    assert res.status_code == 200
+    with app.app_context():
+        assert db.session.get(User, user).username == "renamed"
+
+
+def test_change_password(auth_client, query_budget):
+    with query_budget(2):
+        res = auth_client.put("/api/user/change-password", json={
+            "old_password": "password123", "new_password": "changed"
+        })
+    assert res.status_code == 200
+
+
+def test_change_email_notifications(auth_client, query_budget):
+    with query_budget(2):
+        res = auth_client.put("/api/user/change-email_notifications", json={"email_notifications": False})
+    assert res.status_code == 200
+
+
+def test_change_profile_img(auth_client, query_budget):
+    with query_budget(1):
+        res = auth_client.put("/api/user/change-profile_img", json={"profile_path": "/static/a.png"})
+    assert res.status_code == 200
+
+
+def test_users_with_email_notifications(client, user, query_budget):
+    with query_budget(1):
+        res = client.get("/api/user/with-email-notifications")
+    assert res.status_code == 200
+    assert [u["id"] for u in res.get_json()] == [user]
+
+
+def test_today(client, query_budget):
+    with query_budget(0):
+        res = client.get("/api/user/today")
+    assert res.status_code == 200
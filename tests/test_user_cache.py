@@ -0,0 +1,59 @@
+# tests/test_user_cache.py
+from datetime import timedelta
+import pytest
+from sqlalchemy import update
+from app.extensions import db
+from app.models import User
+from app.services.user_cache import USER_CACHE
+from app.utils.utils import get_today
+
+
+@pytest.fixture
+def user_cache(monkeypatch):
+    """เปิด USER_CACHE (ค่าเริ่มต้นปิดอยู่) และเริ่มจาก cache ว่าง"""
+    monkeypatch.setattr(USER_CACHE, "ttl", 60)
+    USER_CACHE.invalidate()
+    yield USER_CACHE
+    USER_CACHE.invalidate()
+
+
+def test_cached_user_skips_select(auth_client, plans, user_cache, query_budget):
+    auth_client.get("/api/schedule")
+    with query_budget(0):
+        res = auth_client.get("/api/stats?weeks=0")
+    assert res.status_code == 400
+
+
+def test_cached_user_loads_mutable_columns(app, auth_client, user, plans, user_cache, query_budget):
+    etag = auth_client.get("/api/schedule").headers["ETag"]
+    # schedule_version ไม่อยู่ใน cache → SELECT ใหม่ 1 ครั้ง
+    with query_budget(1):
+        res = auth_client.get("/api/schedule", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    # process อื่นเขียน (ไม่ได้ล้าง cache ของ process นี้) → ETag ต้องเปลี่ยนทันที
+    with app.app_context():
+        db.session.execute(update(User).where(User.id == user).values(schedule_version=User.schedule_version + 1))
+        db.session.commit()
+    res = auth_client.get("/api/schedule", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert USER_CACHE.stats()["hits"] >= 2
+
+
+def test_settings_invalidate_cache(auth_client, user, user_cache):
+    assert auth_client.get("/api/user/profile").get_json()["email_notifications"] is True
+    res = auth_client.put("/api/user/settings", json={"email_notifications": False, "new_username": "renamed"})
+    assert res.status_code == 200
+    body = auth_client.get("/api/user/profile").get_json()
+    assert body["email_notifications"] is False
+    assert body["username"] == "renamed"
+
+
+def test_schedule_write_invalidates_etag(auth_client, plans, user_cache):
+    etag = auth_client.get("/api/schedule").headers["ETag"]
+    exam_date = (get_today() + timedelta(days=15)).isoformat()
+    res = auth_client.post("/api/plans", json={"exam_name": "bio", "exam_date": exam_date, "level": 4})
+    assert res.status_code == 201
+    res = auth_client.get("/api/schedule", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag